@@ -0,0 +1,246 @@
+"""
+Load benchmark for the AI phase of main.py (run_ai_phase) against
+benchmarks/fake_llm.py, so concurrency, batching and retry settings can be
+compared without an API key and without run-to-run noise from a real model.
+
+For every provider x scenario x worker count, a fresh fake server is started
+and run_ai_phase runs in its own subprocess against a throwaway database of
+synthetic 'Pending AI' jobs (and a fixed benchmark profile). Reported per run:
+
+    jobs/s        verdicts written per second of wall time
+    requests      LLM requests sent (extra ones are 429 retries)
+    overhead      wall time relative to the clean run with the same workers
+    recovered     jobs from malformed answers that still got a verdict
+
+A run that saw a 429 but finished faster than --quota-pause fails the
+benchmark, since that means the pause was skipped.
+
+    python benchmarks/bench_ai_stage.py                      # local provider, 1/2/4 workers
+    python benchmarks/bench_ai_stage.py --jobs 500 --workers 4 8 --latency-ms 1500 --tokens-per-s 40
+    python benchmarks/bench_ai_stage.py --providers local gemini   # gemini needs google-generativeai
+
+The local provider runs over LOCAL_LLM_BASE_URL (OpenAI-compatible HTTP), the
+Gemini one through the real SDK with GEMINI_BASE_URL.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from importlib.util import find_spec
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_llm import FakeLLMServer, add_arguments  # noqa: E402
+
+# name -> (share of 429s, share of malformed answers)
+SCENARIOS = {
+    "clean": (0.0, 0.0),
+    "429s": (0.1, 0.0),
+    "malformed": (0.0, 0.1),
+}
+
+BENCH_PROFILE = '''CANDIDATE_PROFILE = """
+Junior data engineer / Python backend developer in Oslo. Python, SQL, dbt,
+Airflow, Docker, some AWS. Looking for entry-level roles, no management.
+"""
+'''
+
+WORDS = "python sql data pipeline backend api docker aws team kunde utvikling system".split()
+
+
+def build_db(path, jobs, seed):
+    """A scraped_jobs table with `jobs` synthetic 'Pending AI' ads of varied length and deadline."""
+    import config
+
+    config.DB_FILENAME = path
+    import database
+
+    database.setup_database()
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        """
+        INSERT INTO scraped_jobs (ID, title, employer, full_description, date_added, deadline,
+                                  location, contact, phone, link, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending AI')
+        """,
+        (
+            (
+                500_000_000 + i,
+                f"Data Engineer {i}",
+                f"Employer {i % 200}",
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 600))) + f" ref{i}",
+                "2026-01-01",
+                f"{rng.randint(1, 28)}.{rng.randint(1, 12)}.2026",
+                "Oslo",
+                "",
+                "",
+                f"https://www.finn.no/job/ad/{500_000_000 + i}",
+            )
+            for i in range(jobs)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _installed(module):
+    try:
+        return find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def run_one(spec):
+    """Child process: run_ai_phase once against the fake server in the environment."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # The benchmark profile shadows the user's own profile.py (and the stdlib one)
+        with open(os.path.join(tmp, "profile.py"), "w") as f:
+            f.write(BENCH_PROFILE)
+        sys.path.insert(0, tmp)
+
+        import config
+
+        config.DATA_DIR = config.OUTPUT_DIR = tmp
+        config.GEMINI_RPM = config.GEMINI_TPM = 0  # Measure the stage, not the free-tier quota
+        config.AI_QUOTA_PAUSE_S = spec["quota_pause"]
+        build_db(os.path.join(tmp, "jobs.db"), spec["jobs"], spec["seed"])
+
+        import main
+        import metrics
+        from rag import ai_filter
+
+        args = SimpleNamespace(
+            local=spec["provider"] == "local",
+            workers=spec["workers"],
+            multi_profile=False,
+            think=False,
+            max_llm_calls=None,
+            max_tokens=None,
+            time_budget=None,
+        )
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            main.run_ai_phase(args, ai_filter)
+        elapsed = time.perf_counter() - started
+
+        conn = sqlite3.connect(config.DB_FILENAME)
+        pending = [str(r[0]) for r in conn.execute("SELECT ID FROM scraped_jobs WHERE status = 'Pending AI'")]
+        conn.close()
+
+    print(
+        "RESULT "
+        + json.dumps(
+            {
+                "elapsed_s": elapsed,
+                "verdicts": spec["jobs"] - len(pending),
+                "pending_ids": pending,
+                "retries": metrics.counter_value("llm_quota_retries_total"),
+            }
+        )
+    )
+
+
+def run_case(provider, scenario, workers, opts):
+    rate_429, malformed = SCENARIOS[scenario]
+    server = FakeLLMServer(
+        ("127.0.0.1", 0),
+        latency_ms=opts.latency_ms,
+        latency_dist=opts.latency_dist,
+        tokens_per_s=opts.tokens_per_s,
+        slots=opts.slots,
+        rate_429=rate_429,
+        malformed=malformed,
+        seed=opts.seed,
+    ).start()
+    env = dict(os.environ, LOCAL_LLM_BASE_URL=server.url, GEMINI_BASE_URL=server.url, GEMINI_API_KEY="fake")
+    spec = {
+        "provider": provider,
+        "workers": workers,
+        "jobs": opts.jobs,
+        "seed": opts.seed,
+        "quota_pause": opts.quota_pause,
+    }
+    try:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", json.dumps(spec)],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        ).stdout
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    result = json.loads(next(l for l in out.splitlines() if l.startswith("RESULT "))[len("RESULT "):])
+    served = server.snapshot()
+    broken = set(served.get("malformed_ids", []))
+    result.update(
+        requests=served.get("requests", 0),
+        quota_429=served.get("quota_429", 0),
+        malformed=served.get("malformed", 0),
+        malformed_jobs=len(broken),
+        recovered=len(broken - set(result.pop("pending_ids"))),
+    )
+    return result
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        run_one(json.loads(sys.argv[2]))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the AI phase against the fake LLM server.")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--providers", nargs="+", choices=["local", "gemini"], default=["local"])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--quota-pause", type=float, default=0.5, help="config.AI_QUOTA_PAUSE_S for the run.")
+    add_arguments(parser)
+    parser.set_defaults(latency_ms=50)
+    opts = parser.parse_args()
+
+    if "gemini" in opts.providers and not _installed("google.generativeai"):
+        print("⚠️ google-generativeai is not installed; skipping the gemini provider.")
+        opts.providers = [p for p in opts.providers if p != "gemini"]
+
+    print(
+        f"🧪 {opts.jobs} jobs, fake latency {opts.latency_ms:g} ms ({opts.latency_dist}), "
+        f"{opts.tokens_per_s:g} tok/s, {opts.slots or 'unlimited'} slots, quota pause {opts.quota_pause:g}s"
+    )
+    for provider in opts.providers:
+        baseline = {}
+        for scenario in opts.scenarios:
+            for workers in opts.workers:
+                r = run_case(provider, scenario, workers, opts)
+                # Every 429 must pause the limiter, so a run that saw one can't beat the pause
+                assert not r["quota_429"] or r["elapsed_s"] >= opts.quota_pause, (
+                    f"{provider} {scenario} {workers} workers: {r['quota_429']} 429s but only "
+                    f"{r['elapsed_s']:.2f}s elapsed (quota pause {opts.quota_pause:g}s)"
+                )
+                if scenario == "clean":
+                    baseline[workers] = r["elapsed_s"]
+                overhead = (
+                    f"{r['elapsed_s'] / baseline[workers] - 1:+6.0%}" if workers in baseline else "     -"
+                )
+                recovered = f"{r['recovered']}/{r['malformed_jobs']}" if r["malformed_jobs"] else "-"
+                print(
+                    f"{provider:>6} {scenario:<9} {workers:>2} workers | "
+                    f"{r['verdicts'] / r['elapsed_s']:>7.1f} jobs/s | {r['verdicts']:>5}/{opts.jobs} verdicts | "
+                    f"{r['requests']:>4} requests ({r['retries']} retries, {r['quota_429']} 429s) | "
+                    f"overhead {overhead} | malformed {r['malformed']:>3}, recovered {recovered}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmarks file_manager.save_to_excel at different history sizes.
+
+Each size runs in its own subprocess against a throwaway database, so the
+reported peak RSS belongs to that export alone.
+
+    python benchmarks/bench_excel_export.py            # 10k and 100k rows
+    python benchmarks/bench_excel_export.py 1000 50000
+"""
+import json
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+STATUSES = ["Not searched", "Not searched", "Discarded (AI)", "Sent Application", "Rejected"]
+
+
+def build_db(path, rows):
+    """Creates a scraped_jobs table with `rows` synthetic rows."""
+    config.DB_FILENAME = path
+    import database
+
+    database.setup_database()
+    conn = sqlite3.connect(path)
+    rng = random.Random(rows)
+    conn.executemany(
+        """
+        INSERT INTO scraped_jobs (ID, title, employer, full_description, date_added, deadline,
+                                  location, contact, phone, link, status, called, score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            (
+                400_000_000 + i,
+                f"Data Engineer {i}",
+                f"Employer {i % 500}",
+                "Python SQL dbt " * 50,
+                "2026-01-01",
+                f"{rng.randint(1, 28)}.{rng.randint(1, 12)}.2026",
+                "Oslo",
+                "Kari Nordmann",
+                "99999999",
+                f"https://www.finn.no/job/ad/{400_000_000 + i}",
+                rng.choice(STATUSES),
+                "Nei",
+                rng.randint(1, 10),
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_one(rows):
+    """Child process: export once (cold) and once more (unchanged, should skip)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DATA_DIR = tmp
+        config.EXCEL_FILENAME = os.path.join(tmp, "tracker.xlsx")
+        build_db(os.path.join(tmp, "jobs.db"), rows)
+
+        import file_manager
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        file_manager.save_to_excel(None)
+        cold = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        started = time.perf_counter()
+        file_manager.save_to_excel(None)
+        unchanged = time.perf_counter() - started
+
+        result = {
+            "rows": rows,
+            "export_s": round(cold, 3),
+            "unchanged_s": round(unchanged, 3),
+            "peak_rss_mb": round(rss_after / 1024, 1),
+            "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+            "file_mb": round(os.path.getsize(config.EXCEL_FILENAME) / 1e6, 2),
+        }
+    print("RESULT " + json.dumps(result))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        run_one(int(sys.argv[2]))
+        return
+
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+    for rows in sizes:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(rows)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        line = next(l for l in out.splitlines() if l.startswith("RESULT "))
+        r = json.loads(line[len("RESULT "):])
+        print(
+            f"{r['rows']:>8} rows | export {r['export_s']:>7.2f}s | unchanged {r['unchanged_s']:>6.2f}s | "
+            f"peak RSS {r['peak_rss_mb']:>7.1f} MB (+{r['rss_growth_mb']} MB during export) | {r['file_mb']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
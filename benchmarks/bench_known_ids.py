@@ -0,0 +1,151 @@
+"""
+Memory, lookup throughput and load time of the known-ID index (known_ids.py)
+against the set of str IDs that database.get_existing_ids() used to return.
+
+    python benchmarks/bench_known_ids.py                        # 100k and 1M IDs, DB load at 100k rows
+    python benchmarks/bench_known_ids.py 1000000 5000000 --hit-rate 0.9
+    python benchmarks/bench_known_ids.py --db-rows 1000000      # load from a 1M-row synthetic DB
+
+In memory, each structure is built from the same synthetic IDs (spaced like
+finn.no IDs), measured with tracemalloc, and probed with str IDs the way the
+crawl probes them: a mix of known IDs and new ones (--hit-rate). The load
+comparison runs on a copy of a benchmarks/gen_dataset.py database. Cold means
+a full scan that writes a snapshot; warm means the snapshot plus --new-rows
+rows inserted since.
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import gen_dataset  # noqa: E402
+import known_ids  # noqa: E402
+
+LOOKUPS = 200_000
+
+
+def synthetic_ids(count, seed):
+    rng = random.Random(seed)
+    job_id, ids = 400_000_000, []
+    for _ in range(count):
+        job_id += rng.randint(1, 40)
+        ids.append(job_id)
+    return ids
+
+
+def structures(bloom_bits):
+    return {
+        "set of str (before)": lambda ids: {str(i) for i in ids},
+        "KnownIds": lambda ids: known_ids.KnownIds(ids),
+        f"KnownIds + Bloom ({bloom_bits} bits/ID)": lambda ids: known_ids.KnownIds(ids, bloom_bits),
+    }
+
+
+def measure_memory(build, ids):
+    gc.collect()
+    tracemalloc.start()
+    structure = build(ids)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return current / 2**20, peak / 2**20
+
+
+def measure_lookups(structure, probes):
+    started = time.perf_counter()
+    hits = sum(1 for probe in probes if probe in structure)
+    return len(probes) / (time.perf_counter() - started), hits
+
+
+def bench_memory(sizes, hit_rate, bloom_bits, seed):
+    rng = random.Random(seed)
+    for size in sizes:
+        ids = synthetic_ids(size, seed)
+        unseen = ids[-1] + 1
+        probes = [
+            str(rng.choice(ids)) if rng.random() < hit_rate else str(unseen + rng.randint(0, 10**6))
+            for _ in range(LOOKUPS)
+        ]
+        print(f"\n🔢 {size:,} IDs, {LOOKUPS:,} lookups ({hit_rate:.0%} known)")
+        for name, build in structures(bloom_bits).items():
+            retained, peak = measure_memory(build, ids)
+            started = time.perf_counter()
+            structure = build(ids)
+            build_s = time.perf_counter() - started
+            per_s, hits = measure_lookups(structure, probes)
+            print(
+                f"   {name:<30} {retained:>8.1f} MB ({retained * 2**20 / size:>5.1f} B/ID, peak {peak:>7.1f} MB) "
+                f"| build {build_s:>5.2f}s | {per_s / 1e6:>5.2f}M lookups/s ({hits:,} hits)"
+            )
+            del structure
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def bench_load(rows, new_rows, seed):
+    dataset = gen_dataset.dataset_path(rows, seed)
+    if not os.path.exists(dataset):
+        subprocess.run([sys.executable, gen_dataset.__file__, str(rows), "--seed", str(seed)], check=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_FILENAME = os.path.join(tmp, "jobs.db")
+        shutil.copy(dataset, config.DB_FILENAME)
+        import database
+
+        database.setup_database()  # Datasets from before id_log get the table and triggers
+        conn = sqlite3.connect(config.DB_FILENAME)
+
+        def old_load():
+            return {str(row[0]) for row in conn.execute("SELECT ID FROM scraped_jobs")}
+
+        print(f"\n💾 Loading the known IDs of a {rows:,}-row database")
+        old_s, _ = _timed(old_load)
+        print(f"   {'set of str (before)':<30} {old_s:>6.3f}s")
+        cold_s, _ = _timed(known_ids.load)
+        print(f"   {'KnownIds, cold (scan + save)':<30} {cold_s:>6.3f}s")
+        warm_s, _ = _timed(known_ids.load)
+        print(f"   {'KnownIds, warm (snapshot)':<30} {warm_s:>6.3f}s")
+
+        conn.executemany(
+            "INSERT INTO scraped_jobs (ID, title) VALUES (?, 'new')",
+            [(10**12 + i,) for i in range(new_rows)],
+        )
+        conn.commit()
+        delta_s, known = _timed(known_ids.load)
+        print(f"   {f'KnownIds, warm + {new_rows} new':<30} {delta_s:>6.3f}s ({len(known):,} IDs)")
+        print(f"   snapshot: {os.path.getsize(known_ids.snapshot_path()) / 2**20:.1f} MB")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the known-ID index against a set of str.")
+    parser.add_argument("sizes", type=int, nargs="*", default=[100_000, 1_000_000])
+    parser.add_argument("--hit-rate", type=float, default=0.5, help="Share of lookups for already known IDs.")
+    parser.add_argument("--bloom-bits", type=int, default=10)
+    parser.add_argument("--db-rows", type=int, default=100_000, help="Rows of the database for the load test (0 = skip).")
+    parser.add_argument("--new-rows", type=int, default=500, help="Rows inserted between the warm loads.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    bench_memory(args.sizes, args.hit_rate, args.bloom_bits, args.seed)
+    if args.db_rows:
+        bench_load(args.db_rows, args.new_rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
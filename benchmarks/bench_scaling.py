@@ -0,0 +1,228 @@
+"""
+Scaling benchmark for the database and export paths on synthetic histories
+(benchmarks/gen_dataset.py): how get_existing_ids, cleanup_expired_jobs,
+generate_reports, save_to_excel and sync_excel_to_db grow with the number of
+jobs.
+
+Every (size, function) runs in its own subprocess on a fresh copy of the
+dataset, so the peak RSS is that function's alone. Results are appended to
+output/benchmarks/scaling.jsonl with the git commit they were measured on, and
+each line is compared against the latest earlier result from another commit.
+
+    python benchmarks/bench_scaling.py                       # 10k and 100k jobs, all functions
+    python benchmarks/bench_scaling.py 1000000 --only save_to_excel sync_excel_to_db
+    python benchmarks/bench_scaling.py --history             # print the saved results per commit
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import gen_dataset  # noqa: E402
+
+RESULTS_FILE = os.path.join(config.OUTPUT_DIR, "benchmarks", "scaling.jsonl")
+
+# In run order: sync_excel_to_db reads the workbook that save_to_excel wrote
+FUNCTIONS = ["get_existing_ids", "cleanup_expired_jobs", "generate_reports", "save_to_excel", "sync_excel_to_db"]
+
+# Share of rows whose 'Har ringt' differs between the sheet and the DB before a sync
+SYNC_EDIT_EVERY = 50
+
+
+def git_commit():
+    """(short sha, dirty?) of the checkout being measured; ('unknown', False) outside git."""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+            ).stdout.strip()
+        )
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_one(function, dataset, shared_dir):
+    """Child process: runs `function` once on a private copy of `dataset`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # generate_reports writes to relative output/ paths
+        config.DATA_DIR = os.path.join(tmp, "data")
+        config.OUTPUT_DIR = os.path.join(tmp, "output")
+        config.DB_FILENAME = os.path.join(tmp, "jobs.db")
+        config.EXCEL_FILENAME = os.path.join(shared_dir, "tracker.xlsx")
+        config.ensure_dirs()
+        shutil.copy(dataset, config.DB_FILENAME)
+
+        import database
+        import file_manager
+        import main
+
+        if function == "sync_excel_to_db":
+            if not os.path.exists(config.EXCEL_FILENAME):
+                file_manager.save_to_excel(force=True)
+            # Stand-in for the user's edits in the sheet: make some rows differ from it
+            conn = sqlite3.connect(config.DB_FILENAME)
+            conn.execute(
+                "UPDATE scraped_jobs SET called = 'Svarte ikke' WHERE ID % ? = 0 AND status != 'Discarded (Basic)'",
+                (SYNC_EDIT_EVERY,),
+            )
+            conn.commit()
+            conn.close()
+
+        calls = {
+            "get_existing_ids": database.get_existing_ids,
+            "cleanup_expired_jobs": database.cleanup_expired_jobs,
+            "generate_reports": main.generate_reports,
+            "save_to_excel": lambda: file_manager.save_to_excel(force=True),
+            "sync_excel_to_db": database.sync_excel_to_db,
+        }
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        calls[function]()
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(
+        "RESULT "
+        + json.dumps(
+            {"wall_s": round(elapsed, 3), "peak_rss_mb": round(rss_after / 1024, 1),
+             "rss_growth_mb": round((rss_after - rss_before) / 1024, 1)}
+        )
+    )
+
+
+def ensure_dataset(rows, seed):
+    """
+    Generates the dataset in a separate process: on Linux a child inherits the
+    parent's peak RSS across fork + exec, so the parent has to stay small.
+    """
+    path = gen_dataset.dataset_path(rows, seed)
+    if not os.path.exists(path):
+        subprocess.run([sys.executable, gen_dataset.__file__, str(rows), "--seed", str(seed)], check=True)
+    return path
+
+
+def run_case(function, rows, dataset, shared_dir):
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", function, dataset, shared_dir],
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode:
+        sys.exit(f"❌ {function} at {rows} rows failed:\n{out.stderr[-2000:]}")
+    line = next(l for l in out.stdout.splitlines() if l.startswith("RESULT "))
+    result = json.loads(line[len("RESULT "):])
+    result["process_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def load_results(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous(history, commit, rows, function):
+    """The latest earlier result for (rows, function) measured on a different commit."""
+    for record in reversed(history):
+        if record["rows"] == rows and record["function"] == function and record["commit"] != commit:
+            return record
+    return None
+
+
+def _change(now, before):
+    return f"{now / before - 1:+.0%}" if before else "n/a"
+
+
+def print_history(history):
+    for (rows, function) in sorted({(r["rows"], r["function"]) for r in history}):
+        print(f"\n{function} @ {rows} rows")
+        for r in history:
+            if r["rows"] == rows and r["function"] == function:
+                print(
+                    f"   {r['measured_at'][:16]} {r['commit']}{'+' if r.get('dirty') else ' '} "
+                    f"{r['wall_s']:>8.2f}s  peak RSS {r['peak_rss_mb']:>7.1f} MB"
+                )
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        run_one(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the DB and export paths.")
+    parser.add_argument("sizes", type=int, nargs="*", default=[10_000, 100_000])
+    parser.add_argument("--only", nargs="+", choices=FUNCTIONS, help="Functions to run (default: all).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSONL file the results are appended to.")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the results file.")
+    parser.add_argument("--history", action="store_true", help="Print the saved results and exit.")
+    args = parser.parse_args()
+
+    history = load_results(args.results)
+    if args.history:
+        print_history(history)
+        return
+
+    commit, dirty = git_commit()
+    functions = [f for f in FUNCTIONS if not args.only or f in args.only]
+    print(f"📏 Commit {commit}{' (uncommitted changes)' if dirty else ''}")
+
+    records = []
+    for rows in args.sizes:
+        dataset = ensure_dataset(rows, args.seed)
+        with tempfile.TemporaryDirectory() as shared_dir:
+            for function in functions:
+                result = run_case(function, rows, dataset, shared_dir)
+                record = dict(
+                    result,
+                    commit=commit,
+                    dirty=dirty,
+                    measured_at=datetime.now().isoformat(timespec="seconds"),
+                    rows=rows,
+                    function=function,
+                    seed=args.seed,
+                    generator=gen_dataset.GENERATOR_VERSION,
+                )
+                records.append(record)
+
+                before = previous(history, commit, rows, function)
+                versus = (
+                    f" | vs {before['commit']}: time {_change(record['wall_s'], before['wall_s'])}, "
+                    f"RSS {_change(record['peak_rss_mb'], before['peak_rss_mb'])}"
+                    if before
+                    else ""
+                )
+                print(
+                    f"{rows:>8} rows | {function:<21} {record['wall_s']:>8.2f}s "
+                    f"(process {record['process_s']:.2f}s) | peak RSS {record['peak_rss_mb']:>7.1f} MB "
+                    f"(+{record['rss_growth_mb']}){versus}"
+                )
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"💾 Saved {len(records)} results to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
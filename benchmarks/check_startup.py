@@ -0,0 +1,84 @@
+"""
+Startup budget check: fails (exit 1) if a command's imports get heavier.
+
+Every case runs in a fresh interpreter with `python -X importtime`. The import
+time of a bare interpreter (site, encodings, ...) is subtracted, and the best
+of RUNS attempts counts, so the numbers are the tracker's own import cost.
+Each case also lists modules that must NOT be imported on that path.
+
+A manual check, not part of a test suite (the repo has no pytest or CI): run it
+after changing imports. The budgets are wall-clock, so a loaded machine can
+fail a case that passes when re-run on an idle one.
+
+    python benchmarks/check_startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+RUNS = 3
+
+# Heavy optional stacks that only specific subcommands may load
+AI_SDKS = ["google.generativeai", "lmstudio"]
+ANALYTICS = ["pandas", "pyarrow", "numpy", "openpyxl"]
+SCRAPING = ["requests", "bs4"]
+
+# (name, argv after the interpreter, budget in ms, forbidden top-level modules)
+CASES = [
+    ("import main", ["-c", "import main"], 150, AI_SDKS + ANALYTICS + SCRAPING),
+    ("--regenerate", [MAIN, "--regenerate"], 200, AI_SDKS + ANALYTICS + SCRAPING),
+    # What a scraping run (-q/--query) has loaded before its first request
+    ("--query (scrape path)", ["-c", "import main, scraper"], 400, AI_SDKS + ANALYTICS),
+]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def import_profile(argv, cwd):
+    """Returns (total self-time in ms, set of imported module names) for one interpreter run."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + argv,
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            total_us += int(match.group(1))
+            modules.add(match.group(4))
+    return total_us / 1000, modules
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        # --regenerate runs for real, against an empty database in the temp dir
+        baseline = min(import_profile(["-c", "pass"], tmp)[0] for _ in range(RUNS))
+
+        for name, argv, budget_ms, forbidden in CASES:
+            runs = [import_profile(argv, tmp) for _ in range(RUNS)]
+            cost = min(total for total, _ in runs) - baseline
+            loaded = set().union(*(modules for _, modules in runs))
+            leaked = sorted(m for m in forbidden if m in loaded)
+
+            ok = cost <= budget_ms and not leaked
+            failed |= not ok
+            print(
+                f"{'✅' if ok else '❌'} {name:<24} {cost:7.1f} ms (budget {budget_ms} ms)"
+                + (f"  imported: {', '.join(leaked)}" if leaked else "")
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
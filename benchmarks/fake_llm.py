@@ -0,0 +1,273 @@
+"""
+Local stand-in for the LLM providers, for tuning the AI phase without a
+Gemini key or a running LM Studio, and with repeatable results.
+
+It speaks just enough of both APIs for rag/providers.py:
+
+    POST /v1beta/models/<model>:generateContent   (Gemini REST; GEMINI_BASE_URL)
+    POST /v1/chat/completions                     (OpenAI-compatible; LOCAL_LLM_BASE_URL)
+    GET  /stats                                   (request / fault counters as JSON)
+
+Every job ID in the prompt gets a deterministic verdict. Latency is a
+time-to-first-token sample plus output tokens / --tokens-per-s, and --slots
+limits concurrent generations like LM Studio's "Max Concurrent Predictions".
+--rate-429 and --malformed inject quota errors and broken JSON. Which requests
+fail is a function of --seed, the batch's job IDs and how often that batch was
+seen before, so two runs of the same backlog hit the same faults.
+
+    python benchmarks/fake_llm.py --latency-ms 800 --tokens-per-s 60 --rate-429 0.1
+    export LOCAL_LLM_BASE_URL=http://127.0.0.1:8766   # then: python main.py --local
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# '"id": "123"' in the job list (Gemini) or the output template (local)
+_JOB_ID = re.compile(r'"id":\s*"([^"]+)"')
+# '"backend": { "match": true/false' in the --multi-profile output template
+_PROFILE_ID = re.compile(r'"(\w+)": \{ "match": true/false')
+PLACEHOLDER_IDS = {"string"}
+
+
+def verdict(job_id):
+    """The fake model's opinion of one job: stable per ID, roughly 40% matches."""
+    score = zlib.crc32(job_id.encode()) % 10 + 1
+    return {"match": score >= 7, "reason": f"Fake verdict ({score}/10)", "score": score}
+
+
+def answer(prompt, single_object):
+    """The model output for `prompt`: verdicts for every job ID (per profile if the prompt asks)."""
+    ids = [i for i in dict.fromkeys(_JOB_ID.findall(prompt)) if i not in PLACEHOLDER_IDS]
+    profiles = _PROFILE_ID.findall(prompt)
+    items = []
+    for job_id in ids:
+        if profiles:
+            items.append({"id": job_id, "profiles": {pid: verdict(f"{pid}:{job_id}") for pid in profiles}})
+        else:
+            items.append(dict(verdict(job_id), id=job_id))
+    if single_object and len(items) == 1:
+        return ids, json.dumps(items[0])
+    return ids, json.dumps(items, indent=2)
+
+
+def corrupt(text, rng):
+    """Breaks the JSON the way models do: cut off mid-answer, or one mangled item."""
+    if rng.random() < 0.5:
+        return text[: rng.randint(len(text) // 2, len(text) - 1)]
+    spots = list(re.finditer(r'"match": (?:true|false)', text))
+    if not spots:
+        return text[:-1]
+    spot = rng.choice(spots)
+    return text[: spot.start()] + '"match": tru' + text[spot.end() :]
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 8766),
+        latency_ms=500,
+        latency_dist="lognormal",
+        tokens_per_s=0,
+        slots=0,
+        rate_429=0.0,
+        malformed=0.0,
+        seed=0,
+    ):
+        super().__init__(address, FakeLLMHandler)
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.tokens_per_s = tokens_per_s
+        self.rate_429 = rate_429
+        self.malformed = malformed
+        self.seed = seed
+        self.slots = threading.BoundedSemaphore(slots) if slots else None
+
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.seen = Counter()  # batch key -> times requested
+        self.malformed_ids = set()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves on a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, malformed_ids=sorted(self.malformed_ids))
+
+    def _latency_s(self, rng):
+        base = self.latency_ms / 1000
+        if self.latency_dist == "fixed":
+            return base
+        if self.latency_dist == "uniform":
+            return rng.uniform(0.5 * base, 1.5 * base)
+        # lognormal with median `base`: mostly close, with a realistic slow tail
+        return base * rng.lognormvariate(0, 0.5)
+
+    def complete(self, prompt, api):
+        """Returns (status, text, prompt_tokens, output_tokens) for one request."""
+        ids, text = answer(prompt, single_object=api == "openai")
+        key = ",".join(sorted(ids))
+        with self.lock:
+            attempt = self.seen[key]
+            self.seen[key] += 1
+            self.stats["requests"] += 1
+            self.stats[f"requests_{api}"] += 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+
+        if rng.random() < self.rate_429:
+            with self.lock:
+                self.stats["quota_429"] += 1
+            return 429, None, 0, 0
+
+        if rng.random() < self.malformed:
+            text = corrupt(text, rng)
+            with self.lock:
+                self.stats["malformed"] += 1
+                self.malformed_ids.update(ids)
+
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(text) // 4
+        if self.slots:
+            self.slots.acquire()
+        try:
+            delay = self._latency_s(rng)
+            if self.tokens_per_s:
+                delay += output_tokens / self.tokens_per_s
+            time.sleep(delay)
+        finally:
+            if self.slots:
+                self.slots.release()
+        with self.lock:
+            self.stats["jobs"] += len(ids)
+        return 200, text, prompt_tokens, output_tokens
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            self._send(200, self.server.snapshot())
+        elif self.path.startswith("/v1/models"):
+            self._send(200, {"object": "list", "data": [{"id": "fake-llm", "object": "model"}]})
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = self.path.split("?")[0]
+
+        if path.endswith(":generateContent"):
+            prompt = "".join(
+                part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+            )
+            status, text, prompt_tokens, output_tokens = self.server.complete(prompt, "gemini")
+            if status == 429:
+                error = {"code": 429, "message": "Resource has been exhausted (fake).", "status": "RESOURCE_EXHAUSTED"}
+                self._send(429, {"error": error})
+                return
+            self._send(
+                200,
+                {
+                    "candidates": [
+                        {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+                    ],
+                    "usageMetadata": {
+                        "promptTokenCount": prompt_tokens,
+                        "candidatesTokenCount": output_tokens,
+                        "totalTokenCount": prompt_tokens + output_tokens,
+                    },
+                },
+            )
+
+        elif path == "/v1/chat/completions":
+            prompt = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+            status, text, prompt_tokens, output_tokens = self.server.complete(prompt, "openai")
+            if status == 429:
+                self._send(429, {"error": {"message": "Rate limit reached (fake).", "type": "rate_limit_error"}})
+                return
+            self._send(
+                200,
+                {
+                    "object": "chat.completion",
+                    "model": body.get("model", "fake-llm"),
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": output_tokens,
+                        "total_tokens": prompt_tokens + output_tokens,
+                    },
+                },
+            )
+
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def add_arguments(parser):
+    """The server knobs, shared with bench_ai_stage.py."""
+    parser.add_argument("--latency-ms", type=float, default=500, help="Median time to first token.")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--tokens-per-s", type=float, default=0, help="Generation speed (0 = instant).")
+    parser.add_argument("--slots", type=int, default=0, help="Concurrent generations (0 = unlimited).")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini / OpenAI-compatible LLM server for benchmarks.")
+    parser.add_argument("--port", type=int, default=8766)  # Not 8765, the dashboard's port
+    add_arguments(parser)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of answers with broken JSON.")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        ("127.0.0.1", args.port),
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        tokens_per_s=args.tokens_per_s,
+        slots=args.slots,
+        rate_429=args.rate_429,
+        malformed=args.malformed,
+        seed=args.seed,
+    )
+    print(f"🧪 Fake LLM listening on {server.url}")
+    print(f"   export LOCAL_LLM_BASE_URL={server.url}")
+    print(f"   export GEMINI_BASE_URL={server.url} GEMINI_API_KEY=fake")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"\n📊 {json.dumps({k: v for k, v in server.snapshot().items() if k != 'malformed_ids'})}")
+
+
+if __name__ == "__main__":
+    main()
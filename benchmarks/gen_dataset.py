@@ -0,0 +1,207 @@
+"""
+Synthetic scraped_jobs databases for scaling benchmarks.
+
+The rows look like the real history (see db_summary.md): a Norwegian/English
+mix of titles and descriptions, a long tail of employers, every deadline
+format the scraper sees ("15.03.2026", "1.4.2026", "Snarest", "Se annonse",
+blank), past and future deadlines, and the status mix of a database that has
+been through a few months of filtering and applying. About 1% of the rows have
+no compact description yet, like ads scraped since the last run.
+
+Generation is deterministic per (rows, seed), so every commit is benchmarked
+on the same data.
+
+    python benchmarks/gen_dataset.py 100000                     # cached in output/benchmarks/datasets/
+    python benchmarks/gen_dataset.py 1000000 --out /tmp/big.db --seed 7
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+# Bump when the generated data changes, so cached datasets are rebuilt
+GENERATOR_VERSION = 1
+DATASET_DIR = os.path.join(config.OUTPUT_DIR, "benchmarks", "datasets")
+CHUNK = 10_000
+
+# (status, weight): mostly filtered out, a tail of applications in progress
+STATUSES = [
+    ("Discarded (Basic)", 45),
+    ("Discarded (AI)", 20),
+    ("Not searched", 18),
+    ("Pending AI", 5),
+    ("Not Interested", 4),
+    ("Sent Application", 4),
+    ("Rejected", 2),
+    ("1. Interview", 1),
+    ("2. Interview", 0.5),
+    ("Offer", 0.3),
+    ("Accepted", 0.2),
+]
+
+TITLES_NO = [
+    "Utvikler", "Backend-utvikler", "Dataingeniør", "Seniorrådgiver", "Rådgiver", "Avdelingsleder",
+    "Prosjektleder", "Systemutvikler", "Dataanalytiker", "IT-konsulent", "Fagansvarlig", "Lærling",
+]
+TITLES_EN = [
+    "Software Engineer", "Data Engineer", "Backend Developer", "Data Analyst", "Platform Engineer",
+    "Machine Learning Engineer", "Team Lead", "Product Manager", "DevOps Engineer", "Consultant",
+]
+SENIORITY = ["", "", "", "Junior ", "Senior ", "Lead ", "Graduate ", "Erfaren "]
+QUALIFIERS = ["", "", " - Data Platform", " i Oslo", " til vårt team", " (m/f/d)", ", Analytics", " i Bergen"]
+
+EMPLOYER_STEMS = [
+    "Nordlys", "Fjord", "Vestland", "Aker", "Polar", "Skagen", "Bouvet", "Sopra", "Telenor", "Posten",
+    "Statens", "Kongsberg", "Viken", "Trønder", "Equi", "Hav", "Bergen", "Oslo", "Nordic", "Data",
+]
+EMPLOYER_SUFFIXES = [" AS", " ASA", " Consulting AS", " Norge AS", " Kommune", " Group", " Digital", " Tech"]
+LOCATIONS = ["Oslo", "Bergen", "Trondheim", "Stavanger", "Drammen", "Kristiansand", "Tromsø", "Remote", "Fredrikstad"]
+
+WORDS_NO = (
+    "vi søker en engasjert kollega som vil jobbe med data og utvikling i et tverrfaglig team "
+    "du får ansvar for integrasjoner drift og videreutvikling av våre systemer arbeidsoppgaver "
+    "kvalifikasjoner relevant utdanning erfaring med python sql skyplattform er en fordel "
+    "vi tilbyr konkurransedyktige betingelser fleksibel arbeidstid gode pensjonsordninger "
+    "og et hyggelig arbeidsmiljø søknadsfrist tiltredelse etter avtale kontaktperson"
+).split()
+WORDS_EN = (
+    "we are looking for a motivated engineer to join our data platform team you will build "
+    "and maintain pipelines apis and cloud infrastructure requirements experience with python "
+    "sql docker kubernetes aws or azure nice to have dbt airflow kafka spark we offer competitive "
+    "salary flexible hours pension insurance and a friendly international environment apply now"
+).split()
+
+
+def _deadline(rng, today):
+    kind = rng.random()
+    if kind < 0.10:
+        return rng.choice(["Snarest", "Se annonse", "Fortløpende", "ASAP"])
+    if kind < 0.12:
+        return rng.choice(["", None])
+    day = today + timedelta(days=rng.randint(-240, 60))
+    if kind < 0.30:
+        return f"{day.day}.{day.month}.{day.year}"  # Unpadded, as some boards write it
+    return day.strftime("%d.%m.%Y")
+
+
+def _employer(rng):
+    # Long tail: a few employers post a lot, most post once or twice
+    stem = EMPLOYER_STEMS[min(int(rng.paretovariate(1.2)) - 1, len(EMPLOYER_STEMS) - 1)]
+    return f"{stem}{rng.choice(EMPLOYER_SUFFIXES)}" + ("" if rng.random() < 0.7 else f" {rng.randint(1, 400)}")
+
+
+def _sentences(rng, words, count=1500):
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(6, 18))).capitalize() + "."
+        for _ in range(count)
+    ]
+
+
+def _text(rng, sentences, length):
+    """About `length` words of text, drawn from a pre-built sentence pool (cheap at 1M rows)."""
+    return " ".join(rng.choices(sentences, k=max(1, length // 12)))
+
+
+def _row(rng, job_id, today, pools):
+    norwegian = rng.random() < 0.6
+    title = rng.choice(SENIORITY) + rng.choice(TITLES_NO if norwegian else TITLES_EN) + rng.choice(QUALIFIERS)
+    description = _text(rng, pools[norwegian], rng.randint(80, 600))
+    compact = description[: config.COMPACT_DESC_TOKENS * 4] if rng.random() > 0.01 else None
+    status = rng.choices([s for s, _ in STATUSES], weights=[w for _, w in STATUSES])[0]
+    scored = status not in ("Discarded (Basic)", "Pending AI")
+    return (
+        job_id,
+        title,
+        _employer(rng),
+        description,
+        (today - timedelta(days=rng.randint(0, 730))).isoformat(),
+        _deadline(rng, today),
+        rng.choice(LOCATIONS),
+        rng.choice(["", "Kari Nordmann", "Ola Hansen", "Recruitment Team"]),
+        rng.choice(["", f"9{rng.randint(1000000, 9999999)}"]),
+        f"https://www.finn.no/job/ad/{job_id}",
+        status,
+        "Ja" if status in ("Sent Application", "1. Interview") and rng.random() < 0.3 else "Nei",
+        rng.randint(1, 10) if scored else 0,
+        compact,
+        len(description) // 4,
+        len(compact) // 4 if compact else None,
+    )
+
+
+def build(path, rows, seed=1, today=None):
+    """Writes a fresh database with `rows` synthetic jobs to `path`."""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    config.DB_FILENAME = path
+    import database
+
+    database.setup_database()
+    rng = random.Random(f"{seed}:{rows}")
+    today = today or date.today()
+    pools = {True: _sentences(rng, WORDS_NO), False: _sentences(rng, WORDS_EN)}
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    started = time.perf_counter()
+    job_id = 400_000_000
+    for offset in range(0, rows, CHUNK):
+        chunk = []
+        for _ in range(min(CHUNK, rows - offset)):
+            job_id += rng.randint(1, 40)
+            chunk.append(_row(rng, job_id, today, pools))
+        conn.executemany(
+            """
+            INSERT INTO scraped_jobs (ID, title, employer, full_description, date_added, deadline,
+                                      location, contact, phone, link, status, called, score,
+                                      compact_description, desc_tokens, compact_tokens)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            chunk,
+        )
+        conn.commit()
+    # A real database has no ID log older than its last known-ID snapshot (see known_ids.py)
+    conn.execute("DELETE FROM id_log")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"🧬 Generated {rows} jobs in {time.perf_counter() - started:.1f}s -> {path}")
+    return path
+
+
+def dataset_path(rows, seed=1):
+    return os.path.abspath(os.path.join(DATASET_DIR, f"jobs_{rows}_s{seed}_v{GENERATOR_VERSION}.db"))
+
+
+def cached(rows, seed=1):
+    """Path to the dataset for (rows, seed), generated on first use."""
+    path = dataset_path(rows, seed)
+    if not os.path.exists(path):
+        build(path + ".tmp", rows, seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic scraped_jobs database.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="Database path (default: cached under output/benchmarks/datasets/).")
+    args = parser.parse_args()
+    if args.out:
+        build(args.out, args.rows, args.seed)
+    else:
+        print(cached(args.rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -27,9 +27,12 @@ SEARCH_QUERIES = [
 DATA_DIR = "data"
 OUTPUT_DIR = "output"
 
-# Automatically create folders when config is imported
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+def ensure_dirs():
+    """Creates the data/output folders. Called by main.py, not on import."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
 
 TXT_FILENAME = os.path.join(OUTPUT_DIR, "jobs_for_gemini.txt")
 EXCEL_FILENAME = os.path.join(DATA_DIR, "job_application_tracker.xlsx")
@@ -65,3 +68,81 @@ STATUS_OPTIONS = [
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
+
+# --- AI Settings ---
+# Number of evaluation requests kept in flight at once
+AI_CONCURRENCY_GEMINI = 4
+AI_CONCURRENCY_LOCAL = 2  # Match LM Studio's "Max Concurrent Predictions"
+
+# Provider quotas (0 = unlimited). Gemini Flash free tier is roughly 15 RPM / 250k TPM.
+GEMINI_RPM = 15
+GEMINI_TPM = 250_000
+LOCAL_RPM = 0
+LOCAL_TPM = 0
+
+# Token budget per Gemini request. Batches are packed until either budget is full.
+AI_MAX_INPUT_TOKENS = 24_000
+AI_MAX_OUTPUT_TOKENS = 8_192
+AI_OUTPUT_TOKENS_PER_JOB = 96  # One {"match", "reason", "score"} verdict incl. headroom
+AI_MAX_DESC_TOKENS = 1_000  # Per-job description cap (~4000 chars)
+AI_CHUNK_SIZE = 500  # Pending jobs read from the DB per query (keeps memory flat on big backlogs)
+AI_QUOTA_PAUSE_S = 30  # Back-off after a 429 before the batch is retried
+AI_HTTP_TIMEOUT_S = 300  # Per request to an OpenAI-compatible local server (LOCAL_LLM_BASE_URL)
+
+# Order of the AI queue (rag/priority.py): most valuable jobs first when a budget cuts the run short
+PRIORITY_WEIGHTS = {"urgency": 0.5, "freshness": 0.2, "prescore": 0.3}
+# Cheap pre-score: profile keywords found in the title (2 points) or description (1 point)
+PRIORITY_KEYWORDS = [
+    "python", "sql", "data", "etl", "dbt", "snowflake", "airflow", "spark", "kafka",
+    "backend", "api", "aws", "gcp", "azure", "docker", "kubernetes", "machine learning",
+]
+
+# Target size of the cached, boilerplate-free description (rag/compactor.py)
+COMPACT_DESC_TOKENS = 750
+
+# Size of each copy-paste batch file in output/job_batches (fits a typical chat window)
+REPORT_BATCH_TOKENS = 30_000
+
+# --- Job boards (sources/) ---
+SOURCES = ["finn"]  # Adapters that are crawled, in parallel
+# Per-source concurrent fetches and requests per minute (defaults are on each adapter class)
+SOURCE_LIMITS = {
+    "finn": {"workers": 2, "rpm": 120},
+}
+
+# --- Streaming pipeline (python main.py --stream) ---
+PIPELINE_QUEUE_SIZE = 100  # Bound on the links / DB-write queues
+PIPELINE_AI_BACKLOG = 200  # Fetchers pause while this many jobs wait for the AI
+AI_BATCH_LINGER_S = 3  # How long a partial Gemini batch waits for more jobs
+REPORT_INTERVAL_S = 120  # Excel refresh interval while the pipeline runs
+
+# --- Dashboard (python main.py --serve) ---
+DASHBOARD_PORT = 8765
+
+# --- Watch daemon (python main.py --watch) ---
+WATCH_INTERVAL_S = 600  # How often each search query is polled
+WATCH_JITTER = 0.2  # +/- fraction of the interval, so polls don't hit finn.no in lockstep
+
+# --- Refresh of known ads (python main.py --refresh) ---
+# Ads still worth re-checking; basic rejects and finished applications are left alone
+REFRESH_STATUSES = ["Pending AI", "Not searched", "Discarded (AI)", "Sent Application", "1. Interview", "2. Interview"]
+REFRESH_SHARE_OF_TIME_LEFT = 0.25  # Next check after this share of the time until the deadline ...
+REFRESH_MIN_INTERVAL_H = 6  # ... but no more often than this (ads about to close)
+REFRESH_MAX_INTERVAL_H = 72  # ... and no less often than this (deadline weeks away)
+REFRESH_UNDATED_INTERVAL_H = 48  # "Snarest", "Se annonse", and ads just past their deadline
+REFRESH_GRACE_DAYS = 7  # Past-deadline ads are still checked this long, in case the deadline is extended
+REFRESH_MAX_AGE_DAYS = 90  # Ads older than this are no longer checked, whatever their deadline says
+REFRESH_MAX_PER_RUN = 1000  # Checks per --refresh run, most overdue first
+
+# --- Known-ID index (known_ids.py) ---
+KNOWN_IDS_SNAPSHOT = True  # Save the ID array next to the DB; later runs load it and apply only what changed
+KNOWN_IDS_BLOOM_BITS = 0  # Bits per ID of a Bloom filter in front of the binary search (0 = off; see known_ids.py)
+
+# --- AI workers (python main.py --worker / --serve-queue) ---
+WORKER_CLAIM_SIZE = 25  # Pending jobs leased per claim
+WORKER_LEASE_S = 300  # A claim expires (and is reclaimed) unless its worker heartbeats in time
+WORKER_HEARTBEAT_S = 60
+DB_BUSY_TIMEOUT_S = 30  # Workers sharing the DB file wait this long for the write lock
+QUEUE_HOST = "127.0.0.1"  # Use "0.0.0.0" (with a QUEUE_TOKEN) to serve workers on other hosts
+QUEUE_PORT = 8767
+QUEUE_TOKEN = os.getenv("JOBTRACKER_QUEUE_TOKEN")  # Shared secret workers send to the coordinator
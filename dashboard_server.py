@@ -0,0 +1,317 @@
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import config
+import database
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+CACHE_ENTRIES = 256
+
+# Statuses the dashboard may set (the Excel dropdown plus the filter outcomes)
+EDITABLE_STATUSES = config.STATUS_OPTIONS + ["Discarded (AI)", "Discarded (Basic)", "Pending AI"]
+CALLED_OPTIONS = ["Ja", "Nei", "Svarte ikke"]
+
+JOB_FIELDS = ["ID", "title", "employer", "deadline", "location", "contact", "phone", "link", "status", "called", "score", "date_added"]
+
+_local = threading.local()
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _deadline_iso(deadline):
+    """'15.3.2026' / '30.03.2026' -> '2026-03-15'; None for 'Snarest', 'Se annonse', ..."""
+    match = re.match(r"\s*(\d{1,2})\.(\d{1,2})\.(\d{4})", deadline or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _connection():
+    """One read connection per server thread."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(config.DB_FILENAME)
+        conn.create_function("deadline_iso", 1, _deadline_iso, deterministic=True)
+        _local.conn = conn
+    return conn
+
+
+def query_jobs(conn, params):
+    """
+    One page of jobs ordered by score DESC, ID DESC.
+
+    Keyset pagination: `after` is the "score:ID" cursor of the last row of the
+    previous page, so every page is one index range scan no matter how deep.
+    Filters: status (repeatable), min_score, deadline_before (YYYY-MM-DD), hide_expired.
+    """
+    where, args = [], []
+
+    statuses = params.get("status", [])
+    if statuses:
+        where.append(f"status IN ({', '.join('?' * len(statuses))})")
+        args.extend(statuses)
+
+    if params.get("min_score"):
+        where.append("COALESCE(score, 0) >= ?")
+        args.append(int(params["min_score"][0]))
+
+    if params.get("deadline_before"):
+        where.append("deadline_iso(deadline) <= ?")
+        args.append(params["deadline_before"][0])
+
+    if params.get("hide_expired", ["0"])[0] not in ("", "0", "false"):
+        where.append("(deadline_iso(deadline) IS NULL OR deadline_iso(deadline) >= ?)")
+        args.append(datetime.now().strftime("%Y-%m-%d"))
+
+    if params.get("after"):
+        score, job_id = (int(part) for part in params["after"][0].split(":"))
+        where.append("(COALESCE(score, 0) < ? OR (COALESCE(score, 0) = ? AND ID < ?))")
+        args.extend([score, score, job_id])
+
+    # int() raises ValueError on junk, which the handler answers with 400; 0 or less would
+    # return an empty page whose cursor points at rows[-1] (or no page at all for -1)
+    limit = max(1, min(int(params.get("limit", [DEFAULT_PAGE_SIZE])[0]), MAX_PAGE_SIZE))
+    rows = conn.execute(
+        f"""
+        SELECT ID, title, employer, deadline, location, contact, phone, link, status,
+               COALESCE(called, 'Nei'), COALESCE(score, 0), date_added
+        FROM scraped_jobs
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY COALESCE(score, 0) DESC, ID DESC
+        LIMIT ?
+        """,
+        args + [limit + 1],
+    ).fetchall()
+
+    jobs = [dict(zip(JOB_FIELDS, row)) for row in rows[:limit]]
+    next_cursor = f"{jobs[-1]['score']}:{jobs[-1]['ID']}" if len(rows) > limit else None
+    return {"jobs": jobs, "next": next_cursor}
+
+
+def query_stats(conn, params):
+    rows = conn.execute(
+        "SELECT status, COUNT(*) FROM scraped_jobs GROUP BY status ORDER BY COUNT(*) DESC"
+    ).fetchall()
+    return {"statuses": dict(rows), "total": sum(count for _, count in rows)}
+
+
+ROUTES = {
+    "/api/jobs": query_jobs,
+    "/api/stats": query_stats,
+}
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    server_version = "JobTrackerDashboard/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for the tracker's own output
+
+    def _send(self, code, body=b"", content_type="application/json", etag=None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if code != 304:
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if code != 304:
+            self.wfile.write(body)
+
+    def _send_json(self, code, payload):
+        self._send(code, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/":
+            self._send(200, DASHBOARD_HTML.encode("utf-8"), content_type="text/html")
+            return
+
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        conn = _connection()
+        version = database.get_data_version(conn)
+        etag = f'"v{version}"'
+        # Nothing written since the client's copy: no query at all
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, etag=etag)
+            return
+
+        key = (url.path, url.query)
+        with _cache_lock:
+            cached = _cache.get(key)
+        if cached and cached[0] == version:
+            body = cached[1]
+        else:
+            try:
+                payload = handler(conn, parse_qs(url.query))
+            except ValueError as e:
+                self._send_json(400, {"error": f"bad parameter: {e}"})
+                return
+            payload["version"] = version
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            with _cache_lock:
+                if len(_cache) >= CACHE_ENTRIES:
+                    _cache.clear()
+                _cache[key] = (version, body)
+
+        self._send(200, body, etag=etag)
+
+    def _same_origin(self):
+        """
+        True if the request names this server in Host (and Origin, when a browser sends
+        one). Another site's page can't make the browser send that, and a DNS-rebound
+        hostname fails the Host check.
+        """
+        host, port = self.server.server_address[:2]
+        allowed = {f"{name}:{port}" for name in (host, "localhost", "127.0.0.1")}
+        origin = self.headers.get("Origin")
+        if origin is not None and urlsplit(origin).netloc not in allowed:
+            return False
+        return self.headers.get("Host") in allowed
+
+    def do_POST(self):
+        # POST /api/jobs/<ID> {"status": ..., "called": ...}
+        match = re.fullmatch(r"/api/jobs/(\d+)", urlsplit(self.path).path)
+        if not match:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        if not self._same_origin():
+            self._send_json(403, {"error": "cross-origin request"})
+            return
+        # Plain form posts can't set this type, so it also blocks cross-site forms
+        if self.headers.get("Content-Type", "").split(";")[0].strip().lower() != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        status, called = data.get("status"), data.get("called")
+        if status is not None and status not in EDITABLE_STATUSES:
+            self._send_json(400, {"error": f"unknown status: {status}"})
+            return
+        if called is not None and called not in CALLED_OPTIONS:
+            self._send_json(400, {"error": f"unknown 'called' value: {called}"})
+            return
+
+        changed = database.update_job_status(int(match.group(1)), status=status, called=called)
+        self._send_json(200, {"changed": changed, "version": database.get_data_version(_connection())})
+
+
+def serve(host="127.0.0.1", port=None):
+    """Runs the dashboard until Ctrl-C. Binds to localhost only."""
+    port = port or config.DASHBOARD_PORT
+    server = ThreadingHTTPServer((host, port), DashboardHandler)
+    print(f"📊 Dashboard running at http://{host}:{port}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Dashboard stopped.")
+    finally:
+        server.server_close()
+
+
+DASHBOARD_HTML = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Job Tracker</title>
+<style>
+  body { background: #1e1e1e; color: #e0e0e0; font-family: sans-serif; margin: 1.5em; }
+  table { border-collapse: collapse; width: 100%; }
+  th, td { border-bottom: 1px solid #333; padding: 4px 8px; text-align: left; }
+  th { background: #2d2d2d; }
+  a { color: #6cb6ff; }
+  select, input, button { background: #2d2d2d; color: #e0e0e0; border: 1px solid #444; }
+</style>
+</head>
+<body>
+<h2>Job Tracker</h2>
+<p id="stats"></p>
+<form id="filters">
+  Status <select name="status"><option value="">(all)</option>STATUS_OPTIONS</select>
+  Min score <input name="min_score" type="number" min="0" max="10" style="width:4em">
+  Deadline before <input name="deadline_before" type="date">
+  <label><input name="hide_expired" type="checkbox" value="1" checked> Hide expired</label>
+  <button>Apply</button>
+</form>
+<table>
+  <thead><tr><th>Score</th><th>Title</th><th>Employer</th><th>Deadline</th><th>Location</th><th>Status</th><th>Called</th></tr></thead>
+  <tbody id="rows"></tbody>
+</table>
+<button id="more" hidden>Load more</button>
+<script>
+const STATUSES = JSON_STATUSES, CALLED = JSON_CALLED;
+let next = null;
+
+function select(options, value, onChange) {
+  const el = document.createElement("select");
+  for (const o of options) el.add(new Option(o, o, false, o === value));
+  el.onchange = () => onChange(el.value);
+  return el;
+}
+
+function save(id, body) {
+  fetch(`/api/jobs/${id}`, {
+    method: "POST", headers: {"Content-Type": "application/json"}, body: JSON.stringify(body),
+  }).then(loadStats);
+}
+
+async function load(append) {
+  const params = new URLSearchParams(new FormData(document.getElementById("filters")));
+  for (const [k, v] of [...params]) if (!v) params.delete(k);
+  if (append && next) params.set("after", next);
+  const data = await (await fetch(`/api/jobs?${params}`)).json();
+  const tbody = document.getElementById("rows");
+  if (!append) tbody.innerHTML = "";
+  for (const job of data.jobs) {
+    const tr = tbody.insertRow();
+    tr.insertCell().textContent = job.score;
+    const a = document.createElement("a");
+    a.href = job.link; a.target = "_blank"; a.textContent = job.title;
+    tr.insertCell().append(a);
+    for (const f of ["employer", "deadline", "location"]) tr.insertCell().textContent = job[f] || "";
+    tr.insertCell().append(select(STATUSES, job.status, v => save(job.ID, {status: v})));
+    tr.insertCell().append(select(CALLED, job.called, v => save(job.ID, {called: v})));
+  }
+  next = data.next;
+  document.getElementById("more").hidden = !next;
+}
+
+async function loadStats() {
+  const data = await (await fetch("/api/stats")).json();
+  document.getElementById("stats").textContent =
+    `${data.total} jobs: ` + Object.entries(data.statuses).map(([s, n]) => `${s} ${n}`).join(" · ");
+}
+
+document.getElementById("filters").onsubmit = e => { e.preventDefault(); load(false); };
+document.getElementById("more").onclick = () => load(true);
+document.querySelector("[name=status]").value = "Not searched";
+load(false); loadStats();
+</script>
+</body>
+</html>
+""".replace(
+    "STATUS_OPTIONS", "".join(f"<option>{s}</option>" for s in EDITABLE_STATUSES)
+).replace(
+    "JSON_STATUSES", json.dumps(EDITABLE_STATUSES)
+).replace(
+    "JSON_CALLED", json.dumps(CALLED_OPTIONS)
+)
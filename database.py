@@ -1,8 +1,13 @@
 import sqlite3
-import pandas as pd
 import os
+import time
 from datetime import datetime
 import config
+import metrics
+from rag.batching import estimate_tokens, truncate_to_tokens
+from rag import dedup, priority
+from rag.compactor import compact_description
+import known_ids
 
 def get_db_connection():
     return sqlite3.connect(config.DB_FILENAME)
@@ -52,12 +57,23 @@ def _create_new_table(cursor):
             link TEXT,
             status TEXT,
             called TEXT DEFAULT 'Nei',
-            score INTEGER DEFAULT 0  -- <--- NEW COLUMN
+            score INTEGER DEFAULT 0,  -- <--- NEW COLUMN
+            compact_description TEXT,  -- LLM-ready description (see rag/compactor.py)
+            desc_tokens INTEGER,
+            compact_tokens INTEGER,
+            cluster_id INTEGER,  -- Near-duplicate cluster (see rag/dedup.py)
+            source TEXT DEFAULT 'finn',  -- Job board adapter (see sources/)
+            prescore REAL,  -- Keyword pre-score, set at insert (see rag/priority.py)
+            priority REAL DEFAULT 0,  -- AI queue order, refreshed before each AI phase
+            lease_owner TEXT,  -- AI worker that claimed the pending job (see claim_ai_chunk)
+            lease_expires REAL,  -- Unix time the claim runs out unless renewed
+            removed_at TEXT  -- When a refresh found the ad taken down (see refresh.py)
         )
     ''')
 
 def setup_database():
     """Checks schema and runs migration if necessary."""
+    config.ensure_dirs()
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -86,15 +102,162 @@ def setup_database():
                 cursor.execute("ALTER TABLE scraped_jobs ADD COLUMN score INTEGER DEFAULT 0")
             except Exception as e: print(f"Error adding score: {e}")
 
+        # 3. Add compaction cache / cluster columns if missing
+        for column, col_type in [('compact_description', 'TEXT'), ('desc_tokens', 'INTEGER'), ('compact_tokens', 'INTEGER'), ('cluster_id', 'INTEGER'), ('source', "TEXT DEFAULT 'finn'"), ('prescore', 'REAL'), ('priority', 'REAL DEFAULT 0'), ('lease_owner', 'TEXT'), ('lease_expires', 'REAL'), ('removed_at', 'TEXT')]:
+            if column not in col_names:
+                print(f"⚠️ Adding '{column}' column...")
+                try:
+                    cursor.execute(f"ALTER TABLE scraped_jobs ADD COLUMN {column} {col_type}")
+                except Exception as e: print(f"Error adding {column}: {e}")
+
         # Legacy ID check
         id_type = next((col[2] for col in columns_info if col[1] == 'ID'), 'TEXT')
         if id_type == 'TEXT':
             print("⚠️ Migrating legacy ID types...")
             _migrate_schema(conn, cursor)
 
+    _create_aux_tables(cursor)
+
     conn.commit()
     conn.close()
 
+def _create_aux_tables(cursor):
+    """Side tables that don't need migrations (created if missing)."""
+    # One row per AI request, so batch packing can be tuned against real token counts
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_at TEXT,
+            provider TEXT,
+            jobs INTEGER,
+            est_input_tokens INTEGER,
+            prompt_tokens INTEGER,
+            output_tokens INTEGER,
+            latency_ms INTEGER,
+            parsed INTEGER
+        )
+    ''')
+
+    # Small key/value store for run bookkeeping (export hashes etc.)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+    # Near-duplicate detection: MinHash signature per ad + banded LSH buckets
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_minhash (
+            job_id INTEGER PRIMARY KEY,
+            signature BLOB
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band INTEGER,
+            bucket INTEGER,
+            job_id INTEGER
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets (band, bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_job ON lsh_buckets (job_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_cluster ON scraped_jobs (cluster_id)")
+    # An ad's signature and buckets go with it, whoever deletes it (expiry cleanup, fix_db.py)
+    has_dedup_trigger = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_jobs_dedup_delete'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jobs_dedup_delete
+        AFTER DELETE ON scraped_jobs
+        BEGIN
+            DELETE FROM job_minhash WHERE job_id = OLD.ID;
+            DELETE FROM lsh_buckets WHERE job_id = OLD.ID;
+        END
+    ''')
+    if not has_dedup_trigger:
+        # Left behind by deletes from before the trigger
+        cursor.execute("DELETE FROM job_minhash WHERE job_id NOT IN (SELECT ID FROM scraped_jobs)")
+        cursor.execute("DELETE FROM lsh_buckets WHERE job_id NOT IN (SELECT ID FROM scraped_jobs)")
+
+    # Per-profile verdicts from --multi-profile runs (scraped_jobs.score holds the best of them)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_scores (
+            job_id INTEGER,
+            profile_id TEXT,
+            score INTEGER,
+            match INTEGER,
+            PRIMARY KEY (job_id, profile_id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_scores_profile ON job_scores (profile_id, match, score)")
+
+    # Keyset pagination for the dashboard (dashboard_server.py): score DESC, ID DESC
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_score ON scraped_jobs (COALESCE(score, 0) DESC, ID DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_score ON scraped_jobs (status, COALESCE(score, 0) DESC, ID DESC)")
+
+    # Keyset chunks of the AI backlog in priority order (iter_pending_ai)
+    cursor.execute("DROP INDEX IF EXISTS idx_jobs_status_id")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_priority ON scraped_jobs (status, priority DESC, ID)")
+    # Only live claims are indexed (verdicts clear the lease), so finding expired ones stays cheap
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_lease ON scraped_jobs (lease_expires) WHERE lease_expires IS NOT NULL"
+    )
+
+    # Refresh bookkeeping per ad (refresh.py), kept out of scraped_jobs so a check that
+    # finds nothing new doesn't bump data_version. next_check is NULL once an ad is retired.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ad_refresh (
+            job_id INTEGER PRIMARY KEY,
+            content_hash TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            last_checked REAL,
+            next_check REAL,
+            failures INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ad_refresh_due ON ad_refresh (next_check) WHERE next_check IS NOT NULL"
+    )
+
+    # Change counter: bumped by every write to scraped_jobs, used as the dashboard's ETag
+    cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', '0')")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_jobs_version_{event.lower()}
+            AFTER {event} ON scraped_jobs
+            BEGIN
+                UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'data_version';
+            END
+        ''')
+
+    # Inserted / deleted IDs since the last known-ID snapshot (known_ids.py prunes what it has applied)
+    cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('db_id', lower(hex(randomblob(16))))")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS id_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER,
+            added INTEGER
+        )
+    ''')
+    for event, row, added in (('INSERT', 'NEW', 1), ('DELETE', 'OLD', 0)):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_id_log_{event.lower()}
+            AFTER {event} ON scraped_jobs
+            BEGIN
+                INSERT INTO id_log (job_id, added) VALUES ({row}.ID, {added});
+            END
+        ''')
+
+    # Status edits made in the dashboard, so an older Excel file can't overwrite them on --sync
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_edits (
+            job_id INTEGER PRIMARY KEY,
+            edited_at REAL
+        )
+    ''')
+
 def _migrate_schema(conn, cursor):
     """Refactors the database to use INTEGER IDs and proper columns."""
     try:
@@ -158,32 +321,486 @@ def cleanup_expired_jobs():
     finally:
         conn.close()
 
-def get_existing_ids():
+def get_meta(key, default=None):
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+    except sqlite3.OperationalError:
+        return default
+    finally:
+        conn.close()
+
+def set_meta(key, value):
+    conn = get_db_connection()
+    try:
+        conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_data_version(conn):
+    """Current value of the scraped_jobs change counter (see _create_aux_tables)."""
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+    return int(row[0]) if row else 0
+
+def update_job_status(job_id, status=None, called=None):
+    """
+    Writes a status / 'Har ringt' edit straight to the DB (dashboard edits).
+    Returns True if the row changed.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE scraped_jobs
+            SET status = COALESCE(?1, status), called = COALESCE(?2, called)
+            WHERE ID = ?3
+              AND (status IS NOT COALESCE(?1, status) OR called IS NOT COALESCE(?2, called))
+        ''', (status, called, job_id))
+        changed = cursor.rowcount > 0
+        if changed:
+            conn.execute(
+                "INSERT OR REPLACE INTO dashboard_edits (job_id, edited_at) VALUES (?, ?)",
+                (job_id, datetime.now().timestamp())
+            )
+        conn.commit()
+        return changed
+    finally:
+        conn.close()
+
+def save_job_scores(cursor, job_id, profiles):
+    """
+    Stores {profile_id: verdict} for a job and for its still-pending near-duplicates
+    (they inherit the verdict in the same pass, see main.run_ai_phase).
+    """
+    cursor.executemany('''
+        INSERT OR REPLACE INTO job_scores (job_id, profile_id, score, match)
+        SELECT ID, ?2, ?3, ?4 FROM scraped_jobs
+        WHERE ID = ?1
+           OR (status = 'Pending AI' AND cluster_id = (SELECT cluster_id FROM scraped_jobs WHERE ID = ?1))
+    ''', [
+        (int(job_id), profile_id, verdict["score"], int(verdict["match"]))
+        for profile_id, verdict in profiles.items()
+    ])
+
+def copy_cluster_scores(cursor, job_id, cluster_id):
+    """Gives a near-duplicate the per-profile scores of its already evaluated cluster members."""
+    cursor.execute('''
+        INSERT OR IGNORE INTO job_scores (job_id, profile_id, score, match)
+        SELECT ?, s.profile_id, MAX(s.score), MAX(s.match)
+        FROM job_scores s JOIN scraped_jobs j ON j.ID = s.job_id
+        WHERE j.cluster_id = ? AND j.ID != ?
+        GROUP BY s.profile_id
+    ''', (job_id, cluster_id, job_id))
+
+def save_ai_verdicts(cursor, batch, ai_results, worker_id=None):
+    """
+    Writes the verdicts of one AI batch (jobs as sent to the model) and copies
+    them to still-pending near-duplicates. Jobs without a verdict stay 'Pending AI'.
+
+    With a `worker_id` (work_queue.py), only jobs that worker still holds a lease on
+    are written; a verdict for a job whose lease ran out and was claimed again is
+    dropped. Returns the number of dropped verdicts.
+    """
+    stale = 0
+    for job in batch:
+        job_id = job['id']
+        result = ai_results.get(job_id)
+
+        if result is None:
+            print(f"      ⏭️  Skipped (AI failed): {job['title']}")
+            metrics.inc("ai_verdicts_total", result="failed")
+            continue  # stays as 'Pending AI'
+
+        if worker_id is not None and cursor.execute(
+            "SELECT 1 FROM scraped_jobs WHERE ID = ? AND lease_owner = ? AND status = 'Pending AI'",
+            (job_id, worker_id),
+        ).fetchone() is None:
+            print(f"      ⌛ Dropped (lease lost): {job['title']}")
+            metrics.inc("ai_verdicts_total", result="stale")
+            stale += 1
+            continue
+
+        score = result.get('score', 0)
+
+        if 'profiles' in result:
+            # Before the status update below, so pending near-duplicates are still found
+            save_job_scores(cursor, job_id, result['profiles'])
+            print("      🎯 " + ", ".join(
+                f"{pid}: {v['score']}{' ✓' if v['match'] else ''}" for pid, v in result['profiles'].items()
+            ))
+
+        if result.get('match'):
+            new_status = 'Not searched'
+            metrics.inc("ai_verdicts_total", result="approved")
+            print(f"      👍 Approved (Score: {score}): {job['title']}")
+        else:
+            new_status = 'Discarded (AI)'
+            metrics.inc("ai_verdicts_total", result="rejected")
+            print(f"      👎 Rejected (Score: {score}): {job['title']} ({result.get('reason')})")
+
+        cursor.execute(
+            """
+            UPDATE scraped_jobs SET status = ?, score = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE ID = ? AND (?4 IS NULL OR lease_owner = ?4)
+            """,
+            (new_status, score, job_id, worker_id)
+        )
+        # Pending near-duplicates share the verdict
+        cursor.execute('''
+            UPDATE scraped_jobs SET status = ?, score = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE status = 'Pending AI'
+              AND cluster_id = (SELECT cluster_id FROM scraped_jobs WHERE ID = ?)
+        ''', (new_status, score, job_id))
+    return stale
+
+# AI verdicts that go back to 'Pending AI' when a refresh finds a new description
+# (statuses the user set, like 'Sent Application', are kept)
+REQUEUE_STATUSES = ('Not searched', 'Discarded (AI)')
+
+def update_refreshed_job(cursor, job_id, details, description_changed):
+    """
+    Writes the re-fetched fields of a known ad (refresh.py) and re-indexes it for
+    near-duplicate detection (title, employer and text make up its MinHash). A changed
+    description is compacted and pre-scored again, and a verdict on the old text is
+    re-queued for the AI. Returns True if the job went back to 'Pending AI'.
+    """
+    cursor.execute('''
+        UPDATE scraped_jobs SET title = ?, employer = ?, deadline = ?, location = ?, contact = ?, phone = ?
+        WHERE ID = ?
+    ''', (
+        details['Stillingstittel'],
+        details['Arbeidsgiver'],
+        details['Søknadsfrist'],
+        details['Arbeidssted'],
+        details['Kontaktperson'],
+        details['Mobil'],
+        job_id
+    ))
+    dedup.reindex_job(
+        cursor, job_id, details['Stillingstittel'], details['Arbeidsgiver'], details['Full beskrivelse']
+    )
+    if not description_changed:
+        return False
+
+    description = details['Full beskrivelse']
+    compacted, desc_tokens, compact_tokens = _compact(description)
+    cursor.execute('''
+        UPDATE scraped_jobs
+        SET full_description = ?, compact_description = ?, desc_tokens = ?, compact_tokens = ?, prescore = ?
+        WHERE ID = ?
+    ''', (
+        description, compacted, desc_tokens, compact_tokens,
+        priority.prescore(details['Stillingstittel'], description), job_id
+    ))
+    cursor.execute(
+        f"UPDATE scraped_jobs SET status = 'Pending AI' WHERE ID = ? AND status IN ({', '.join('?' * len(REQUEUE_STATUSES))})",
+        (job_id, *REQUEUE_STATUSES)
+    )
+    return cursor.rowcount > 0
+
+def mark_job_removed(cursor, job_id):
+    """Flags an ad its board no longer serves; the row (and its status) is kept."""
+    cursor.execute(
+        "UPDATE scraped_jobs SET removed_at = ? WHERE ID = ? AND removed_at IS NULL",
+        (datetime.now().isoformat(timespec="seconds"), job_id)
+    )
+
+# The columns every AI path reads for a pending job
+PENDING_AI_COLUMNS = "ID, title, COALESCE(compact_description, full_description), employer, cluster_id, priority"
+
+# Pending jobs nobody holds a live claim on (an --worker process may be evaluating the others)
+PENDING_AI_SQL = f"""
+    SELECT {PENDING_AI_COLUMNS}
+    FROM scraped_jobs WHERE status = 'Pending AI'
+      AND (lease_expires IS NULL OR lease_expires < CAST(strftime('%s', 'now') AS REAL))
+"""
+
+def refresh_ai_priorities(conn):
+    """
+    Recomputes the priority of every pending job (deadline urgency changes daily)
+    and fills in pre-scores of rows from before priorities existed.
+    """
+    conn.create_function("ai_prescore", 2, priority.prescore, deterministic=True)
+    conn.create_function("ai_priority", 3, priority.priority)
+    conn.execute("""
+        UPDATE scraped_jobs SET prescore = ai_prescore(title, COALESCE(compact_description, full_description))
+        WHERE status = 'Pending AI' AND prescore IS NULL
+    """)
+    conn.execute("""
+        UPDATE scraped_jobs SET priority = ai_priority(deadline, date_added, prescore)
+        WHERE status = 'Pending AI'
+    """)
+    conn.commit()
+
+def iter_pending_ai(conn, chunk_size=None):
+    """
+    Yields the 'Pending AI' rows (see PENDING_AI_SQL) highest priority first, one chunk
+    at a time. Keyset pagination on (priority DESC, ID): each chunk is its own small
+    index range scan, so memory stays flat however large the backlog is, and rows that
+    leave 'Pending AI' meanwhile are not returned.
+    """
+    chunk_size = chunk_size or config.AI_CHUNK_SIZE
+    rows = conn.execute(
+        PENDING_AI_SQL + " ORDER BY priority DESC, ID LIMIT ?", (chunk_size,)
+    ).fetchall()
+    while rows:
+        yield rows
+        last_priority, last_id = rows[-1][5], rows[-1][0]
+        rows = conn.execute(
+            PENDING_AI_SQL + """
+              AND priority <= ? AND (priority < ? OR ID > ?)
+            ORDER BY priority DESC, ID LIMIT ?
+            """,
+            (last_priority, last_priority, last_id, chunk_size),
+        ).fetchall()
+
+def claim_ai_chunk(conn, worker_id, limit=None, lease_s=None):
+    """
+    Leases up to `limit` unclaimed 'Pending AI' jobs to `worker_id`, highest priority
+    first, and returns them as PENDING_AI_SQL rows. BEGIN IMMEDIATE takes the write
+    lock before the rows are picked, so concurrent workers (threads, processes or
+    hosts sharing the file) never get the same job. Leases that ran out because their
+    worker died are reclaimed in the same transaction.
+    """
+    limit = limit or config.WORKER_CLAIM_SIZE
+    now = time.time()
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        reclaimed = conn.execute(
+            """
+            UPDATE scraped_jobs SET lease_owner = NULL, lease_expires = NULL
+            WHERE lease_expires IS NOT NULL AND lease_expires < ? AND status = 'Pending AI'
+            """,
+            (now,),
+        ).rowcount
+        if reclaimed:
+            print(f"♻️ Reclaimed {reclaimed} jobs from expired AI worker leases.")
+            metrics.inc("ai_leases_reclaimed_total", reclaimed)
+
+        expires = now + (lease_s or config.WORKER_LEASE_S)
+        conn.execute(
+            f"""
+            UPDATE scraped_jobs SET lease_owner = ?, lease_expires = ?
+            WHERE ID IN (SELECT ID FROM ({PENDING_AI_SQL}) ORDER BY priority DESC, ID LIMIT ?)
+            """,
+            (worker_id, expires, limit),
+        )
+        rows = conn.execute(
+            f"""
+            SELECT {PENDING_AI_COLUMNS} FROM scraped_jobs
+            WHERE status = 'Pending AI' AND lease_owner = ? AND lease_expires = ?
+            ORDER BY priority DESC, ID
+            """,
+            (worker_id, expires),
+        ).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    metrics.inc("ai_leases_claimed_total", len(rows))
+    return rows
+
+def renew_ai_leases(conn, worker_id, job_ids, lease_s=None):
+    """
+    Heartbeat: pushes out the expiry of the jobs `worker_id` still has in flight. Jobs
+    left out (their evaluation failed) run out as a back-off. Returns the count.
+    """
+    expires = time.time() + (lease_s or config.WORKER_LEASE_S)
+    renewed = conn.executemany(
+        """
+        UPDATE scraped_jobs SET lease_expires = ?
+        WHERE ID = ? AND lease_owner = ? AND status = 'Pending AI'
+        """,
+        [(expires, int(job_id), worker_id) for job_id in job_ids],
+    ).rowcount
+    conn.commit()
+    return renewed
+
+def release_ai_leases(conn, worker_id, job_ids):
+    """Hands claimed jobs that were never sent back to the queue. Returns the count."""
+    released = 0
+    for job_id in job_ids:
+        released += conn.execute(
+            """
+            UPDATE scraped_jobs SET lease_owner = NULL, lease_expires = NULL
+            WHERE ID = ? AND lease_owner = ? AND status = 'Pending AI'
+            """,
+            (int(job_id), worker_id),
+        ).rowcount
+    conn.commit()
+    return released
+
+def ai_lease_status(conn):
+    """{'pending': unclaimed + expired count, 'leased': {worker_id: live claims}}."""
+    leased = dict(conn.execute(
+        """
+        SELECT lease_owner, COUNT(*) FROM scraped_jobs
+        WHERE status = 'Pending AI' AND lease_expires >= ? GROUP BY lease_owner
+        """,
+        (time.time(),),
+    ).fetchall())
+    total = conn.execute("SELECT COUNT(*) FROM scraped_jobs WHERE status = 'Pending AI'").fetchone()[0]
+    return {"pending": total - sum(leased.values()), "leased": leased}
+
+def report_ai_backlog(conn, stopped=None, show=5):
+    """Prints what the AI didn't get to this run, most urgent first. Returns the count."""
+    remaining = conn.execute("SELECT COUNT(*) FROM scraped_jobs WHERE status = 'Pending AI'").fetchone()[0]
+    metrics.set_gauge("ai_backlog_remaining", remaining)
+    if not remaining:
+        return 0
+
+    closing_soon = 0
+    for (deadline,) in conn.execute("SELECT deadline FROM scraped_jobs WHERE status = 'Pending AI'"):
+        days = priority.days_left(deadline)
+        closing_soon += days is not None and 0 <= days <= 3
+    reason = f" ({stopped})" if stopped else ""
+    print(f"⏸️ {remaining} jobs left 'Pending AI' for the next run{reason}, {closing_soon} closing within 3 days.")
+    for title, employer, deadline in conn.execute(
+        """
+        SELECT title, employer, deadline FROM scraped_jobs
+        WHERE status = 'Pending AI' ORDER BY priority DESC, ID LIMIT ?
+        """,
+        (show,),
+    ):
+        print(f"   - {title} ({employer}), deadline {deadline}")
+    return remaining
+
+def pending_ai_job(row):
+    """A PENDING_AI_SQL row -> the job dict sent to the model."""
+    return {
+        "id": str(row[0]),
+        "title": row[1],
+        "employer": row[3],
+        "description": truncate_to_tokens(row[2], config.AI_MAX_DESC_TOKENS),
+    }
+
+def record_ai_batch(cursor, provider, job_count, parsed_count, meta):
+    """Logs the token numbers of one AI request (see ai_batches)."""
+    cursor.execute('''
+        INSERT INTO ai_batches (
+            run_at, provider, jobs, est_input_tokens, prompt_tokens, output_tokens, latency_ms, parsed
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        datetime.now().isoformat(timespec="seconds"),
+        provider,
+        job_count,
+        meta.get("est_input_tokens"),
+        meta.get("prompt_tokens"),
+        meta.get("output_tokens"),
+        meta.get("latency_ms"),
+        parsed_count
+    ))
+
+def _compact(description):
+    """Returns (compact_description, desc_tokens, compact_tokens) for one ad."""
+    compacted = compact_description(description or "", config.COMPACT_DESC_TOKENS)
+    return compacted, estimate_tokens(description), estimate_tokens(compacted)
+
+def compact_missing_descriptions():
+    """
+    Fills the compaction cache for rows that don't have it yet (older rows, imports).
+    Each ad is compacted once; AI runs and text reports read compact_description.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
+    missing_sql = """
+        SELECT ID, title, full_description FROM scraped_jobs
+        WHERE compact_description IS NULL AND status != 'Discarded (Basic)'
+    """
     try:
-        cursor.execute('SELECT ID FROM scraped_jobs')
-        rows = cursor.fetchall()
-        # Return as strings for comparison with scraper, even though DB is int
-        return {str(row[0]) for row in rows}
+        count = cursor.execute(f"SELECT COUNT(*) FROM ({missing_sql})").fetchone()[0]
+        if not count:
+            return
+
+        print(f"🗜️ Compacting {count} descriptions...")
+        total_before = total_after = 0
+        last_id = -1
+        # Keyset-paginated and committed per chunk, so a big backlog never sits in memory at once
+        while True:
+            rows = cursor.execute(
+                missing_sql + " AND ID > ? ORDER BY ID LIMIT ?", (last_id, config.AI_CHUNK_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            for job_id, title, description in rows:
+                compacted, before, after = _compact(description)
+                cursor.execute(
+                    "UPDATE scraped_jobs SET compact_description = ?, desc_tokens = ?, compact_tokens = ? WHERE ID = ?",
+                    (compacted, before, after, job_id)
+                )
+                total_before += before
+                total_after += after
+                print(f"   - {title}: {before} -> {after} tokens (saved {before - after})")
+            conn.commit()
+            last_id = rows[-1][0]
+
+        print(f"✅ Compaction saved {total_before - total_after} of {total_before} tokens.")
     finally:
         conn.close()
 
-def add_job_to_db(details):
+def index_missing_clusters():
+    """Adds ads that aren't in the LSH index yet (rows from before clustering existed)."""
     conn = get_db_connection()
     cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT ID, title, employer, full_description FROM scraped_jobs
+            WHERE ID NOT IN (SELECT job_id FROM job_minhash)
+            ORDER BY ID
+        """)
+        rows = cursor.fetchall()
+        if not rows:
+            return
+
+        print(f"🧬 Indexing {len(rows)} ads for near-duplicate detection...")
+        duplicates = 0
+        for job_id, title, employer, description in rows:
+            cluster_id, _ = dedup.index_job(cursor, job_id, title, employer, description)
+            if cluster_id != job_id:
+                duplicates += 1
+        conn.commit()
+        print(f"✅ Indexed. {duplicates} ads joined an existing cluster.")
+    finally:
+        conn.close()
+
+def get_existing_ids():
+    """
+    Every known ad ID, as a compact known_ids.KnownIds (8 bytes per ID, loaded from a
+    snapshot when there is one). Takes the scraper's str IDs for `in` and `add`.
+    """
+    return known_ids.load()
+
+def add_job_to_db(details, conn=None):
+    """Inserts one scraped ad. Pass `conn` to reuse a long-lived connection (it is left open)."""
+    with metrics.timer("db_write_ms", op="add_job"):
+        _add_job_to_db(details, conn)
+
+def _add_job_to_db(details, shared_conn=None):
+    conn = shared_conn or get_db_connection()
+    cursor = conn.cursor()
     
     # Ensure date_added is stored as ISO YYYY-MM-DD for the DATE column
     # The scraper gives us strings, so we re-generate or parse.
     iso_date = datetime.now().strftime("%Y-%m-%d")
 
+    # Compact once at insert time; basic rejects never reach the LLM or the reports
+    compacted = desc_tokens = compact_tokens = prescore = None
+    if details['Status'] != 'Discarded (Basic)':
+        compacted, desc_tokens, compact_tokens = _compact(details['Full beskrivelse'])
+        prescore = priority.prescore(details['Stillingstittel'], details['Full beskrivelse'])
+        print(f"     🗜️ Compacted description: {desc_tokens} -> {compact_tokens} tokens")
+
     try:
         cursor.execute('''
             INSERT OR IGNORE INTO scraped_jobs (
                 ID, title, employer, full_description, date_added,
-                deadline, location, contact, phone, link, status
+                deadline, location, contact, phone, link, status,
+                compact_description, desc_tokens, compact_tokens, source, prescore
             ) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             int(details['ID']),  # Force Integer
             details['Stillingstittel'], 
@@ -195,15 +812,46 @@ def add_job_to_db(details):
             details['Kontaktperson'],
             details['Mobil'],
             details['Lenke'],
-            details['Status']
+            details['Status'],
+            compacted,
+            desc_tokens,
+            compact_tokens,
+            details.get('Kilde', 'finn'),
+            prescore
         ))
-        conn.commit()
+
+        inserted = cursor.rowcount > 0
+        if inserted:
+            cluster_id, sim = dedup.index_job(
+                cursor, int(details['ID']), details['Stillingstittel'], details['Arbeidsgiver'], details['Full beskrivelse']
+            )
+            if cluster_id != int(details['ID']):
+                print(f"     🧬 Near-duplicate of {cluster_id} (similarity {sim:.2f})")
+                verdict = dedup.cluster_verdict(cursor, cluster_id, exclude_id=int(details['ID']))
+                if details['Status'] == 'Pending AI' and verdict:
+                    status, score = verdict
+                    cursor.execute(
+                        "UPDATE scraped_jobs SET status = ?, score = ? WHERE ID = ?",
+                        (status, score, int(details['ID']))
+                    )
+                    copy_cluster_scores(cursor, int(details['ID']), cluster_id)
+                    details['Status'] = status
+                    print(f"     🧬 Inherited cluster verdict: {status} (Score: {score}), no AI call needed")
+                    metrics.inc("dedup_inherited_total")
+        with metrics.timer("db_commit_ms", op="add_job"):
+            conn.commit()
+        if inserted:
+            metrics.inc("db_jobs_inserted_total")
     except Exception as e:
         print(f"⚠️ DB Insert Error: {e}")
+        conn.rollback()
     finally:
-        conn.close()
+        if shared_conn is None:
+            conn.close()
 
 def get_all_jobs_dataframe():
+    import pandas as pd  # Only this helper needs pandas; keeps `import database` cheap
+
     conn = get_db_connection()
     try:
         # We assume date_added is YYYY-MM-DD in DB, but we might want dd.mm.yyyy for Excel?
@@ -231,62 +879,90 @@ def get_all_jobs_dataframe():
     finally:
         conn.close()
 
-def sync_excel_to_db():
-    """Syncs existing Excel rows to Database to prevent re-scraping old jobs."""
+def _excel_status_updates(rows, id_idx, status_idx, called_idx):
+    """Yields (status, called, ID) tuples from streamed sheet rows."""
+    for row in rows:
+        if id_idx >= len(row) or row[id_idx] in (None, ""):
+            continue
+        try:
+            job_id = int(row[id_idx])
+        except (TypeError, ValueError):
+            continue
+        status = row[status_idx] if status_idx is not None and status_idx < len(row) else None
+        called = row[called_idx] if called_idx is not None and called_idx < len(row) else None
+        yield (
+            str(status).strip() if status not in (None, "") else None,
+            str(called).strip() if called not in (None, "") else None,
+            job_id
+        )
+
+def sync_excel_to_db(batch_size=1000):
+    """
+    Pulls manual 'Status' and 'Har ringt' edits from the Excel tracker back into the DB.
+
+    The sheet is streamed with openpyxl's read_only/values_only mode: no styles,
+    no data validation, only cell values. Columns are found by header name, so
+    the sync survives column reordering. Rows whose ID isn't in the DB are ignored
+    (the database is the source of truth for job data).
+    """
     if not os.path.exists(config.EXCEL_FILENAME):
         return
 
-    print("🔄 Syncing existing Excel rows to Database...")
+    print("🔄 Syncing Excel status edits to Database...")
+    excel_mtime = os.path.getmtime(config.EXCEL_FILENAME)
     try:
-        # FIX: Read strictly as data, no formatting parsing if possible
-        # We catch the specific Value error just in case
-        try:
-            df = pd.read_excel(config.EXCEL_FILENAME, engine='openpyxl')
-        except ValueError:
-            # If openpyxl fails on formatting, we try a fallback or just pass
-            # There is no easy way to force openpyxl to ignore broken validation on read
-            # except by fixing the file or catching the error.
-            print("   - Warning: Could not parse Excel formatting. Skipping sync (Database should be source of truth).")
-            return
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(config.EXCEL_FILENAME, read_only=True, data_only=True)
+    except Exception as e:
+        print(f"   - Warning: Could not open Excel file ({e}). Skipping sync (Database is source of truth).")
+        return
 
-        if 'ID' not in df.columns:
+    conn = get_db_connection()
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), None) or ()
+        columns = {str(name).strip(): i for i, name in enumerate(header) if name is not None}
+
+        if 'ID' not in columns:
+            print("   - Warning: No 'ID' column in Excel header. Skipping sync.")
             return
 
-        conn = sqlite3.connect(config.DB_FILENAME)
-        cursor = conn.cursor()
-        count = 0
-        
-        for _, row in df.iterrows():
-            job_id = str(row.get('ID', ''))
-            
-            cursor.execute('''
-                INSERT OR IGNORE INTO scraped_jobs (
-                    ID, title, employer, full_description, date_added,
-                    deadline, location, contact, phone, short_desc, link, status
-                ) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                job_id, 
-                row.get('Stillingstittel', 'Imported'),
-                row.get('Arbeidsgiver', 'Unknown'),
-                "", 
-                row.get('Fra dato', datetime.now().strftime("%Y-%m-%d")),
-                row.get('Søknadsfrist', ''),
-                row.get('Arbeidssted', ''),
-                row.get('Kontaktperson', ''),
-                row.get('Mobil', ''),
-                row.get('Kort beskrivelse', ''),
-                row.get('Lenke', ''),
-                row.get('Status', 'Not searched')
-            ))
-            
-            if cursor.rowcount > 0:
-                count += 1
-        
-        conn.commit()
-        conn.close()
-        if count > 0:
-            print(f"   - Imported {count} existing jobs from Excel to DB.")
-            
+        # Only materialize cells up to the last column we need
+        wanted = [columns[name] for name in ('ID', 'Status', 'Har ringt') if name in columns]
+        rows = sheet.iter_rows(min_row=2, max_col=max(wanted) + 1, values_only=True)
+
+        updates = _excel_status_updates(rows, columns['ID'], columns.get('Status'), columns.get('Har ringt'))
+        changed = 0
+        batch = []
+        for update in updates:
+            batch.append(update)
+            if len(batch) >= batch_size:
+                changed += _apply_status_updates(conn, batch, excel_mtime)
+                batch = []
+        if batch:
+            changed += _apply_status_updates(conn, batch, excel_mtime)
+        with metrics.timer("db_commit_ms", op="sync"):
+            conn.commit()
+
+        if changed > 0:
+            print(f"   - Updated {changed} jobs from Excel.")
+
     except Exception as e:
         print(f"   - Warning: Could not sync Excel to DB: {e}")
+    finally:
+        workbook.close()
+        conn.close()
+
+def _apply_status_updates(conn, batch, excel_mtime=None):
+    """Returns the number of jobs changed."""
+    # Only touch rows whose values actually differ, so the rowcount counts real edits
+    # (trigger writes such as the data_version bump are not part of it).
+    # Rows edited in the dashboard after the Excel file was saved keep the dashboard value.
+    return conn.executemany('''
+        UPDATE scraped_jobs
+        SET status = COALESCE(?1, status), called = COALESCE(?2, called)
+        WHERE ID = ?3
+          AND (status IS NOT COALESCE(?1, status) OR called IS NOT COALESCE(?2, called))
+          AND NOT EXISTS (SELECT 1 FROM dashboard_edits WHERE job_id = ?3 AND edited_at > ?4)
+    ''', [(status, called, job_id, excel_mtime or 0) for status, called, job_id in batch]).rowcount
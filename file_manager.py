@@ -1,10 +1,15 @@
+import bisect
+import hashlib
+import json
 import os
 import sqlite3
 from datetime import datetime
 
-import pandas as pd
+import xlsxwriter
 
 import config
+import database
+from rag.batching import estimate_tokens, pack_by_tokens
 
 
 def _is_not_expired(deadline_str):
@@ -35,53 +40,105 @@ def _is_not_expired(deadline_str):
         return True
 
 
-def save_to_excel(ignored_argument=None):
+# Bump when the sheet layout/styling changes so unchanged data still gets rewritten
+EXCEL_LAYOUT_VERSION = "2"
+
+EXCEL_QUERY = """
+    SELECT 
+        ID, 
+        COALESCE(score, 0) AS Score,  -- <--- Added Score
+        title AS Stillingstittel, 
+        employer AS Arbeidsgiver, 
+        status AS Status, 
+        COALESCE(called, 'Nei') as 'Har ringt',
+        deadline AS Søknadsfrist, 
+        location AS Arbeidssted, 
+        contact as Kontaktperson,
+        phone as Mobil,
+        link AS Lenke{profile_columns}
+    FROM scraped_jobs 
+    WHERE status != 'Discarded (Basic)'
+    ORDER BY 
+        CASE WHEN status = 'Not searched' THEN 1 ELSE 2 END, 
+        score DESC,   -- <--- Sort by Score (High to Low)
+        title ASC
+"""
+
+# (header, width, uses score format)
+EXCEL_COLUMNS = [
+    ("ID", 5, False),
+    ("Score", 8, True),  # Score (Gold text)
+    ("Stillingstittel", 35, False),
+    ("Arbeidsgiver", 20, False),
+    ("Status", 15, False),
+    ("Har ringt", 12, False),
+    ("Søknadsfrist", 15, False),
+    ("Arbeidssted", 15, False),
+    ("Kontaktperson", 20, False),
+    ("Mobil", 12, False),
+    ("Lenke", 10, False),
+]
+
+# Per-profile score, one column per profile in job_scores (after Lenke, so the fixed
+# column letters used by the dropdowns don't move)
+PROFILE_SCORE_SQL = "(SELECT score FROM job_scores WHERE job_id = scraped_jobs.ID AND profile_id = ?)"
+
+
+def _excel_layout(conn):
+    """(query, params, columns) for the export, pivoting job_scores into 'Score <profile>' columns."""
+    try:
+        profiles = [
+            row[0] for row in conn.execute("SELECT DISTINCT profile_id FROM job_scores ORDER BY profile_id")
+        ]
+    except sqlite3.OperationalError:
+        profiles = []
+
+    query = EXCEL_QUERY.format(profile_columns="".join(f", {PROFILE_SCORE_SQL}" for _ in profiles))
+    columns = EXCEL_COLUMNS + [(f"Score {profile}", 10, True) for profile in profiles]
+    return query, profiles, columns
+
+
+def _export_hash(conn, query, params, columns):
+    """SHA-256 over the exported rows (streamed from the cursor, never held in memory)."""
+    digest = hashlib.sha256(EXCEL_LAYOUT_VERSION.encode())
+    digest.update(repr(columns).encode("utf-8"))
+    rows = 0
+    for row in conn.execute(query, params):
+        digest.update(repr(row).encode("utf-8"))
+        rows += 1
+    return digest.hexdigest(), rows
+
+
+def save_to_excel(ignored_argument=None, force=False):
     """
     Exports to Excel in DARK MODE with Dropdowns and Scores.
-    """
-    os.makedirs("data", exist_ok=True)
-    file_path = "data/job_application_tracker.xlsx"
 
-    conn = sqlite3.connect(config.DB_FILENAME)
-
-    # Fetch Data including SCORE
-    query = """
-        SELECT 
-            ID, 
-            score AS Score,  -- <--- Added Score
-            title AS Stillingstittel, 
-            employer AS Arbeidsgiver, 
-            status AS Status, 
-            called as 'Har ringt',
-            deadline AS Søknadsfrist, 
-            location AS Arbeidssted, 
-            contact as Kontaktperson,
-            phone as Mobil,
-            link AS Lenke
-        FROM scraped_jobs 
-        WHERE status != 'Discarded (Basic)'
-        ORDER BY 
-            CASE WHEN status = 'Not searched' THEN 1 ELSE 2 END, 
-            score DESC,   -- <--- Sort by Score (High to Low)
-            title ASC
+    Rows are streamed from the DB cursor into xlsxwriter's constant_memory mode,
+    so memory stays flat regardless of history size. If the exported rows hash
+    the same as last time and the file still exists, the rewrite is skipped.
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    file_path = config.EXCEL_FILENAME
 
-    if df.empty:
-        print("⚠️ No relevant jobs found to save.")
-        return
+    conn = sqlite3.connect(config.DB_FILENAME)
+    try:
+        query, params, columns = _excel_layout(conn)
+        content_hash, row_count = _export_hash(conn, query, params, columns)
 
-    # Fill NaNs
-    df["Har ringt"] = df["Har ringt"].fillna("Nei")
-    df["Score"] = df["Score"].fillna(0)
+        if row_count == 0:
+            print("⚠️ No relevant jobs found to save.")
+            return
 
-    try:
-        writer = pd.ExcelWriter(file_path, engine="xlsxwriter")
-        df.to_excel(writer, index=False, sheet_name="Job Applications")
+        if (
+            not force
+            and os.path.exists(file_path)
+            and database.get_meta("excel_export_hash") == content_hash
+        ):
+            print(f"⏭️  Excel unchanged ({row_count} rows). Skipping rewrite of {file_path}")
+            return
 
-        workbook = writer.book
-        worksheet = writer.sheets["Job Applications"]
+        workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet("Job Applications")
 
         # --- DARK MODE STYLES ---
         # Background: Dark Grey (#262626), Text: Light Gray (#E0E0E0)
@@ -115,35 +172,32 @@ def save_to_excel(ignored_argument=None):
             }
         )
 
-        # "Yes" Format (Pleasant Green Text for positive action)
-        # We can't conditionally format easily without write_row,
-        # so we stick to the dark theme for the cell, but the user selects from dropdown.
-
-        # --- APPLY FORMATTING ---
-
-        # 1. Apply Base Format to all data cells
-        for row in range(1, len(df) + 1):
-            worksheet.set_row(row, None, base_format)
-
-        # 2. Write Headers
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-
-        # 3. Set Column Widths & Specific Formats
-        worksheet.set_column("A:A", 5, base_format)  # ID
-        worksheet.set_column("B:B", 8, score_format)  # Score (Gold text)
-        worksheet.set_column("C:C", 35, base_format)  # Title
-        worksheet.set_column("D:D", 20, base_format)  # Employer
-        worksheet.set_column("E:E", 15, base_format)  # Status
-        worksheet.set_column("F:F", 12, base_format)  # Har ringt
-        worksheet.set_column("G:G", 15, base_format)  # Deadline
-        worksheet.set_column("H:H", 15, base_format)  # Location
-        worksheet.set_column("I:I", 20, base_format)  # Kontakt
-        worksheet.set_column("J:J", 12, base_format)  # Mobil
-        worksheet.set_column("K:K", 10, base_format)  # Link
+        # --- COLUMN-LEVEL FORMATS (no per-row set_row calls) ---
+        formats = []
+        for col_num, (header, width, is_score) in enumerate(columns):
+            fmt = score_format if is_score else base_format
+            worksheet.set_column(col_num, col_num, width, fmt)
+            worksheet.write(0, col_num, header, header_format)
+            formats.append(fmt)
+
+        link_col = [header for header, _, _ in columns].index("Lenke")
+
+        # --- STREAM ROWS (constant_memory requires strictly increasing rows) ---
+        row_num = 0
+        for row_num, row in enumerate(conn.execute(query, params), start=1):
+            for col_num, value in enumerate(row):
+                if col_num == link_col and value:
+                    # HYPERLINK() instead of write_url: native hyperlinks are kept in memory
+                    # until close() and are capped at 65,530 per sheet
+                    url = value.replace('"', '""')
+                    worksheet.write_formula(
+                        row_num, col_num, f'=HYPERLINK("{url}")', formats[col_num], value
+                    )
+                else:
+                    worksheet.write(row_num, col_num, value, formats[col_num])
 
         # --- DROPDOWN FOR 'HAR RINGT' ---
-        end_row = len(df) + 1
+        end_row = row_num + 1
         worksheet.data_validation(
             f"F2:F{end_row}",
             {  # Note: Column F is now 'Har ringt' because Score inserted at B
@@ -154,11 +208,33 @@ def save_to_excel(ignored_argument=None):
             },
         )
 
-        writer.close()
-        print(f"✅ Saved Dark Mode Excel with Scores to {file_path}")
+        workbook.close()
+        database.set_meta("excel_export_hash", content_hash)
+        print(f"✅ Saved Dark Mode Excel with Scores to {file_path} ({row_num} rows)")
 
     except Exception as e:
         print(f"❌ Error saving Excel: {e}")
+    finally:
+        conn.close()
+
+
+JOB_SEPARATOR = "-" * 74
+
+
+def _format_job(job):
+    """Text block for one job, shared by the full report and the batch files."""
+    # Limit description length in TXT for readability
+    desc = job.get("Full beskrivelse", "") or ""
+    return (
+        f"JOB TITLE: {job.get('Stillingstittel', 'N/A')}\n"
+        f"COMPANY: {job.get('Arbeidsgiver', 'N/A')}\n"
+        f"STATUS: {job.get('Status', 'Unknown')}\n"
+        f"DEADLINE: {job.get('Søknadsfrist', 'N/A')}\n"
+        f"LOCATION: {job.get('Arbeidssted', 'N/A')}\n"
+        f"LINK: {job.get('Lenke', '#')}\n"
+        "DESCRIPTION:\n"
+        f"{desc[:3000]}\n"
+    )
 
 
 def save_to_txt(job_list, filename="output/jobs_for_gemini.txt"):
@@ -181,19 +257,123 @@ def save_to_txt(job_list, filename="output/jobs_for_gemini.txt"):
             "==========================================================================\n\n"
         )
 
-        for i, job in enumerate(job_list):
-            f.write(f"JOB TITLE: {job.get('Stillingstittel', 'N/A')}\n")
-            f.write(f"COMPANY: {job.get('Arbeidsgiver', 'N/A')}\n")
-            f.write(f"STATUS: {job.get('Status', 'Unknown')}\n")
-            f.write(f"DEADLINE: {job.get('Søknadsfrist', 'N/A')}\n")
-            f.write(f"LOCATION: {job.get('Arbeidssted', 'N/A')}\n")
-            f.write(f"LINK: {job.get('Lenke', '#')}\n")
-            f.write("DESCRIPTION:\n")
-            # Limit description length in TXT for readability
-            desc = job.get("Full beskrivelse", "") or ""
-            f.write(f"{desc[:3000]}\n")
-            f.write(
-                "\n--------------------------------------------------------------------------\n\n"
-            )
+        for job in job_list:
+            f.write(_format_job(job))
+            f.write(f"\n{JOB_SEPARATOR}\n\n")
 
     print(f"✅ Saved text report to {filename}")
+
+
+def _stable_batches(blocks, starts, token_budget):
+    """
+    Groups (job, text, tokens) blocks, sorted by ID, into [(start ID, blocks)].
+
+    Every job goes to the ID range of the previous run's batch it falls in (`starts`
+    are their first IDs), so adding, dropping or editing a job only changes its own
+    batch. A range that outgrows the budget is split inside itself; the new pieces
+    are keyed by their first ID and stay put from then on. A range that shrank below
+    a quarter of the budget is folded into the one before it, if that still fits.
+    """
+    starts = sorted(starts) or [int(blocks[0][0].get("ID") or 0)]
+    ranges = {}
+    for block in blocks:
+        i = bisect.bisect_right(starts, int(block[0].get("ID") or 0)) - 1
+        ranges.setdefault(starts[max(i, 0)], []).append(block)
+
+    merged = []  # [start, blocks, tokens]
+    for start in sorted(ranges):
+        tokens = sum(block[2] for block in ranges[start])
+        if merged and tokens < token_budget / 4 and merged[-1][2] + tokens <= token_budget:
+            merged[-1][1].extend(ranges[start])
+            merged[-1][2] += tokens
+        else:
+            merged.append([start, ranges[start], tokens])
+
+    batches = []
+    for start, range_blocks, _ in merged:
+        for i, piece in enumerate(pack_by_tokens(range_blocks, token_budget, cost=lambda block: block[2])):
+            batches.append((start if i == 0 else int(piece[0][0].get("ID") or 0), piece))
+    return batches
+
+
+def save_batches(job_list, output_dir="output/job_batches", token_budget=None):
+    """
+    Writes LLM-ready batch files packed by estimated tokens, plus manifest.json.
+
+    Batches are ID ranges named by their first ID (<dir>_<ID>.txt) and kept from
+    run to run (see _stable_batches), so a new, expired or edited job only changes
+    its own batch. A batch file is rewritten only when its content hash differs
+    from the previous manifest; files of batches that are gone are removed.
+    """
+    token_budget = token_budget or config.REPORT_BATCH_TOKENS
+    job_list = [job for job in job_list if _is_not_expired(job.get("Søknadsfrist", ""))]
+    job_list.sort(key=lambda job: int(job.get("ID") or 0))
+
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = os.path.basename(os.path.normpath(output_dir))
+    manifest_path = os.path.join(output_dir, "manifest.json")
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = {b["file"]: b for b in json.load(f).get("batches", [])}
+    except (OSError, ValueError):
+        previous = {}
+    # Manifests from before stable batches have no first_id; their first job stands in
+    starts = {
+        int(b.get("first_id") or b["jobs"][0]) for b in previous.values() if b.get("first_id") or b.get("jobs")
+    }
+
+    separator_tokens = estimate_tokens(f"\n\n{JOB_SEPARATOR}\n\n")
+    blocks = []
+    for job in job_list:
+        text = _format_job(job)
+        blocks.append((job, text, estimate_tokens(text) + separator_tokens))
+    packed = _stable_batches(blocks, starts, token_budget) if blocks else []
+
+    batches = []
+    written = 0
+    for first_id, batch in packed:
+        content = f"\n\n{JOB_SEPARATOR}\n\n".join(block[1].strip() for block in batch)
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        filename = f"{prefix}_{first_id}.txt"
+        path = os.path.join(output_dir, filename)
+
+        old = previous.pop(filename, None)
+        if not old or old.get("hash") != content_hash or not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as out_file:
+                out_file.write(content)
+            written += 1
+
+        batches.append(
+            {
+                "file": filename,
+                "first_id": first_id,
+                "jobs": [str(block[0].get("ID")) for block in batch],
+                "tokens": estimate_tokens(content),
+                "hash": content_hash,
+            }
+        )
+
+    # Batches that no longer exist (their jobs expired, or the range was folded)
+    for stale in previous:
+        stale_path = os.path.join(output_dir, stale)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generated": datetime.now().isoformat(timespec="seconds"),
+                "token_budget": token_budget,
+                "total_jobs": len(job_list),
+                "batches": batches,
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    print(
+        f"   ✅ {len(batches)} token-packed batches in '{output_dir}' "
+        f"({written} rewritten, {len(batches) - written} unchanged)."
+    )
@@ -0,0 +1,228 @@
+"""
+Compact set of known ad IDs, for the "have we seen this ad?" check of every
+scraped link (database.get_existing_ids).
+
+The old set held every ID as a Python str, which costs about 100 bytes per ID:
+hundreds of MB and a slow startup at millions of rows. KnownIds holds them in
+one sorted array('q'), 8 bytes per ID, searched with bisect. IDs added during
+a run go into a small set that is merged into the array in batches. It
+accepts str or int IDs, so it replaces the old set as is (`in`, `add`,
+`len`).
+
+The array is saved as a snapshot next to the database. The next load reads
+the snapshot and applies only the IDs inserted or deleted since then, which
+triggers on scraped_jobs record in the id_log table. A snapshot of another
+database, or one whose count doesn't match, is rebuilt from a full scan.
+
+A Bloom filter can sit in front of the binary search
+(config.KNOWN_IDS_BLOOM_BITS), so most unseen IDs skip it. It is off by
+default: its probes run in Python and cost more than the C bisect they save.
+benchmarks/bench_known_ids.py compares all three.
+"""
+import bisect
+import heapq
+import json
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+
+import config
+
+SNAPSHOT_VERSION = 1
+MIN_MERGE = 4096  # IDs added during a run are merged into the array once this many (or 1/64th) pile up
+
+
+def snapshot_path():
+    return os.path.splitext(config.DB_FILENAME)[0] + "_known_ids.bin"
+
+
+def merged(ids, added=(), removed=()):
+    """A new sorted array: `ids` plus `added` minus `removed`, every ID once."""
+    added = sorted(added)
+    if not removed and (not ids or not added or added[0] > ids[-1]):
+        # New ads mostly have higher IDs than anything known: a plain append
+        out = array("q", ids)
+        out.extend(job_id for i, job_id in enumerate(added) if not i or job_id != added[i - 1])
+        return out
+
+    out = array("q")
+    last = None
+    for job_id in heapq.merge(ids, added):
+        if job_id != last and job_id not in removed:
+            out.append(job_id)
+        last = job_id
+    return out
+
+
+class BloomFilter:
+    """A bit array with a few probes per ID: never a false negative, a small share of false positives."""
+
+    def __init__(self, capacity, bits_per_id, bits=None, hashes=None):
+        self.capacity = capacity
+        self.bits_per_id = bits_per_id
+        self.size = max(64, capacity * bits_per_id)
+        self.hashes = hashes or max(1, round(bits_per_id * 0.693))  # Optimal k = (m/n) ln 2
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _probes(self, job_id):
+        h = (job_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF  # Fibonacci hashing of the 64-bit ID
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, job_id):
+        for p in self._probes(job_id):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, job_id):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._probes(job_id))
+
+
+class KnownIds:
+    """Set-like view of the known scraped_jobs IDs (str or int); safe to share between threads."""
+
+    def __init__(self, ids=(), bloom_bits=0, presorted=False):
+        self.ids = ids if presorted else array("q", sorted(ids))
+        self.recent = set()
+        self.lock = threading.Lock()
+        self.bloom = None
+        if bloom_bits:
+            self.bloom = BloomFilter(len(self.ids), bloom_bits)
+            for job_id in self.ids:
+                self.bloom.add(job_id)
+
+    def _in_array(self, job_id):
+        ids = self.ids
+        i = bisect.bisect_left(ids, job_id)
+        return i < len(ids) and ids[i] == job_id
+
+    def __contains__(self, job_id):
+        try:
+            job_id = int(job_id)
+        except (TypeError, ValueError):
+            return False
+        if self.bloom is not None and job_id not in self.bloom:
+            return False
+        # recent before the array: a merge swaps in the new array before it empties recent
+        return job_id in self.recent or self._in_array(job_id)
+
+    def add(self, job_id):
+        job_id = int(job_id)
+        with self.lock:
+            if job_id in self.recent or self._in_array(job_id):
+                return
+            if self.bloom is not None:
+                self.bloom.add(job_id)  # Before recent, so a reader never sees it missing from the filter
+            self.recent.add(job_id)
+            if len(self.recent) >= max(MIN_MERGE, len(self.ids) // 64):
+                self.ids = merged(self.ids, self.recent)
+                self.recent = set()
+
+    def apply(self, added, removed):
+        """Applies id_log changes (see load). Removed IDs stay set in the Bloom filter, which is harmless."""
+        with self.lock:
+            self.ids = merged(self.ids, list(self.recent) + list(added), removed)
+            self.recent = set()
+            if self.bloom is not None:
+                for job_id in added:
+                    self.bloom.add(job_id)
+
+    def __len__(self):
+        return len(self.ids) + len(self.recent)
+
+
+def _read_snapshot(path, db_id, bloom_bits):
+    """(KnownIds, id_log seq) from the snapshot file, or None if it is missing or belongs elsewhere."""
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if (
+                header.get("version") != SNAPSHOT_VERSION
+                or header.get("db_id") != db_id
+                or header.get("byteorder") != sys.byteorder
+            ):
+                return None
+            ids = array("q")
+            ids.fromfile(f, header["count"])
+            known = KnownIds(ids, presorted=True)
+            bloom = header.get("bloom")
+            if bloom_bits and bloom and bloom["bits_per_id"] == bloom_bits and bloom["capacity"] * 2 >= len(ids):
+                known.bloom = BloomFilter(bloom["capacity"], bloom_bits, bytearray(f.read()), bloom["hashes"])
+            elif bloom_bits:
+                known = KnownIds(ids, bloom_bits, presorted=True)  # Size changed a lot, or no filter saved
+            return known, header["seq"]
+    except (OSError, ValueError, EOFError, KeyError):
+        return None
+
+
+def _write_snapshot(path, known, db_id, seq):
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "db_id": db_id,
+        "seq": seq,
+        "count": len(known.ids),
+        "byteorder": sys.byteorder,
+        "bloom": None,
+    }
+    if known.bloom is not None:
+        bloom = known.bloom
+        header["bloom"] = {"capacity": bloom.capacity, "bits_per_id": bloom.bits_per_id, "hashes": bloom.hashes}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        known.ids.tofile(f)
+        if known.bloom is not None:
+            f.write(known.bloom.bits)
+    os.replace(tmp, path)  # Atomic, so a concurrent reader sees the old or the new snapshot
+
+
+def load(conn=None, bloom_bits=None):
+    """
+    The known IDs of the database: the snapshot plus the id_log entries since it was
+    written, or a full scan if there is no usable snapshot (which then writes one).
+    """
+    bloom_bits = config.KNOWN_IDS_BLOOM_BITS if bloom_bits is None else bloom_bits
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(config.DB_FILENAME)
+    try:
+        try:
+            db_id = conn.execute("SELECT value FROM app_meta WHERE key = 'db_id'").fetchone()[0]
+            # Read before the IDs: anything inserted meanwhile is applied again next time (idempotent)
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM id_log").fetchone()[0]
+        except (sqlite3.OperationalError, TypeError):
+            # A database from before id_log (setup_database adds it): no snapshot possible
+            return KnownIds((row[0] for row in conn.execute("SELECT ID FROM scraped_jobs")), bloom_bits)
+
+        path = snapshot_path()
+        snapshot = _read_snapshot(path, db_id, bloom_bits) if config.KNOWN_IDS_SNAPSHOT else None
+        known = None
+        if snapshot is not None:
+            known, snapshot_seq = snapshot
+            # Last change per ID wins (deleted and scraped again = known)
+            changes = dict(conn.execute(
+                "SELECT job_id, added FROM id_log WHERE seq > ? AND seq <= ? ORDER BY seq", (snapshot_seq, seq)
+            ))
+            if changes:
+                known.apply(
+                    [job_id for job_id, added in changes.items() if added],
+                    {job_id for job_id, added in changes.items() if not added},
+                )
+            if len(known) != conn.execute("SELECT COUNT(*) FROM scraped_jobs").fetchone()[0]:
+                print("⚠️ Known-ID snapshot is out of step with the database, rebuilding it.")
+                known = None
+            elif not changes:
+                return known
+
+        if known is None:
+            # The plain scan is covered by an index; ORDER BY ID would read the whole table
+            known = KnownIds((row[0] for row in conn.execute("SELECT ID FROM scraped_jobs")), bloom_bits)
+        if config.KNOWN_IDS_SNAPSHOT:
+            _write_snapshot(path, known, db_id, seq)
+            conn.execute("DELETE FROM id_log WHERE seq <= ?", (seq,))
+            conn.commit()
+        return known
+    finally:
+        if own_conn:
+            conn.close()
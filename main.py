@@ -1,4 +1,5 @@
 import argparse
+import os
 import sqlite3
 import time
 from datetime import datetime
@@ -6,8 +7,8 @@ from datetime import datetime
 import config
 import database
 import file_manager
-import scraper
-import split_jobs_ouput_file
+import metrics
+import profiling
 
 # Import filters
 try:
@@ -18,13 +19,21 @@ except ImportError:
     HAS_DUMB_FILTER = False
     print("⚠️ dumb_filter.py not found.")
 
-try:
-    from rag import ai_filter
+from rag import batching, evaluator
 
-    HAS_AI = True
-except ImportError:
-    HAS_AI = False
-    print("⚠️ ai_filter.py not found.")
+
+def load_ai_filter():
+    """
+    Imports rag.ai_filter on demand, so --regenerate / --no-ai runs never load
+    the profile or touch the AI SDKs. Returns None if it can't be imported.
+    """
+    try:
+        from rag import ai_filter
+
+        return ai_filter
+    except ImportError as e:
+        print(f"⚠️ ai_filter.py could not be loaded: {e}")
+        return None
 
 
 def is_not_expired(deadline_str):
@@ -50,38 +59,49 @@ def is_not_expired(deadline_str):
         return True  # Can't parse, keep the job
 
 
-def generate_reports(report_dumb=False):
+def generate_reports(report_dumb=False, report_profile=None):
     """
     Generates the Excel and Text files based on the requested strictness.
     """
     print("\n📝 Regenerating Excel and Text files...")
 
     # 1. Update Excel (Always contains everything for tracking)
-    file_manager.save_to_excel(None)
+    with metrics.timer("export_ms", kind="excel"):
+        file_manager.save_to_excel(None)
+
+    database.compact_missing_descriptions()
 
     conn = sqlite3.connect(config.DB_FILENAME)
     cursor = conn.cursor()
 
     # 2. Select Jobs for Text File based on Flag
-    if report_dumb:
+    if report_profile:
+        print(f"   📂 Report Mode: PROFILE '{report_profile}' (Jobs matched for this profile)")
+        cursor.execute("""
+            SELECT j.title, j.employer, j.deadline, j.location, j.link, COALESCE(j.compact_description, j.full_description), j.status, j.ID
+            FROM job_scores s JOIN scraped_jobs j ON j.ID = s.job_id
+            WHERE s.profile_id = ? AND s.match = 1 AND j.status != 'Discarded (Basic)' AND j.removed_at IS NULL
+            ORDER BY s.score DESC, j.title ASC
+        """, (report_profile,))
+    elif report_dumb:
         print(
             "   📂 Report Mode: DUMB FILTER (Showing all jobs that passed Basic Filter)"
         )
         # Get everything that was NOT discarded by the Basic filter.
         # This includes: 'Pending AI', 'Not searched' (Approved), and 'Discarded (AI)'
         cursor.execute("""
-            SELECT title, employer, deadline, location, link, full_description, status 
+            SELECT title, employer, deadline, location, link, COALESCE(compact_description, full_description), status, ID 
             FROM scraped_jobs 
-            WHERE status != 'Discarded (Basic)'
+            WHERE status != 'Discarded (Basic)' AND removed_at IS NULL
             ORDER BY status DESC, title ASC
         """)
     else:
         print("   📂 Report Mode: AI APPROVED (Showing only jobs approved by AI)")
         # Standard: Only show what the AI (or you) marked as "Not searched" (Approved)
         cursor.execute("""
-            SELECT title, employer, deadline, location, link, full_description, status 
+            SELECT title, employer, deadline, location, link, COALESCE(compact_description, full_description), status, ID 
             FROM scraped_jobs 
-            WHERE status = 'Not searched'
+            WHERE status = 'Not searched' AND removed_at IS NULL
             ORDER BY title ASC
         """)
 
@@ -98,29 +118,212 @@ def generate_reports(report_dumb=False):
                 "Lenke": r[4],
                 "Full beskrivelse": r[5],
                 "Status": r[6],
+                "ID": r[7],
             }
             for r in candidates
             if is_not_expired(r[2])
         ]
 
         # Save to a specific filename so you don't overwrite the other one blindly
-        filename = (
-            "output/jobs_dumb_filtered.txt"
-            if report_dumb
-            else "output/gemini_context.txt"
-        )
+        if report_profile:
+            filename = f"output/gemini_context_{report_profile}.txt"
+        else:
+            filename = (
+                "output/jobs_dumb_filtered.txt"
+                if report_dumb
+                else "output/gemini_context.txt"
+            )
 
-        file_manager.save_to_txt(candidate_list, filename=filename)
+        with metrics.timer("export_ms", kind="txt"):
+            file_manager.save_to_txt(candidate_list, filename=filename)
         print(f"✨ Done! {len(candidate_list)} jobs saved to: {filename}")
 
-        split_jobs_ouput_file.split_job_file(
-            file_path=filename, batch_size=10, output_subdir_name="job_batches"
-        )
+        batch_dir = os.path.join(config.OUTPUT_DIR, "job_batches")
+        if report_profile:
+            batch_dir = os.path.join(batch_dir, report_profile)
+        with metrics.timer("export_ms", kind="batches"):
+            file_manager.save_batches(candidate_list, output_dir=batch_dir)
 
     else:
         print("✨ Done! No jobs found for this report criteria.")
 
 
+def process_ad(link, processed_ids, conn=None):
+    """
+    Scrapes one ad and stores it (see store_ad). Returns the ad's details,
+    or None if the scrape failed.
+    """
+    import scraper
+
+    details = scraper.scrape_ad_details(link)
+    if details:
+        store_ad(details, processed_ids, conn=conn)
+    return details
+
+
+def store_ad(details, processed_ids, conn=None):
+    """Runs the basic filter and stores the ad as 'Pending AI' or 'Discarded (Basic)'."""
+    status = "Pending AI"
+    if HAS_DUMB_FILTER:
+        is_ok, reason = dumb_filter.is_relevant_basic(
+            details["Stillingstittel"], details["Full beskrivelse"]
+        )
+        if not is_ok:
+            print(f"     ❌ Dumb Filter Reject: {reason}")
+            status = "Discarded (Basic)"
+        else:
+            print(f"     ✅ Dumb Filter Pass -> Pending AI")
+
+    details["Status"] = status
+    database.add_job_to_db(details, conn=conn)
+    processed_ids.add(details["ID"])
+
+
+def evaluate_pending(args, ai_filter):
+    """Runs the AI phase over all 'Pending AI' jobs, or approves them all with --no-ai."""
+    if args.no_ai:
+        print("\n⚡ SKIPPING AI. Approving all 'Pending AI' jobs.")
+        conn = sqlite3.connect(config.DB_FILENAME)
+        conn.execute(
+            "UPDATE scraped_jobs SET status = 'Not searched' WHERE status = 'Pending AI'"
+        )
+        conn.commit()
+        conn.close()
+
+    elif ai_filter:
+        with metrics.timer("phase_ms", phase="ai"), profiling.stage("ai"):
+            run_ai_phase(args, ai_filter)
+
+
+def run_ai_phase(args, ai_filter):
+    """
+    Sends every 'Pending AI' job to the model and writes the verdicts back.
+    Several requests are kept in flight at once (see config.AI_CONCURRENCY_*),
+    throttled by a shared requests/tokens-per-minute limiter.
+
+    The backlog is streamed highest priority first (deadline urgency, freshness,
+    keyword pre-score; see rag/priority.py): pending rows are read in keyset-paginated
+    chunks of config.AI_CHUNK_SIZE and packed into batches only as workers free up,
+    so memory stays flat after a big reset. Each batch is committed as it lands.
+    --max-llm-calls / --max-tokens / --time-budget stop the run early; what's left
+    over is reported.
+    """
+    database.compact_missing_descriptions()
+
+    conn = sqlite3.connect(config.DB_FILENAME)
+    cursor = conn.cursor()
+    pending = cursor.execute(f"SELECT COUNT(*) FROM ({database.PENDING_AI_SQL})").fetchone()[0]
+    if not pending:
+        conn.close()
+        return
+    database.refresh_ai_priorities(conn)
+
+    counts = {"duplicates": 0, "evaluated": 0}
+
+    def jobs_to_check():
+        # Near-duplicates (same cluster) are evaluated once; the verdict is copied to the rest
+        seen_clusters = set()
+        for rows in database.iter_pending_ai(conn):
+            for row in rows:
+                cluster_id = row[4] or row[0]
+                if cluster_id in seen_clusters:
+                    counts["duplicates"] += 1
+                    continue
+                seen_clusters.add(cluster_id)
+                yield database.pending_ai_job(row)
+
+    workers, limiter = ai_concurrency(args)
+    evaluate, batches = ai_batches(args, ai_filter, jobs_to_check())
+
+    print(
+        f"🤖 Processing {pending} pending jobs in token-packed batches "
+        f"({workers} in flight, read {config.AI_CHUNK_SIZE} at a time)..."
+    )
+
+    provider = "local" if args.local else "gemini"
+
+    def write_results(batch, ai_results, meta):
+        print(
+            f"   📦 Batch of {len(batch)}: ~{meta.get('est_input_tokens')} est. tokens, "
+            f"{meta.get('prompt_tokens')} prompt / {meta.get('output_tokens')} output tokens, "
+            f"{meta.get('latency_ms')} ms"
+        )
+        counts["evaluated"] += len(batch)
+        database.record_ai_batch(cursor, provider, len(batch), len(ai_results), meta)
+        database.save_ai_verdicts(cursor, batch, ai_results)
+
+        # Commit as each batch lands so a crash only loses in-flight work
+        with metrics.timer("db_commit_ms", op="verdicts"):
+            conn.commit()
+
+    started = time.time()
+    stats = evaluator.evaluate_concurrently(
+        batches,
+        lambda batch, meta: evaluate(
+            batch, force_local=args.local, think=args.think, usage=meta
+        ),
+        write_results,
+        max_workers=workers,
+        limiter=limiter,
+        quota_pause=config.AI_QUOTA_PAUSE_S,
+        budget=ai_budget(args),
+    )
+
+    if counts["duplicates"]:
+        print(f"🧬 {counts['duplicates']} pending jobs were near-duplicates (one evaluation per cluster).")
+
+    elapsed = time.time() - started
+    print(
+        f"🤖 AI phase done: {stats['batches']} batches in {elapsed:.1f}s "
+        f"({counts['evaluated'] / max(elapsed, 0.001):.2f} jobs/s, "
+        f"{stats['retries']} quota retries, {stats['failed']} failed)."
+    )
+    database.report_ai_backlog(conn, stopped=stats["stopped"])
+    conn.close()
+
+
+def ai_concurrency(args):
+    """(requests kept in flight, shared rate limiter) for the chosen provider."""
+    if args.local:
+        workers = args.workers or config.AI_CONCURRENCY_LOCAL
+        return workers, evaluator.RateLimiter(config.LOCAL_RPM, config.LOCAL_TPM)
+    workers = args.workers or config.AI_CONCURRENCY_GEMINI
+    return workers, evaluator.RateLimiter(config.GEMINI_RPM, config.GEMINI_TPM)
+
+
+def ai_batches(args, ai_filter, jobs):
+    """
+    (evaluate_fn, lazy batches) for a stream of job dicts: one job per request for
+    the local model, token-packed batches for Gemini.
+    """
+    # --multi-profile scores each job against every profile in the same request
+    profile_count = len(ai_filter.CANDIDATE_PROFILES) if args.multi_profile else 1
+    evaluate = ai_filter.evaluate_batch_multi if args.multi_profile else ai_filter.evaluate_batch
+    if args.multi_profile:
+        print(f"🎯 Multi-profile mode: {', '.join(ai_filter.CANDIDATE_PROFILES)}")
+
+    # Lazy all the way down: evaluate_concurrently pulls the next batch when a worker frees up
+    if args.local:
+        # The local prompt evaluates one job at a time
+        return evaluate, ([job] for job in jobs)
+    return evaluate, batching.pack_batches(
+        jobs,
+        max_input_tokens=config.AI_MAX_INPUT_TOKENS,
+        max_output_tokens=config.AI_MAX_OUTPUT_TOKENS,
+        output_tokens_per_job=config.AI_OUTPUT_TOKENS_PER_JOB * profile_count,
+        overhead_tokens=ai_filter.prompt_overhead_tokens(args.multi_profile),
+    )
+
+
+def ai_budget(args):
+    """The run's AI spend limits from --max-llm-calls / --max-tokens / --time-budget."""
+    return evaluator.Budget(
+        max_calls=args.max_llm_calls,
+        max_tokens=args.max_tokens,
+        time_budget_s=args.time_budget,
+    )
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -138,6 +341,38 @@ def main():
         help="Skip AI check and approve all pending jobs.",
     )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of AI requests kept in flight (overrides config.AI_CONCURRENCY_*).",
+    )
+
+    parser.add_argument(
+        "--max-llm-calls",
+        type=int,
+        default=None,
+        help="Send at most this many AI requests; the rest stays 'Pending AI' (highest priority goes first).",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Stop sending AI requests once about this many tokens (prompt + output) are spent.",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=int,
+        default=None,
+        help="Stop sending AI requests after this many seconds of AI evaluation.",
+    )
+
+    parser.add_argument(
+        "--multi-profile",
+        action="store_true",
+        help="Score every job against all CANDIDATE_PROFILES in profile.py in one pass.",
+    )
+
     parser.add_argument(
         "--think",
         action="store_true",
@@ -155,19 +390,150 @@ def main():
         action="store_true",
         help="Output file includes ALL jobs that passed Dumb Filter (ignores AI rejection).",
     )
+    parser.add_argument(
+        "--report-profile",
+        type=str,
+        default=None,
+        help="Text report of the jobs matched for this profile (from a --multi-profile run).",
+    )
+
+    parser.add_argument(
+        "--export-parquet",
+        action="store_true",
+        help="Write/refresh the partitioned Parquet snapshot in output/parquet and exit.",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Run scraping, filtering and AI evaluation concurrently as a streaming pipeline.",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: poll the search queries on a jittered schedule and handle new ads as they appear.",
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-check known ads that are due (deadline, text, removal) instead of searching for new ones.",
+    )
+
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Only evaluate 'Pending AI' jobs, claiming them in leased chunks so several workers can run at once.",
+    )
+    parser.add_argument(
+        "--worker-id", type=str, default=None, help="Name of this worker's leases (default: <hostname>-<pid>)."
+    )
+    parser.add_argument(
+        "--coordinator",
+        type=str,
+        default=None,
+        help="With --worker: claim through this --serve-queue URL instead of opening the DB file.",
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the local dashboard (http://127.0.0.1:8765) instead of scraping.",
+    )
+    parser.add_argument(
+        "--serve-queue",
+        action="store_true",
+        help="Serve the AI work queue to --worker --coordinator processes on other hosts (see config.QUEUE_*).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Port for --serve / --serve-queue (default: config.DASHBOARD_PORT / config.QUEUE_PORT).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each stage (cProfile + tracemalloc) into output/profiles/<timestamp>/.",
+    )
+    parser.add_argument(
+        "--profile-stacks",
+        action="store_true",
+        help="With --profile: also sample all threads into a flamegraph-ready stacks.collapsed.",
+    )
 
     args = parser.parse_args()
+    if args.worker and args.no_ai:
+        parser.error("--worker evaluates jobs with the AI; it can't be combined with --no-ai.")
+    if args.coordinator and not args.worker:
+        parser.error("--coordinator only applies to --worker.")
 
     # 1. Setup
-    database.setup_database()
+    config.ensure_dirs()
+    if not args.coordinator:  # A remote worker never opens the database
+        database.setup_database()
+
+    if args.export_parquet:
+        import parquet_export
+
+        parquet_export.export_parquet()
+        return
+
+    if args.serve:
+        import dashboard_server
+
+        dashboard_server.serve(port=args.port)
+        return
+
+    if args.serve_queue:
+        import work_queue
+
+        work_queue.serve(port=args.port)
+        return
+
+    if args.profile:
+        profiling.enable(sample_stacks=args.profile_stacks)
+
+    try:
+        if args.worker:
+            import work_queue
+
+            ai_filter = load_ai_filter()
+            if ai_filter is None:
+                return  # load_ai_filter printed why; nothing to evaluate with, as in the normal AI phase
+            with metrics.timer("phase_ms", phase="ai"), profiling.stage("ai"):
+                work_queue.run(args, ai_filter, ai_concurrency, ai_batches, ai_budget)
+        elif args.refresh:
+            import refresh
+
+            refresh.run(args, evaluate_pending, generate_reports, load_ai_filter)
+        elif args.watch:
+            import watch
+
+            watch.run(args, process_ad, evaluate_pending, generate_reports, load_ai_filter)
+        else:
+            run(args)
+    finally:
+        profiling.finish()
+        metrics.write_report()
+
+
+def run(args):
+    """One tracker run: sync, scrape, AI, reports (or only the reports with --regenerate)."""
 
     # If we are only regenerating, skip the heavy lifting
     if args.regenerate:
-        generate_reports(report_dumb=args.report_dumb)
+        with metrics.timer("phase_ms", phase="report"), profiling.stage("report"):
+            generate_reports(report_dumb=args.report_dumb, report_profile=args.report_profile)
         return
 
-    if args.sync:
-        database.sync_excel_to_db()
+    with profiling.stage("sync"):
+        if args.sync:
+            database.sync_excel_to_db()
+
+        database.index_missing_clusters()
 
     # 2. SCRAPING PHASE
     if args.query:
@@ -180,127 +546,38 @@ def main():
     if args.local:
         print("🏠 LOCAL MODE: Using Ollama (Batch Size: 1).")
     elif not args.no_ai:
-        print("☁️ CLOUD MODE: Using Gemini (Batch Size: 10).")
-
-    for query in search_list:
-        links = scraper.get_job_links(query)
-        new_links = [l for l in links if l.split("/")[-1] not in processed_ids]
-
-        if not new_links:
-            continue
-
-        print(f"   - Found {len(new_links)} new jobs for '{query}'.")
-
-        for i, link in enumerate(new_links):
-            details = scraper.scrape_ad_details(link)
-            if details:
-                status = "Pending AI"
-                if HAS_DUMB_FILTER:
-                    is_ok, reason = dumb_filter.is_relevant_basic(
-                        details["Stillingstittel"], details["Full beskrivelse"]
-                    )
-                    if not is_ok:
-                        print(f"     ❌ Dumb Filter Reject: {reason}")
-                        status = "Discarded (Basic)"
-                    else:
-                        print(f"     ✅ Dumb Filter Pass -> Pending AI")
-
-                details["Status"] = status
-                database.add_job_to_db(details)
-                processed_ids.add(details["ID"])
-
-    # 3. AI PROCESSING PHASE
-    if args.no_ai:
-        print("\n⚡ SKIPPING AI. Approving all 'Pending AI' jobs.")
-        conn = sqlite3.connect(config.DB_FILENAME)
-        conn.execute(
-            "UPDATE scraped_jobs SET status = 'Not searched' WHERE status = 'Pending AI'"
-        )
-        conn.commit()
-        conn.close()
+        print("☁️ CLOUD MODE: Using Gemini (token-packed batches).")
 
-    elif HAS_AI:
-        conn = sqlite3.connect(config.DB_FILENAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT ID, title, full_description, employer FROM scraped_jobs WHERE status = 'Pending AI'"
+    phase_started = time.perf_counter()
+    profiling.begin("stream" if args.stream else "scrape")
+    if args.stream:
+        import pipeline
+
+        ai_filter = None if args.no_ai else load_ai_filter()
+        pipeline.run(
+            args, search_list, ai_filter, dumb_filter if HAS_DUMB_FILTER else None, budget=ai_budget(args)
         )
-        rows = cursor.fetchall()
-        conn.close()
 
-        jobs_to_check = [
-            {
-                "ID": str(r[0]),
-                "Stillingstittel": r[1],
-                "Full beskrivelse": r[2],
-                "Arbeidsgiver": r[3],
-            }
-            for r in rows
-        ]
+    if not args.stream:
+        # requests + BeautifulSoup are only paid for by runs that actually scrape
+        import sources
 
-        if jobs_to_check:
-            BATCH_SIZE = 1 if args.local else 10
-            print(
-                f"🤖 Processing {len(jobs_to_check)} jobs in batches of {BATCH_SIZE}..."
-            )
+        # Every source crawls in its own thread and pool; this thread filters and stores
+        for details in sources.crawl(search_list, processed_ids):
+            store_ad(details, processed_ids)
+
+    profiling.end()
+    metrics.observe(
+        "phase_ms", (time.perf_counter() - phase_started) * 1000, phase="stream" if args.stream else "scrape"
+    )
 
-            for i in range(0, len(jobs_to_check), BATCH_SIZE):
-                batch = jobs_to_check[i : i + BATCH_SIZE]
-
-                ai_input = [
-                    {
-                        "id": str(job["ID"]),
-                        "title": job["Stillingstittel"],
-                        "employer": job["Arbeidsgiver"],
-                        "description": job["Full beskrivelse"][:3000],
-                    }
-                    for job in batch
-                ]
-
-                ai_results = ai_filter.evaluate_batch(
-                    ai_input, force_local=args.local, think=args.think
-                )
-
-                conn = sqlite3.connect(config.DB_FILENAME)
-                cursor = conn.cursor()
-
-                for job in batch:
-                    job_id = str(job["ID"])
-                    result = ai_results.get(job_id)
-
-                    if result is None:
-                        print(
-                            f"      ⏭️  Skipped (AI failed): {job['Stillingstittel']}"
-                        )
-                        continue  # stays as 'Pending AI'
-
-                    score = result.get("score", 0)  # <--- Extract Score
-
-                    if result.get("match"):
-                        new_status = "Not searched"
-                        print(
-                            f"      👍 Approved (Score: {score}): {job['Stillingstittel']}"
-                        )
-                    else:
-                        new_status = "Discarded (AI)"
-                        print(
-                            f"      👎 Rejected (Score: {score}): {job['Stillingstittel']} ({result.get('reason')})"
-                        )
-
-                    # UPDATE QUERY INCLUDES SCORE
-                    cursor.execute(
-                        "UPDATE scraped_jobs SET status = ?, score = ? WHERE ID = ?",
-                        (new_status, score, job_id),
-                    )
-
-                conn.commit()
-                conn.close()
-
-                if not args.local:
-                    time.sleep(1)
+    # 3. AI PROCESSING PHASE (the streaming pipeline already evaluated as it went)
+    if args.no_ai or not args.stream:
+        evaluate_pending(args, None if args.no_ai else load_ai_filter())
 
     # 4. REPORT GENERATION (Uses the new function)
-    generate_reports(report_dumb=args.report_dumb)
+    with metrics.timer("phase_ms", phase="report"), profiling.stage("report"):
+        generate_reports(report_dumb=args.report_dumb, report_profile=args.report_profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+
+METRICS_DIR = os.path.join(config.OUTPUT_DIR, "metrics")
+PROM_FILENAME = "jobtracker.prom"
+PREFIX = "jobtracker_"
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Raw observations kept per histogram for exact-ish percentiles in the JSON report
+RESERVOIR_SIZE = 5000
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # last one is +Inf
+        self.samples = []
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        # Reservoir sampling keeps memory flat on long runs
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.samples[slot] = value
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self):
+        def r(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "sum": r(self.sum),
+            "min": r(self.min),
+            "max": r(self.max),
+            "mean": r(self.sum / self.count) if self.count else None,
+            "p50": r(self.percentile(50)),
+            "p90": r(self.percentile(90)),
+            "p99": r(self.percentile(99)),
+        }
+
+
+class Registry:
+    """Thread-safe counters, gauges and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observes the block's duration in milliseconds into histogram `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, **labels)
+
+    def counter_value(self, name, **labels):
+        """Sum over all label sets matching `labels`."""
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(v for (n, lbl), v in self.counters.items() if n == name and wanted <= set(lbl))
+
+    def histogram_sum(self, name, **labels):
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(
+                h.sum for (n, lbl), h in self.histograms.items() if n == name and wanted <= set(lbl)
+            )
+
+
+_registry = Registry()
+
+inc = _registry.inc
+set_gauge = _registry.set_gauge
+observe = _registry.observe
+timer = _registry.timer
+reset = _registry.reset
+counter_value = _registry.counter_value
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _rate(numerator, seconds):
+    return round(numerator / seconds, 3) if seconds else None
+
+
+def _derived():
+    """Throughput and pass-rate gauges computed from the raw numbers."""
+    r = _registry
+    # Streaming runs overlap the phases, so rates use the pipeline's wall time there
+    scrape_s = (r.histogram_sum("phase_ms", phase="scrape") or r.histogram_sum("phase_ms", phase="stream")) / 1000
+    ai_s = (r.histogram_sum("phase_ms", phase="ai") or r.histogram_sum("phase_ms", phase="stream")) / 1000
+    passed = r.counter_value("dumb_filter_total", result="pass")
+    rejected = r.counter_value("dumb_filter_total", result="reject")
+    approved = r.counter_value("ai_verdicts_total", result="approved")
+    judged = approved + r.counter_value("ai_verdicts_total", result="rejected")
+    return {
+        "scrape_pages_per_second": _rate(r.counter_value("scrape_pages_total"), scrape_s),
+        "scrape_ads_per_second": _rate(r.counter_value("scrape_ads_total"), scrape_s),
+        "ai_jobs_per_second": _rate(judged, ai_s),
+        "dumb_filter_pass_rate": round(passed / (passed + rejected), 4) if passed + rejected else None,
+        "ai_approval_rate": round(approved / judged, 4) if judged else None,
+    }
+
+
+def snapshot():
+    """The current numbers as a JSON-serializable dict."""
+    derived = _derived()
+    with _registry.lock:
+        return {
+            "started": datetime.fromtimestamp(_registry.started).isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "duration_s": round(time.time() - _registry.started, 3),
+            "counters": {_key(n, lbl): v for (n, lbl), v in sorted(_registry.counters.items())},
+            "gauges": {
+                **{_key(n, lbl): v for (n, lbl), v in sorted(_registry.gauges.items())},
+                **{name: value for name, value in derived.items() if value is not None},
+            },
+            "histograms": {
+                _key(n, lbl): h.summary() for (n, lbl), h in sorted(_registry.histograms.items())
+            },
+        }
+
+
+def _prometheus_text(data):
+    lines = []
+    seen_types = set()
+
+    def type_line(name, kind):
+        if name not in seen_types:
+            seen_types.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    with _registry.lock:
+        for (name, labels), value in sorted(_registry.counters.items()):
+            type_line(PREFIX + name, "counter")
+            lines.append(f"{_key(PREFIX + name, labels)} {value}")
+
+        for (name, labels), h in sorted(_registry.histograms.items()):
+            metric = PREFIX + name
+            type_line(metric, "histogram")
+            cumulative = 0
+            for bound, count in zip(list(BUCKETS_MS) + ["+Inf"], h.buckets):
+                cumulative += count
+                lines.append(f"{_key(metric + '_bucket', labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{_key(metric + '_sum', labels)} {h.sum}")
+            lines.append(f"{_key(metric + '_count', labels)} {h.count}")
+
+    for name, value in data["gauges"].items():
+        bare = name.split("{", 1)[0]
+        type_line(PREFIX + bare, "gauge")
+        lines.append(f"{PREFIX}{name} {value}")
+
+    type_line(PREFIX + "run_duration_seconds", "gauge")
+    lines.append(f"{PREFIX}run_duration_seconds {data['duration_s']}")
+    type_line(PREFIX + "run_finished_timestamp_seconds", "gauge")
+    lines.append(f"{PREFIX}run_finished_timestamp_seconds {int(time.time())}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(output_dir=METRICS_DIR, run_file=True):
+    """
+    Writes this run's metrics to
+    - <output_dir>/run_<timestamp>.json (one file per run, for trends), and
+    - <output_dir>/jobtracker.prom (Prometheus textfile-collector format, replaced each run).
+    Returns the JSON path. run_file=False only refreshes jobtracker.prom (and returns
+    its path), for long-running processes that update it as they go (watch.py).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    data = snapshot()
+
+    # Write-then-rename so the node_exporter never reads a half-written file
+    prom_path = os.path.join(output_dir, PROM_FILENAME)
+    with open(prom_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(_prometheus_text(data))
+    os.replace(prom_path + ".tmp", prom_path)
+    if not run_file:
+        return prom_path
+
+    json_path = os.path.join(output_dir, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    print(f"📈 Run metrics written to {json_path}")
+    return json_path
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from urllib.parse import quote
+
+import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+PARQUET_DIR = os.path.join(config.OUTPUT_DIR, "parquet")
+MANIFEST_NAME = "_manifest.json"
+
+# Everything except the (large) description columns. Types are pyarrow factory names.
+JOB_COLUMNS = [
+    ("ID", "int64"),
+    ("title", "string"),
+    ("employer", "string"),
+    ("deadline", "string"),
+    ("location", "string"),
+    ("contact", "string"),
+    ("phone", "string"),
+    ("link", "string"),
+    ("called", "string"),
+    ("score", "int64"),
+    ("cluster_id", "int64"),
+]
+
+DESCRIPTION_COLUMNS = [
+    ("ID", "int64"),
+    ("full_description", "string"),
+    ("compact_description", "string"),
+]
+
+
+def _partition_dir(*parts):
+    """Hive-style directory (key=value/...), values URI-encoded like pyarrow expects."""
+    return os.path.join(*[f"{key}={quote(str(value), safe='')}" for key, value in parts])
+
+
+def _key_expr(key):
+    """Partition value of a key column; NULL and '' both land in 'unknown'."""
+    return f"COALESCE(NULLIF({key}, ''), 'unknown')"
+
+
+def _stream_partitions(conn, columns, keys):
+    """
+    Yields (partition values, rows) for the whole table in partition order, one
+    fetchmany chunk at a time (a partition can span several chunks). A single scan
+    serves every partition, since there is no index to look one up by.
+    """
+    select = ", ".join([_key_expr(key) for key in keys] + [name for name, _ in columns])
+    order = ", ".join([_key_expr(key) for key in keys] + ["ID"])
+    cursor = conn.execute(f"SELECT {select} FROM scraped_jobs ORDER BY {order}")
+    width = len(keys)
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][:width] != rows[start][:width]:
+                yield rows[start][:width], [row[width:] for row in rows[start:i]]
+                start = i
+
+
+def _fingerprints(conn, columns, keys):
+    """
+    {partition values: sha256 of its rows}. Hashes the contents, so any edit (an
+    AI compaction, a refreshed description of the same length) changes it.
+    Streams the table in partition order, so only the hash states are held.
+    """
+    fingerprints = {}
+    for values, rows in _stream_partitions(conn, columns, keys):
+        digest = fingerprints.setdefault(values, hashlib.sha256())
+        for row in rows:
+            digest.update(repr(row).encode("utf-8"))
+    return {values: digest.hexdigest() for values, digest in fingerprints.items()}
+
+
+def _write_partitions(conn, base_dir, columns, keys, dirty):
+    """
+    Rewrites the partitions in `dirty` ({values: relative dir}) in one streamed scan,
+    switching to a new writer at each partition boundary.
+    """
+    types = [getattr(pa, type_name)() for _, type_name in columns]
+    schema = pa.schema([(name, t) for (name, _), t in zip(columns, types)])
+    writer, current, tmp_file = None, None, None
+    try:
+        for values, rows in _stream_partitions(conn, columns, keys):
+            if values not in dirty:
+                continue
+            if values != current:
+                if writer is not None:
+                    writer.close()
+                    writer = None
+                    os.replace(tmp_file, tmp_file[:-len(".tmp")])
+                path = os.path.join(base_dir, dirty[values])
+                os.makedirs(path, exist_ok=True)
+                tmp_file = os.path.join(path, "part-0.parquet.tmp")
+                writer, current = pq.ParquetWriter(tmp_file, schema, compression="zstd"), values
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array([r[i] for r in rows], type=t) for i, t in enumerate(types)],
+                    schema=schema,
+                )
+            )
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_file, tmp_file[:-len(".tmp")])
+    finally:
+        if writer is not None:
+            writer.close()  # Failed midway: the old part-0 of that partition is left as it was
+
+
+def _sync_dataset(conn, base_dir, name, keys, fingerprints, previous, columns):
+    """Writes new/changed partitions of one dataset and drops vanished ones."""
+    current = {}
+    dirty = {}
+    for values, fingerprint in fingerprints.items():
+        rel = os.path.join(name, _partition_dir(*zip(keys, values)))
+        current[rel] = fingerprint
+        if previous.get(rel) != fingerprint or not os.path.exists(os.path.join(base_dir, rel)):
+            dirty[values] = rel
+    if dirty:
+        _write_partitions(conn, base_dir, columns, keys, dirty)
+    written = len(dirty)
+
+    for rel in set(previous) - set(current):
+        if rel.startswith(name + os.sep):
+            shutil.rmtree(os.path.join(base_dir, rel), ignore_errors=True)
+    return current, written
+
+
+def export_parquet(base_dir=PARQUET_DIR):
+    """
+    Writes a Hive-partitioned Parquet snapshot of scraped_jobs:
+
+        <base_dir>/jobs/date_added=YYYY-MM-DD/status=<status>/part-0.parquet
+        <base_dir>/descriptions/date_added=YYYY-MM-DD/part-0.parquet
+
+    Only partitions that are new or whose rows changed since the last export are
+    written (tracked in _manifest.json), so daily runs append today's partition
+    plus whatever statuses moved. Read it with e.g.
+    pd.read_parquet("output/parquet/jobs") or DuckDB's read_parquet(..., hive_partitioning=true).
+    """
+    if not HAS_PYARROW:
+        print("⚠️ pyarrow is not installed. Run 'pip install pyarrow' to export Parquet.")
+        return
+
+    os.makedirs(base_dir, exist_ok=True)
+    manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("partitions", {})
+    except (OSError, ValueError):
+        previous = {}
+
+    print(f"🧱 Exporting Parquet snapshot to {base_dir}...")
+    conn = sqlite3.connect(config.DB_FILENAME)
+    try:
+        jobs, jobs_written = _sync_dataset(
+            conn,
+            base_dir,
+            "jobs",
+            ("date_added", "status"),
+            _fingerprints(conn, JOB_COLUMNS, ("date_added", "status")),
+            previous,
+            JOB_COLUMNS,
+        )
+        descriptions, desc_written = _sync_dataset(
+            conn,
+            base_dir,
+            "descriptions",
+            ("date_added",),
+            _fingerprints(conn, DESCRIPTION_COLUMNS, ("date_added",)),
+            previous,
+            DESCRIPTION_COLUMNS,
+        )
+    finally:
+        conn.close()
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "exported": datetime.now().isoformat(timespec="seconds"),
+                "partitions": {**jobs, **descriptions},
+            },
+            f,
+            indent=2,
+        )
+
+    print(
+        f"✅ Parquet export done: {jobs_written}/{len(jobs)} job partitions and "
+        f"{desc_written}/{len(descriptions)} description partitions written."
+    )
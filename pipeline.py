@@ -0,0 +1,399 @@
+import queue
+import sqlite3
+import threading
+import time
+
+import config
+import database
+import file_manager
+import metrics
+import sources
+from rag import batching, evaluator
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+
+class StageStats:
+    """Items handled and busy seconds per stage, for the end-of-run summary."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}
+        self.busy = {}
+
+    def add(self, stage, seconds, items=1):
+        with self.lock:
+            self.items[stage] = self.items.get(stage, 0) + items
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+    def summary(self):
+        return ", ".join(
+            f"{stage} {self.items[stage]} in {self.busy[stage]:.1f}s" for stage in self.items
+        )
+
+
+class Pipeline:
+    """
+    Streaming run: scrape -> basic filter -> DB writer -> AI -> report, all at once.
+
+        link producer --links--> fetchers (scrape + dumb filter) --writes--> DB writer
+        (one link producer, links queue and fetcher pool per source)
+        DB writer --ai jobs--> batcher --batches--> AI workers --writes--> DB writer
+        report thread: refreshes the Excel tracker while the run is going
+
+    Jobs move on as soon as they are fetched. The links and writes queues are bounded,
+    so a slow stage throttles the ones feeding it. The writer never blocks on the AI
+    queue (every entry there is already saved as 'Pending AI'); instead the fetchers
+    pause while the AI backlog is above config.PIPELINE_AI_BACKLOG, and jobs left
+    pending by earlier runs are read in only as the AI queue drains below it.
+
+    One thread (the writer) owns all database writes, like the calling thread in
+    evaluator.evaluate_concurrently.
+    """
+
+    def __init__(self, args, search_list, ai_filter=None, dumb_filter=None, budget=None):
+        self.args = args
+        self.search_list = search_list
+        self.ai_filter = ai_filter
+        self.dumb_filter = dumb_filter
+        self.budget = budget or evaluator.Budget()
+        self.sources = sources.enabled()
+        # Each source gets as many fetchers as its own concurrency limit
+        self.fetch_workers = sum(source.max_workers for source in self.sources)
+
+        if args.local:
+            self.ai_workers = args.workers or config.AI_CONCURRENCY_LOCAL
+            self.limiter = evaluator.RateLimiter(config.LOCAL_RPM, config.LOCAL_TPM)
+        else:
+            self.ai_workers = args.workers or config.AI_CONCURRENCY_GEMINI
+            self.limiter = evaluator.RateLimiter(config.GEMINI_RPM, config.GEMINI_TPM)
+
+        self.links = {
+            source.name: queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE) for source in self.sources
+        }
+        self.writes = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        self.ai_jobs = queue.Queue()
+        self.batches = queue.Queue(maxsize=self.ai_workers)
+
+        self.stop = threading.Event()
+        self.finished = threading.Event()
+        self.processed_ids = database.get_existing_ids()
+        self.ids_lock = threading.Lock()
+        self.stats = StageStats()
+
+    # --- queue helpers: block, but give up when the run is being stopped ---
+
+    def _put(self, q, item):
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """Next item, or None once the run is stopping."""
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return None
+
+    # --- stages ---
+
+    def _produce_links(self, source):
+        links_queue = self.links[source.name]
+        try:
+            for query in self.search_list:
+                if self.stop.is_set():
+                    return
+                started = time.monotonic()
+                links = source.get_job_links(query)
+                self.stats.add("search", time.monotonic() - started)
+
+                for link in links:
+                    job_id = source.job_id(link)
+                    with self.ids_lock:
+                        if job_id in self.processed_ids:
+                            continue
+                        self.processed_ids.add(job_id)
+                    if not self._put(links_queue, link):
+                        return
+        finally:
+            for _ in range(source.max_workers):
+                self._put(links_queue, _DONE)
+
+    def _fetch(self, source):
+        try:
+            while True:
+                link = self._get(self.links[source.name])
+                if link is None or link is _DONE:
+                    return
+
+                # Backpressure from the AI stage
+                while self.ai_jobs.qsize() > config.PIPELINE_AI_BACKLOG and not self.stop.is_set():
+                    time.sleep(0.2)
+
+                started = time.monotonic()
+                details = source.scrape_ad_details(link)
+                if not details:
+                    continue
+
+                status = "Pending AI"
+                if self.dumb_filter:
+                    is_ok, reason = self.dumb_filter.is_relevant_basic(
+                        details["Stillingstittel"], details["Full beskrivelse"]
+                    )
+                    if not is_ok:
+                        print(f"     ❌ Dumb Filter Reject: {reason}")
+                        status = "Discarded (Basic)"
+                    else:
+                        print("     ✅ Dumb Filter Pass -> Pending AI")
+                details["Status"] = status
+                self.stats.add("scrape", time.monotonic() - started)
+
+                if not self._put(self.writes, ("job", details)):
+                    return
+        finally:
+            self._put(self.writes, ("fetcher_done",))
+
+    def _write(self):
+        """Single DB writer: inserts scraped jobs, queues them for AI, saves verdicts."""
+        if self.ai_filter:
+            # New ads are compacted on insert; older rows and imports are caught up here,
+            # as in run_ai_phase, so leftovers aren't sent to the LLM at full length
+            database.compact_missing_descriptions()
+        conn = sqlite3.connect(config.DB_FILENAME)
+        cursor = conn.cursor()
+        provider = "local" if self.args.local else "gemini"
+        queued_clusters = set()
+        fetchers_done = ai_done = 0
+        ai_input_done = self.ai_filter is None
+
+        def queue_for_ai(row):
+            # One job per near-duplicate cluster; the rest inherit its verdict when it lands
+            cluster_id = row[4] or row[0]
+            if cluster_id not in queued_clusters:
+                queued_clusters.add(cluster_id)
+                self.ai_jobs.put(database.pending_ai_job(row))
+
+        try:
+            # Leftovers from earlier runs, most urgent first, streamed in chunks as the AI
+            # drains its queue; jobs scraped meanwhile are queued alongside them
+            leftovers = iter(())
+            if self.ai_filter:
+                database.refresh_ai_priorities(conn)
+                leftovers = (row for rows in database.iter_pending_ai(conn) for row in rows)
+
+            while True:
+                while not ai_input_done and self.ai_jobs.qsize() < config.PIPELINE_AI_BACKLOG:
+                    row = next(leftovers, None)
+                    if row is None:
+                        if fetchers_done < self.fetch_workers:
+                            break  # More jobs can still come from the fetchers
+                        self.ai_jobs.put(_DONE)
+                        ai_input_done = True
+                    else:
+                        queue_for_ai(row)
+
+                ai_running = self.ai_filter is not None and ai_done < self.ai_workers
+                if fetchers_done == self.fetch_workers and not ai_running:
+                    return
+
+                try:
+                    item = self.writes.get(timeout=0.2)
+                except queue.Empty:
+                    # When stopping, keep draining until the producers are gone
+                    if self.stop.is_set() and self.finished.is_set():
+                        return
+                    continue
+
+                started = time.monotonic()
+                kind = item[0]
+                if kind == "job":
+                    details = item[1]
+                    database.add_job_to_db(details, conn)
+                    if self.ai_filter and details["Status"] == "Pending AI":
+                        row = cursor.execute(database.PENDING_AI_SQL + " AND ID = ?", (int(details["ID"]),)).fetchone()
+                        if row:
+                            queue_for_ai(row)
+                    self.stats.add("write", time.monotonic() - started)
+
+                elif kind == "verdicts":
+                    _, batch, results, meta = item
+                    print(
+                        f"   📦 Batch of {len(batch)}: ~{meta.get('est_input_tokens')} est. tokens, "
+                        f"{meta.get('prompt_tokens')} prompt / {meta.get('output_tokens')} output tokens, "
+                        f"{meta.get('latency_ms')} ms"
+                    )
+                    database.record_ai_batch(cursor, provider, len(batch), len(results), meta)
+                    database.save_ai_verdicts(cursor, batch, results)
+                    with metrics.timer("db_commit_ms", op="verdicts"):
+                        conn.commit()
+                    self.stats.add("write", time.monotonic() - started, items=0)
+
+                elif kind == "fetcher_done":
+                    fetchers_done += 1  # The AI queue is closed at the top once the leftovers are in too
+
+                elif kind == "ai_done":
+                    ai_done += 1
+        finally:
+            conn.commit()
+            conn.close()
+
+    def _batch(self):
+        """Packs queued AI jobs into token-budgeted batches (one job each in local mode)."""
+        multi = self.args.multi_profile
+        if self.args.local:
+            max_jobs, budget, overhead = 1, float("inf"), 0
+        else:
+            profile_count = len(self.ai_filter.CANDIDATE_PROFILES) if multi else 1
+            max_jobs = max(
+                1,
+                config.AI_MAX_OUTPUT_TOKENS // (config.AI_OUTPUT_TOKENS_PER_JOB * profile_count),
+            )
+            budget = config.AI_MAX_INPUT_TOKENS
+            overhead = self.ai_filter.prompt_overhead_tokens(multi)
+
+        current, used, first_at = [], overhead, None
+        try:
+            while not self.stop.is_set():
+                # A partial batch is sent once it has waited AI_BATCH_LINGER_S for company
+                timeout = 0.2
+                if current:
+                    timeout = max(0.01, first_at + config.AI_BATCH_LINGER_S - time.monotonic())
+                try:
+                    job = self.ai_jobs.get(timeout=timeout)
+                except queue.Empty:
+                    job = None
+
+                if job is _DONE:
+                    if current:
+                        self._put(self.batches, current)
+                    return
+
+                if job is not None:
+                    cost = batching.job_tokens(job)
+                    if current and (used + cost > budget or len(current) >= max_jobs):
+                        if not self._put(self.batches, current):
+                            return
+                        current, used = [], overhead
+                    if not current:
+                        first_at = time.monotonic()
+                    current.append(job)
+                    used += cost
+
+                if current and (
+                    len(current) >= max_jobs
+                    or time.monotonic() - first_at >= config.AI_BATCH_LINGER_S
+                ):
+                    if not self._put(self.batches, current):
+                        return
+                    current, used = [], overhead
+        finally:
+            for _ in range(self.ai_workers):
+                self._put(self.batches, _DONE)
+
+    def _evaluate(self):
+        evaluate = (
+            self.ai_filter.evaluate_batch_multi
+            if self.args.multi_profile
+            else self.ai_filter.evaluate_batch
+        )
+        try:
+            while True:
+                batch = self._get(self.batches)
+                if batch is None or batch is _DONE:
+                    return
+                started = time.monotonic()
+                results, meta, _ = evaluator.evaluate_with_retry(
+                    batch,
+                    lambda b, m: evaluate(b, force_local=self.args.local, think=self.args.think, usage=m),
+                    limiter=self.limiter,
+                    quota_pause=config.AI_QUOTA_PAUSE_S,
+                    budget=self.budget,
+                )
+                if results is None:
+                    continue  # Budget spent: the batch stays 'Pending AI' for the next run
+                self.stats.add("ai", time.monotonic() - started, items=len(batch))
+                # Verdicts are written even when stopping, so finished LLM calls aren't lost
+                self.writes.put(("verdicts", batch, results, meta))
+        finally:
+            self.writes.put(("ai_done",))
+
+    def _report(self):
+        """Refreshes the Excel tracker every REPORT_INTERVAL_S while jobs are flowing."""
+        last_version = None
+        while not self.finished.wait(config.REPORT_INTERVAL_S):
+            conn = sqlite3.connect(config.DB_FILENAME)
+            try:
+                version = database.get_data_version(conn)
+            finally:
+                conn.close()
+            if version != last_version:
+                started = time.monotonic()
+                file_manager.save_to_excel(None)
+                self.stats.add("report", time.monotonic() - started)
+                last_version = version
+
+    def run(self):
+        """Runs all stages until the input is exhausted (or Ctrl-C). Returns the stage stats."""
+        stages = []
+        for source in self.sources:
+            stages.append(threading.Thread(target=self._produce_links, args=(source,), name=f"links-{source.name}"))
+            stages += [
+                threading.Thread(target=self._fetch, args=(source,), name=f"fetch-{source.name}-{i}")
+                for i in range(source.max_workers)
+            ]
+        if self.ai_filter:
+            stages.append(threading.Thread(target=self._batch, name="batcher"))
+            stages += [
+                threading.Thread(target=self._evaluate, name=f"ai-{i}")
+                for i in range(self.ai_workers)
+            ]
+        writer = threading.Thread(target=self._write, name="writer")
+        reporter = threading.Thread(target=self._report, name="report", daemon=True)
+
+        print(
+            f"🚰 Streaming pipeline: {self.fetch_workers} fetchers, "
+            f"{self.ai_workers if self.ai_filter else 0} AI workers."
+        )
+        # WAL lets the report thread read while the writer commits
+        conn = sqlite3.connect(config.DB_FILENAME)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+
+        started = time.time()
+        for thread in stages + [writer, reporter]:
+            thread.start()
+
+        try:
+            # Short joins so Ctrl-C reaches the main thread
+            while writer.is_alive():
+                writer.join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping pipeline: finishing in-flight work...")
+            self.stop.set()
+            for thread in stages:
+                thread.join()
+            self.finished.set()
+            writer.join()
+        finally:
+            self.stop.set()
+            self.finished.set()
+            for thread in stages:
+                thread.join()
+
+        print(f"🚰 Pipeline done in {time.time() - started:.1f}s ({self.stats.summary()}).")
+        if self.ai_filter:
+            conn = sqlite3.connect(config.DB_FILENAME)
+            database.report_ai_backlog(conn, stopped=self.budget.stopped)
+            conn.close()
+        return self.stats
+
+
+def run(args, search_list, ai_filter=None, dumb_filter=None, budget=None):
+    return Pipeline(args, search_list, ai_filter, dumb_filter, budget).run()
@@ -0,0 +1,302 @@
+"""
+Per-stage profiling for main.py runs (python main.py --profile).
+
+Each stage (sync, scrape/stream, ai, report) gets its own cProfile and a
+tracemalloc peak / top allocation sites. Threads started during a stage (the
+crawl's fetchers, the pipeline stages, the AI workers) get a cProfile of their
+own that is merged into the stage's stats when it ends; on Python 3.12+ the
+stage's profiler already sees every thread. With --profile-stacks, a background
+thread also samples every thread's stack into a collapsed-stack file that
+flamegraph.pl, speedscope or inferno can render. Everything lands in
+output/profiles/<timestamp>/.
+
+Compare two runs:
+
+    python profiling.py output/profiles/20260101_080000 output/profiles/20260102_080000
+"""
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+
+PROFILE_DIR = os.path.join(config.OUTPUT_DIR, "profiles")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Functions whose numbers are pulled into summary.json for run-to-run comparison
+HOT_PATHS = [
+    "scrape_ad_details",
+    "get_job_links",
+    "is_relevant_basic",
+    "add_job_to_db",
+    "evaluate_batch",
+    "save_to_excel",
+    "save_to_txt",
+    "save_batches",
+    "export_parquet",
+]
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+SAMPLE_INTERVAL_S = 0.005
+
+# From 3.12 cProfile runs on sys.monitoring: one profiler covers all threads, and a second
+# one can't be enabled while it runs
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def _import_cprofile():
+    """
+    cProfile does `import profile` for the stdlib module, but the tracker's own
+    profile.py (CANDIDATE_PROFILE) sits first on sys.path and shadows it. Import
+    cProfile against the stdlib copy, then hand the name 'profile' back.
+    """
+    if "cProfile" in sys.modules:
+        return sys.modules["cProfile"]
+
+    user_profile = sys.modules.pop("profile", None)
+    saved_path = sys.path[:]
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != ROOT]
+    try:
+        import cProfile
+    finally:
+        sys.path[:] = saved_path
+        if user_profile is not None:
+            sys.modules["profile"] = user_profile
+        else:
+            sys.modules.pop("profile", None)
+    return cProfile
+
+
+class StackSampler(threading.Thread):
+    """Samples all threads' stacks every `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self.halt = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self.halt.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    def __init__(self, base_dir=PROFILE_DIR, sample_stacks=False):
+        self.cProfile = _import_cprofile()
+        self.dir = os.path.join(base_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(self.dir, exist_ok=True)
+        self.stages = {}
+        self.current = None
+        self.thread_profilers = []
+        self.lock = threading.Lock()
+        self.sampler = StackSampler() if sample_stacks else None
+
+        tracemalloc.start(10)
+        if self.sampler:
+            self.sampler.start()
+
+    def begin(self, name):
+        if self.current:
+            self.end()
+        tracemalloc.reset_peak()
+        profiler = self.cProfile.Profile()
+        self.current = (name, profiler, time.perf_counter())
+        if not PROFILER_SEES_ALL_THREADS:
+            threading.setprofile(self._profile_thread)
+        profiler.enable()
+
+    def _profile_thread(self, frame, event, arg):
+        """First profiler event of a thread started during the stage: give it its own cProfile."""
+        profiler = self.cProfile.Profile()
+        with self.lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()  # Replaces this hook for the thread
+
+    def end(self):
+        if not self.current:
+            return
+        name, profiler, started = self.current
+        profiler.disable()
+        threading.setprofile(None)
+        with self.lock:
+            thread_profilers, self.thread_profilers = self.thread_profilers, []
+        self.current = None
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        # Allocation sites still alive at the end of the stage, minus the profiler's own
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, self.cProfile.__file__),
+            ]
+        )
+
+        stats = self._merged_stats(profiler, thread_profilers)
+        stats.dump_stats(os.path.join(self.dir, f"{name}.prof"))
+        self._write_text_report(name, stats)
+        with open(os.path.join(self.dir, f"{name}.alloc.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {peak / 1e6:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+        self.stages[name] = {
+            "wall_s": round(wall, 3),
+            "tracemalloc_peak_mb": round(peak / 1e6, 2),
+            "threads_profiled": len(thread_profilers),
+            "hot_paths": self._hot_paths(stats),
+        }
+        print(f"   🔬 Profiled '{name}': {wall:.1f}s, peak {peak / 1e6:.1f} MB traced")
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    @staticmethod
+    def _merged_stats(profiler, thread_profilers):
+        """The stage's own stats plus those of the threads it started."""
+        import pstats
+
+        stats = pstats.Stats(profiler)
+        for thread_profiler in thread_profilers:
+            # A thread still running (a daemon) keeps its profiler; its calls so far count
+            thread_profiler.create_stats()
+            if thread_profiler.stats:
+                stats.add(thread_profiler)
+        return stats
+
+    def _write_text_report(self, name, stats):
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        with open(os.path.join(self.dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+
+    @staticmethod
+    def _hot_paths(stats):
+        hot = {}
+        for (filename, _, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            if function in HOT_PATHS and filename.startswith(ROOT):
+                hot[function] = {
+                    "calls": ncalls,
+                    "tottime_s": round(tottime, 4),
+                    "cumtime_s": round(cumtime, 4),
+                }
+        return hot
+
+    def finish(self):
+        self.end()
+        if self.sampler:
+            self.sampler.halt.set()
+            self.sampler.join()
+            self.sampler.write(os.path.join(self.dir, "stacks.collapsed"))
+        tracemalloc.stop()
+
+        with open(os.path.join(self.dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "argv": sys.argv,
+                    "threads": "all (sys.monitoring)" if PROFILER_SEES_ALL_THREADS else "per-thread cProfile, merged",
+                    "stages": self.stages,
+                },
+                f,
+                indent=2,
+            )
+        print(f"🔬 Profiles written to {self.dir}")
+
+
+_active = None
+
+
+def enable(sample_stacks=False):
+    global _active
+    _active = RunProfiler(sample_stacks=sample_stacks)
+    print(f"🔬 Profiling enabled -> {_active.dir}")
+
+
+def begin(name):
+    if _active:
+        _active.begin(name)
+
+
+def end():
+    if _active:
+        _active.end()
+
+
+@contextmanager
+def stage(name):
+    """Profiles the block as stage `name` when --profile is on; no-op otherwise."""
+    if not _active:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+def finish():
+    global _active
+    if _active:
+        _active.finish()
+        _active = None
+
+
+def compare(dir_a, dir_b):
+    """Prints per-stage wall time, memory peak and hot-path cumtime of two profiled runs."""
+    runs = []
+    for path in (dir_a, dir_b):
+        with open(os.path.join(path, "summary.json"), encoding="utf-8") as f:
+            runs.append(json.load(f)["stages"])
+
+    a, b = runs
+    for name in list(dict.fromkeys(list(a) + list(b))):
+        sa, sb = a.get(name, {}), b.get(name, {})
+        print(
+            f"{name}: {sa.get('wall_s', '-')}s -> {sb.get('wall_s', '-')}s, "
+            f"peak {sa.get('tracemalloc_peak_mb', '-')} MB -> {sb.get('tracemalloc_peak_mb', '-')} MB"
+        )
+        hot_a, hot_b = sa.get("hot_paths", {}), sb.get("hot_paths", {})
+        for function in HOT_PATHS:
+            if function in hot_a or function in hot_b:
+                ca = hot_a.get(function, {}).get("cumtime_s", "-")
+                cb = hot_b.get(function, {}).get("cumtime_s", "-")
+                print(f"   {function:<20} {ca}s -> {cb}s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    compare(sys.argv[1], sys.argv[2])
@@ -1,57 +1,44 @@
 import json
-import os
-import re
+from functools import partial
 from profile import CANDIDATE_PROFILE
 
-import lmstudio as lms
+from rag.batching import estimate_tokens
+from rag.evaluator import QuotaExceeded
+from rag.providers import get_provider
+from rag.response_parser import (
+    VERDICT_LIST_SCHEMA,
+    VERDICT_SCHEMA,
+    multi_verdict_schema,
+    parse_verdicts,
+    validate_multi_verdict,
+)
 
-# --- CONFIGURATION ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL_NAME = "gemini-3-flash-preview"
+# Optional: several named profiles ({"data_engineer": "...", "backend": "..."}) for --multi-profile
+try:
+    from profile import CANDIDATE_PROFILES
+except ImportError:
+    CANDIDATE_PROFILES = {"default": CANDIDATE_PROFILE}
 
-LOCAL_MODEL_NAME = "qwen/qwen3.5-9b"
 
-if GEMINI_API_KEY:
-    import google.generativeai as genai
+def prompt_overhead_tokens(multi_profile=False):
+    """Estimated tokens of the batch prompt without any jobs (instructions + profile(s))."""
+    if multi_profile:
+        return sum(estimate_tokens(text) for text in CANDIDATE_PROFILES.values()) + 300
+    return estimate_tokens(CANDIDATE_PROFILE) + 200
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-else:
-    model = None
 
+def _profiles_block():
+    return "\n\n".join(f"[{pid}]\n{text}" for pid, text in CANDIDATE_PROFILES.items())
 
-def clean_json_text(text):
-    """Clean JSON string from Markdown or chatter."""
-    text = text.strip()
-    
-    # NEW: Ruthlessly slice out any <think> blocks and their contents
-    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
 
-    if "```" in text:
-        text = re.sub(r"```json|```", "", text).strip()
-
-    start_brace = text.find("{")
-    end_brace = text.rfind("}")
-    if start_brace != -1 and end_brace != -1:
-        text = text[start_brace:end_brace+1]
-
-    # Fix common LLM JSON mistakes
-    text = text.replace("'", '"')               
-    text = re.sub(r'\bTrue\b', 'true', text)         
-    text = re.sub(r'\bFalse\b', 'false', text)       
-    text = re.sub(r'\bNone\b', 'null', text)         
-    text = re.sub(r',\s*}', '}', text)               
-    text = re.sub(r',\s*]', ']', text)               
-
-    return text
-
-def evaluate_batch(job_list, force_local=False, think=False):
+def evaluate_batch(job_list, force_local=False, think=False, usage=None):
     """
     Evaluates jobs.
     - If force_local=True: Uses LM Studio SDK (Batch Size 1 expected).
     - think: If True, enables Qwen3.5 extended thinking via chat_template_kwargs.
              Defaults to False (thinking disabled, faster).
     - If force_local=False: Uses Gemini with Batch Prompt.
+    - usage: Optional dict, filled with the provider's real token counts when available.
     """
 
     # 1. LOCAL LM STUDIO PATH
@@ -70,7 +57,7 @@ def evaluate_batch(job_list, force_local=False, think=False):
         JOB:
         Title: {job['title']}
         Employer: {job['employer']}
-        Description: {job['description'][:2000]}
+        Description: {job['description']}
 
         INSTRUCTIONS:
         1. Decide if it's a match based on the profile.
@@ -79,34 +66,25 @@ def evaluate_batch(job_list, force_local=False, think=False):
            10 = Perfect Entry Level role
 
         OUTPUT JSON ONLY:
-        {{
-            "{job['id']}": {{ "match": true/false, "reason": "Short reason", "score": 5 }}
-        }}
+        {{ "id": "{job['id']}", "match": true/false, "reason": "Short reason", "score": 5 }}
         """
         try:
-            llm = lms.llm(LOCAL_MODEL_NAME)
-            chat = lms.Chat()
-            chat.add_user_message(prompt)
-
-            # You can safely leave this config here, but the prompt directive does the heavy lifting now
-            config = {"temperature": 0.0, "chat_template_kwargs": {"enable_thinking": False}}
-            if think:
-                config["chat_template_kwargs"] = {"enable_thinking": True}
-
-            result = llm.respond(
-                chat,
-                config=config,
+            raw = get_provider(local=True).generate(
+                prompt, think=think, usage=usage, schema=VERDICT_SCHEMA
             )
-            raw = str(result)
             print(f"      🔍 RAW: {raw[:300]}")
-            return json.loads(clean_json_text(raw))
+            return parse_verdicts(raw, expected_ids=[job["id"]])
 
+        except QuotaExceeded:
+            # Only an HTTP server (LOCAL_LLM_BASE_URL) can answer 429; back off like Gemini
+            raise
         except Exception as e:
             print(f"   ❌ LM Studio Failed: {e}")
             return {}
 
     # 2. GEMINI CLOUD PATH
-    if model:
+    gemini = get_provider(local=False)
+    if gemini.available:
         jobs_json = json.dumps(job_list, indent=2)
         prompt = f"""
         Act as a strict technical screener.
@@ -123,16 +101,117 @@ def evaluate_batch(job_list, force_local=False, think=False):
         Input:
         {jobs_json}
 
-        Return JSON object mapping Job ID -> {{ "match": boolean, "reason": "string", "score": integer }}.
+        Return a JSON array with one object per job:
+        [{{ "id": "string", "match": boolean, "reason": "string", "score": integer }}]
+        """
+        expected_ids = [job["id"] for job in job_list]
+        try:
+            raw = gemini.generate(prompt, usage=usage, schema=VERDICT_LIST_SCHEMA)
+            verdicts = parse_verdicts(raw, expected_ids=expected_ids)
+            if len(verdicts) < len(expected_ids):
+                print(
+                    f"   🩹 Salvaged {len(verdicts)}/{len(expected_ids)} verdicts; the rest stay 'Pending AI'."
+                )
+            return verdicts
+        except QuotaExceeded:
+            # Let the evaluator back off and retry instead of failing open
+            raise
+        except Exception as e:
+            print(f"   ⚠️ Gemini Error: {e}")
+            return {}
+
+    return {}
+
+
+def evaluate_batch_multi(job_list, force_local=False, think=False, usage=None):
+    """
+    Like evaluate_batch, but scores every job against all CANDIDATE_PROFILES in
+    the same request, so each description is sent once no matter how many
+    profiles are tracked.
+
+    Returns {job_id: {"match", "reason", "score", "profiles": {profile_id: verdict}}},
+    where match/score summarize the profiles (any match, best score).
+    """
+    profile_ids = list(CANDIDATE_PROFILES)
+    validate = partial(validate_multi_verdict, profile_ids=set(profile_ids))
+    expected_ids = [job["id"] for job in job_list]
+    example = ", ".join(
+        f'"{pid}": {{ "match": true/false, "reason": "Short reason", "score": 5 }}' for pid in profile_ids
+    )
+
+    if force_local:
+        job = job_list[0]
+        think_directive = "/think\n" if think else "/no_think\n"
+        prompt = f"""{think_directive}ROLE: STRICT TECHNICAL RECRUITER.
+        TASK: EVALUATE THIS JOB SEPARATELY FOR EACH CANDIDATE PROFILE BELOW.
+
+        CANDIDATE PROFILES:
+        {_profiles_block()}
+
+        JOB:
+        Title: {job['title']}
+        Employer: {job['employer']}
+        Description: {job['description']}
+
+        INSTRUCTIONS:
+        1. For each profile, decide if it's a match.
+        2. For each profile, assign a SUITABILITY SCORE (1-10).
+           1 = Irrelevant/Senior/Wrong Stack.
+           10 = Perfect Entry Level role
+
+        OUTPUT JSON ONLY:
+        {{ "id": "{job['id']}", "profiles": {{ {example} }} }}
+        """
+        try:
+            raw = get_provider(local=True).generate(
+                prompt, think=think, usage=usage, schema=multi_verdict_schema(profile_ids)
+            )
+            print(f"      🔍 RAW: {raw[:300]}")
+            return parse_verdicts(raw, expected_ids=expected_ids, validate=validate)
+
+        except QuotaExceeded:
+            raise
+        except Exception as e:
+            print(f"   ❌ LM Studio Failed: {e}")
+            return {}
+
+    gemini = get_provider(local=False)
+    if gemini.available:
+        jobs_json = json.dumps(job_list, indent=2)
+        prompt = f"""
+        Act as a strict technical screener.
+        Evaluate every job separately for each of these candidate profiles:
+        {_profiles_block()}
+
+        For each job and each profile:
+        1. Determine if it matches (True/False).
+        2. Assign a Suitability Score (1-10), where 10 is perfect fit.
+
+        Rules:
+        - Reject Senior/Manager roles.
+
+        Input:
+        {jobs_json}
+
+        Return a JSON array with one object per job:
+        [{{ "id": "string", "profiles": {{ {example} }} }}]
         """
         try:
-            response = model.generate_content(prompt)
-            return json.loads(clean_json_text(response.text))
+            raw = gemini.generate(
+                prompt,
+                usage=usage,
+                schema={"type": "array", "items": multi_verdict_schema(profile_ids)},
+            )
+            verdicts = parse_verdicts(raw, expected_ids=expected_ids, validate=validate)
+            if len(verdicts) < len(expected_ids):
+                print(
+                    f"   🩹 Salvaged {len(verdicts)}/{len(expected_ids)} verdicts; the rest stay 'Pending AI'."
+                )
+            return verdicts
+        except QuotaExceeded:
+            raise
         except Exception as e:
-            if "429" in str(e):
-                print(f"   ⏳ Gemini Quota Hit. Failing open.")
-            else:
-                print(f"   ⚠️ Gemini Error: {e}")
+            print(f"   ⚠️ Gemini Error: {e}")
             return {}
 
     return {}
@@ -0,0 +1,82 @@
+import json
+
+# Rough average for mixed Norwegian/English prose and JSON.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate. Good enough for packing; real counts are logged per batch."""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts `text` to roughly `max_tokens` tokens."""
+    text = text or ""
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit]
+
+
+def job_tokens(job):
+    """Estimated prompt tokens for one job as it is serialized into the batch prompt."""
+    return estimate_tokens(json.dumps(job, ensure_ascii=False, indent=2))
+
+
+def batch_tokens(batch):
+    return sum(job_tokens(job) for job in batch)
+
+
+def pack_by_tokens(items, token_budget, cost, overhead_tokens=0, max_items=None):
+    """
+    Greedily groups `items` (in order) so each group's `cost(item)` sum plus
+    `overhead_tokens` stays within `token_budget`. An item bigger than the
+    budget still gets a group of its own. Yields lists.
+    """
+    current = []
+    used = overhead_tokens
+
+    for item in items:
+        item_cost = cost(item)
+        if current and (
+            used + item_cost > token_budget or (max_items and len(current) >= max_items)
+        ):
+            yield current
+            current = []
+            used = overhead_tokens
+
+        current.append(item)
+        used += item_cost
+
+    if current:
+        yield current
+
+
+def pack_batches(
+    jobs,
+    max_input_tokens,
+    max_output_tokens,
+    output_tokens_per_job,
+    overhead_tokens=0,
+    max_jobs=None,
+):
+    """
+    Greedily packs `jobs` into batches that fit the request budget.
+
+    A batch is closed when adding the next job would exceed either
+    - the input budget (`overhead_tokens` for the prompt/profile + the jobs), or
+    - the output budget (`output_tokens_per_job` per verdict), or
+    - `max_jobs` (optional hard cap).
+
+    A single job that is bigger than the budget still gets its own batch.
+    Yields lists of jobs, so it can be fed straight from a generator.
+    """
+    max_jobs_by_output = max(1, max_output_tokens // max(1, output_tokens_per_job))
+    if max_jobs:
+        max_jobs_by_output = min(max_jobs_by_output, max_jobs)
+
+    return pack_by_tokens(
+        jobs,
+        max_input_tokens,
+        cost=job_tokens,
+        overhead_tokens=overhead_tokens,
+        max_items=max_jobs_by_output,
+    )
@@ -0,0 +1,136 @@
+import re
+
+from rag.batching import estimate_tokens
+
+# Section headings (lowercase), matched against whole lines only (see _heading_rank).
+# A heading line switches the "current section" until the next heading. Keep markers
+# are checked first.
+KEEP_SECTIONS = [
+    # Requirements / qualifications (most valuable for matching)
+    "kvalifikasjoner", "ønskede kvalifikasjoner", "qualifications", "requirements", "krav",
+    "du har", "you have", "vi ser etter", "we are looking for", "we're looking for",
+    "ønsket kompetanse", "kompetanse", "skills", "erfaring", "experience", "teknologi",
+    "tech stack",
+    # Responsibilities
+    "arbeidsoppgaver", "oppgaver", "responsibilities", "what you will do",
+    "what you'll do", "your role", "rollen", "stillingen",
+]
+
+DROP_SECTIONS = [
+    "om oss", "om selskapet", "om arbeidsgiver", "about us", "about the company",
+    "who we are", "hvem er vi", "hvem vi er", "vi tilbyr", "we offer", "benefits",
+    "fordeler", "goder", "personalgoder", "lønn", "lønnsbetingelser", "salary", "søknad",
+    "søknadsfrist", "slik søker du", "how to apply", "kontakt", "kontaktperson",
+    "kontaktpersoner", "kontaktinformasjon", "contact", "mangfold", "diversity",
+    "equal opportunity", "equal opportunities",
+    "personvern", "privacy", "praktisk informasjon", "practical information",
+]
+
+HEADING_MAX_CHARS = 60
+
+# Words a heading ending in ":" may add after a marker ("Lønn og betingelser:")
+HEADING_EXTRA_WORDS = 2
+
+# Leading words ignored when matching a heading ("Hva vi tilbyr", "Dine arbeidsoppgaver", ...)
+HEADING_FILLER = {"hva", "what", "din", "dine", "ditt", "your", "our", "vår", "våre", "om", "the"}
+
+# Ranks used when the budget forces a choice (lower = kept first)
+_RANK_KEEP = 0
+_RANK_NEUTRAL = 1
+_RANK_DROP = 2
+
+
+def _normalize(line):
+    return re.sub(r"\W+", " ", line.lower()).strip()
+
+
+_KEEP_MARKERS = {_normalize(marker) for marker in KEEP_SECTIONS}
+_DROP_MARKERS = {_normalize(marker) for marker in DROP_SECTIONS}
+
+
+def _is_marker(candidate, markers, labelled):
+    # "Kvalifikasjoner og erfaring": nothing but known headings
+    if all(part in markers for part in re.split(r" (?:og|and) ", candidate)):
+        return True
+    if not labelled:
+        return False
+    return any(
+        candidate.startswith(marker + " ") and len(candidate[len(marker):].split()) <= HEADING_EXTRA_WORDS
+        for marker in markers
+    )
+
+
+def _heading_rank(line):
+    """
+    Returns the section rank if `line` is a heading, else None.
+    The whole line must be known headings (joined by "og"/"and"); one ending in ":" may
+    add a couple of words.
+    Body text that merely starts like one ("Kontakt med kunder ...") is not a heading.
+    """
+    if len(line) > HEADING_MAX_CHARS:
+        return None
+    labelled = line.endswith(":")
+    normalized = _normalize(line)
+    words = normalized.split()
+    candidates = [normalized]
+    if len(words) > 1 and words[0] in HEADING_FILLER:
+        candidates.append(" ".join(words[1:]))
+
+    for candidate in candidates:
+        if _is_marker(candidate, _KEEP_MARKERS, labelled):
+            return _RANK_KEEP
+    for candidate in candidates:
+        if _is_marker(candidate, _DROP_MARKERS, labelled):
+            return _RANK_DROP
+    return None
+
+
+def compact_description(text, token_budget):
+    """
+    Shrinks a job description for the LLM:
+    1. Drops repeated lines/paragraphs (same text after normalizing case and punctuation).
+    2. Drops boilerplate sections ("Om oss", "Vi tilbyr", benefits, how to apply, ...).
+    3. If still over `token_budget`, keeps requirement/responsibility sections first,
+       then unlabelled text, preserving the original order of what is kept.
+
+    Boilerplate is only used as filler when nothing else is left, so a description
+    that is entirely "about us" still returns something.
+    """
+    if not text:
+        return ""
+
+    lines = [line.strip() for line in text.splitlines()]
+    rank = _RANK_NEUTRAL
+    seen = set()
+    ranked = []  # (rank, index, line)
+
+    for line in lines:
+        if not line:
+            continue
+        heading = _heading_rank(line)
+        if heading is not None:
+            rank = heading
+
+        key = _normalize(line)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        ranked.append((rank, len(ranked), line))
+
+    wanted = [item for item in ranked if item[0] != _RANK_DROP] or ranked
+
+    chosen = []
+    used = 0
+    for item in sorted(wanted, key=lambda item: (item[0], item[1])):
+        cost = estimate_tokens(item[2])
+        if used + cost > token_budget:
+            if not chosen:
+                # One huge line: keep as much of it as fits
+                chosen.append((item[0], item[1], item[2][: token_budget * 4]))
+                used = token_budget
+            continue
+        chosen.append(item)
+        used += cost
+
+    chosen.sort(key=lambda item: item[1])
+    return "\n".join(item[2] for item in chosen)
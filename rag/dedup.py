@@ -0,0 +1,154 @@
+import hashlib
+import random
+import re
+from array import array
+
+import config
+
+# MinHash / LSH parameters.
+# 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a bucket,
+# and candidates are then checked against DEDUP_THRESHOLD on the full signature.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+DEDUP_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+MAX_WORDS = 2000
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1212)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize(title, employer, description):
+    """Lowercased words of title + employer + description, punctuation and numbers dropped."""
+    text = f"{title or ''} {employer or ''} {description or ''}".lower()
+    return re.findall(r"[^\W\d_]+", text)[:MAX_WORDS]
+
+
+def shingles(words):
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, employer, description):
+    """MinHash signature (NUM_PERM unsigned 61-bit ints) of one ad."""
+    hashes = [_hash64(s) for s in shingles(normalize(title, employer, description))]
+    if not hashes:
+        return [_MERSENNE] * NUM_PERM
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def band_keys(sig):
+    """One bucket key per band (signed 63-bit so SQLite stores it as INTEGER)."""
+    keys = []
+    for band in range(BANDS):
+        chunk = ",".join(str(v) for v in sig[band * ROWS : (band + 1) * ROWS])
+        keys.append(_hash64(chunk) & 0x7FFFFFFFFFFFFFFF)
+    return keys
+
+
+def _pack(sig):
+    return array("Q", sig).tobytes()
+
+
+def _unpack(blob):
+    sig = array("Q")
+    sig.frombytes(blob)
+    return list(sig)
+
+
+def find_cluster(cursor, sig):
+    """
+    Looks up `sig` in the banded LSH index (one indexed lookup per band).
+    Returns (cluster_id, similarity) of the best match above DEDUP_THRESHOLD, or (None, 0).
+    """
+    candidates = set()
+    for band, key in enumerate(band_keys(sig)):
+        cursor.execute("SELECT job_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, key))
+        candidates.update(row[0] for row in cursor.fetchall())
+
+    best_id, best_sim = None, 0.0
+    for job_id in candidates:
+        cursor.execute(
+            "SELECT m.signature, j.cluster_id FROM job_minhash m JOIN scraped_jobs j ON j.ID = m.job_id WHERE m.job_id = ?",
+            (job_id,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            continue
+        sim = similarity(sig, _unpack(row[0]))
+        if sim >= DEDUP_THRESHOLD and sim > best_sim:
+            best_id, best_sim = row[1] or job_id, sim
+    return best_id, best_sim
+
+
+def index_job(cursor, job_id, title, employer, description):
+    """
+    Adds one ad to the LSH index and sets its cluster_id.
+    Returns (cluster_id, similarity); a new cluster uses the ad's own ID and similarity 0.
+    """
+    sig = signature(title, employer, description)
+    cluster_id, sim = find_cluster(cursor, sig)
+    if cluster_id is None:
+        cluster_id = job_id
+
+    cursor.execute("INSERT OR REPLACE INTO job_minhash (job_id, signature) VALUES (?, ?)", (job_id, _pack(sig)))
+    cursor.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
+    cursor.executemany(
+        "INSERT INTO lsh_buckets (band, bucket, job_id) VALUES (?, ?, ?)",
+        [(band, key, job_id) for band, key in enumerate(band_keys(sig))],
+    )
+    cursor.execute("UPDATE scraped_jobs SET cluster_id = ? WHERE ID = ?", (cluster_id, job_id))
+    return cluster_id, sim
+
+
+def reindex_job(cursor, job_id, title, employer, description):
+    """
+    index_job for an ad whose text changed (refresh.py): drops its old signature first,
+    so it isn't matched against itself, and hands the cluster it founded (if others
+    joined it) to the lowest remaining member ID. Returns (cluster_id, similarity).
+    """
+    cursor.execute("SELECT MIN(ID) FROM scraped_jobs WHERE cluster_id = ? AND ID != ?", (job_id, job_id))
+    new_root = cursor.fetchone()[0]
+    if new_root is not None:
+        cursor.execute(
+            "UPDATE scraped_jobs SET cluster_id = ? WHERE cluster_id = ? AND ID != ?", (new_root, job_id, job_id)
+        )
+    cursor.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
+    cursor.execute("DELETE FROM job_minhash WHERE job_id = ?", (job_id,))
+    return index_job(cursor, job_id, title, employer, description)
+
+
+def cluster_verdict(cursor, cluster_id, exclude_id=None):
+    """
+    Returns (status, score) of an AI-evaluated member of the cluster, or None.
+    Approved members (including ones the user has since acted on) map to 'Not searched'.
+    A score of 0 means the row was never scored (e.g. --no-ai), so it doesn't count.
+    """
+    cursor.execute(
+        """
+        SELECT status, score FROM scraped_jobs
+        WHERE cluster_id = ? AND ID != ? AND score > 0
+          AND status NOT IN ('Pending AI', 'Discarded (Basic)')
+        ORDER BY score DESC
+        LIMIT 1
+        """,
+        (cluster_id, exclude_id if exclude_id is not None else -1),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    status, score = row
+    # Any tracker status (Sent Application, Rejected, ...) means the AI approved it first
+    return ("Not searched" if status in config.STATUS_OPTIONS else status), score
@@ -1,10 +1,19 @@
 # dumb_filter.py
+import metrics
+
 
 def is_relevant_basic(title, description):
     """
     Returns (True, "Reason") if the job passes the basic keyword checks.
     Returns (False, "Reason") if it fails.
     """
+    with metrics.timer("dumb_filter_ms"):
+        is_ok, reason = _check(title, description)
+    metrics.inc("dumb_filter_total", result="pass" if is_ok else "reject")
+    return is_ok, reason
+
+
+def _check(title, description):
     title_lower = title.lower()
     desc_lower = description.lower()
 
@@ -0,0 +1,261 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from rag.batching import batch_tokens
+
+
+class QuotaExceeded(Exception):
+    """Raised by a provider when it answers with a rate-limit / quota error (HTTP 429)."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Refills continuously at `rate_per_minute` up to `capacity` (defaults to one minute's worth).
+    A rate of 0 (or None) means unlimited, but `pause()` still blocks it.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = (rate_per_minute or 0) / 60.0
+        self.capacity = capacity or rate_per_minute or 0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` tokens are available, then takes them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                # A pause after a 429 holds even when the bucket itself is unlimited
+                if now < self.blocked_until:
+                    wait_for = self.blocked_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self._refill(now)
+                    # A single request larger than the bucket would wait forever
+                    amount = min(amount, self.capacity)
+                    if self.tokens >= amount:
+                        self.tokens -= amount
+                        return
+                    wait_for = (amount - self.tokens) / self.rate
+            time.sleep(min(max(wait_for, 0.01), 5))
+
+    def pause(self, seconds):
+        """Stops handing out tokens for `seconds` (used after a 429)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class RateLimiter:
+    """Requests-per-minute + tokens-per-minute limiter shared by all workers."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, token_count):
+        self.requests.acquire(1)
+        self.tokens.acquire(token_count)
+
+    def pause(self, seconds):
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+
+class Budget:
+    """
+    Caps on one run's AI spend: LLM calls, tokens (prompt + output) and wall time.
+    0 / None means unlimited. A batch is only sent if `allow()` says it still fits;
+    once a cap is hit (or the provider's quota is gone for good) nothing new is sent
+    and the rest of the backlog stays 'Pending AI' for the next run.
+    """
+
+    def __init__(self, max_calls=None, max_tokens=None, time_budget_s=None):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.time_budget_s = time_budget_s
+        self.started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+        self.stopped = None  # Reason, once spent
+        self.lock = threading.Lock()
+
+    def allow(self, est_tokens):
+        """Reserves one call and `est_tokens` if they still fit the budget."""
+        with self.lock:
+            if self.stopped:
+                return False
+            if self.time_budget_s and time.monotonic() - self.started >= self.time_budget_s:
+                kind, reason = "time", f"time budget of {self.time_budget_s}s"
+            elif self.max_calls and self.calls >= self.max_calls:
+                kind, reason = "calls", f"{self.max_calls} LLM calls"
+            elif self.max_tokens and self.tokens + est_tokens > self.max_tokens:
+                kind, reason = "tokens", f"{self.max_tokens} tokens"
+            else:
+                self.calls += 1
+                self.tokens += est_tokens
+                return True
+        self.exhaust(reason, kind)
+        return False
+
+    def settle(self, meta):
+        """Swaps a sent batch's estimate for the provider's real prompt + output tokens."""
+        actual = (meta.get("prompt_tokens") or 0) + (meta.get("output_tokens") or 0)
+        if actual:
+            with self.lock:
+                self.tokens += actual - meta.get("est_input_tokens", 0)
+
+    def exhaust(self, reason, kind="quota"):
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = reason
+        print(f"   🛑 AI budget spent ({reason}): no new requests this run.")
+        metrics.inc("ai_budget_stops_total", kind=kind)
+
+
+def evaluate_concurrently(
+    batches,
+    evaluate_fn,
+    on_result,
+    max_workers=4,
+    limiter=None,
+    max_retries=3,
+    quota_pause=30,
+    budget=None,
+):
+    """
+    Runs `evaluate_fn(batch, meta)` for every batch with up to `max_workers` requests in flight.
+
+    - `limiter` (RateLimiter) is acquired by each worker before calling the provider.
+    - `budget` (Budget) is checked before each new batch is pulled from `batches`; once it
+      is spent (or the quota stays exhausted after `max_retries`), the remaining batches
+      are never read, so a lazy `batches` generator stops touching the backlog.
+    - `meta` is a per-batch dict. The evaluator fills in `est_input_tokens` and `latency_ms`;
+      `evaluate_fn` may add provider numbers (e.g. `prompt_tokens`, `output_tokens`).
+    - `on_result(batch, results, meta)` is called on the CALLING thread as each batch completes,
+      so the caller can write to SQLite without sharing a connection between threads.
+    - A QuotaExceeded error pauses the limiter for `quota_pause` seconds and the batch is retried.
+
+    Returns a dict with simple counters for the run summary (`stopped` = why the budget ran out).
+    """
+    stats = {"batches": 0, "retries": 0, "failed": 0, "stopped": None}
+    budget = budget or Budget()
+
+    def _run(batch, meta):
+        meta["est_input_tokens"] = batch_tokens(batch)
+        if limiter:
+            limiter.acquire(meta["est_input_tokens"])
+        started = time.monotonic()
+        try:
+            return evaluate_fn(batch, meta)
+        finally:
+            meta["latency_ms"] = int((time.monotonic() - started) * 1000)
+            metrics.observe("ai_batch_ms", meta["latency_ms"])
+
+    batch_iter = iter(batches)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+        def _submit(batch, attempt=0):
+            meta = {}
+            in_flight[pool.submit(_run, batch, meta)] = (batch, attempt, meta)
+
+        def _top_up():
+            while len(in_flight) < max_workers and not budget.stopped:
+                batch = next(batch_iter, None)
+                if batch is None or not budget.allow(batch_tokens(batch)):
+                    return
+                _submit(batch)
+
+        # Prime the pool, then keep it topped up as batches finish
+        _top_up()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, attempt, meta = in_flight.pop(future)
+                try:
+                    results = future.result()
+                except QuotaExceeded:
+                    if attempt < max_retries:
+                        print(f"   ⏳ Quota hit. Pausing {quota_pause}s and retrying batch...")
+                        if limiter:
+                            limiter.pause(quota_pause)
+                        else:
+                            time.sleep(quota_pause)
+                        stats["retries"] += 1
+                        metrics.inc("llm_quota_retries_total")
+                        _submit(batch, attempt + 1)
+                        continue
+                    print("   ⏳ Quota still exhausted. Leaving batch as 'Pending AI'.")
+                    # Fail closed: every further request would hit the same wall
+                    budget.exhaust("provider quota")
+                    stats["failed"] += 1
+                    results = {}
+                except Exception as e:
+                    print(f"   ⚠️ Evaluation worker crashed: {e}")
+                    stats["failed"] += 1
+                    results = {}
+
+                budget.settle(meta)
+                stats["batches"] += 1
+                on_result(batch, results, meta)
+
+            _top_up()
+
+    stats["stopped"] = budget.stopped
+    return stats
+
+
+def evaluate_with_retry(batch, evaluate_fn, limiter=None, max_retries=3, quota_pause=30, budget=None):
+    """
+    Blocking single-batch counterpart of evaluate_concurrently, for callers that run
+    their own worker threads (see pipeline.py). Same limiter / QuotaExceeded / budget handling.
+
+    Returns (results, meta, retries); results is None if the budget didn't allow the call.
+    """
+    retries = 0
+    if budget and not budget.allow(batch_tokens(batch)):
+        return None, {}, retries
+    while True:
+        meta = {"est_input_tokens": batch_tokens(batch)}
+        if limiter:
+            limiter.acquire(meta["est_input_tokens"])
+        started = time.monotonic()
+        try:
+            results = evaluate_fn(batch, meta)
+            if budget:
+                budget.settle(meta)
+            return results, meta, retries
+        except QuotaExceeded:
+            if retries >= max_retries:
+                print("   ⏳ Quota still exhausted. Leaving batch as 'Pending AI'.")
+                if budget:
+                    budget.exhaust("provider quota")
+                return {}, meta, retries
+            print(f"   ⏳ Quota hit. Pausing {quota_pause}s and retrying batch...")
+            if limiter:
+                limiter.pause(quota_pause)
+            else:
+                time.sleep(quota_pause)
+            retries += 1
+            metrics.inc("llm_quota_retries_total")
+        except Exception as e:
+            print(f"   ⚠️ Evaluation worker crashed: {e}")
+            return {}, meta, retries
+        finally:
+            meta["latency_ms"] = int((time.monotonic() - started) * 1000)
+            metrics.observe("ai_batch_ms", meta["latency_ms"])
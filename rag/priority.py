@@ -0,0 +1,88 @@
+"""
+Evaluation priority of 'Pending AI' jobs: which ads get the LLM first when a
+run's call / token / time budget can't cover the whole backlog.
+
+    priority = w_urgency * urgency(deadline)        # closing soon first
+             + w_freshness * freshness(date_added)  # new ads before stale ones
+             + w_prescore * prescore(title, text)   # cheap keyword match against the profile
+
+Every part is in [0, 1]; the weights are config.PRIORITY_WEIGHTS. The pre-score
+is stored per job at insert; the priority itself is recomputed at the start of
+each AI phase (database.refresh_ai_priorities), because urgency changes daily.
+"""
+import re
+from datetime import date, datetime
+
+import config
+
+# Deadline texts that mean "hiring on a rolling basis": treat as fairly urgent
+ROLLING_DEADLINES = ("snarest", "asap", "fortløpende", "løpende")
+
+URGENCY_DAYS = 7  # A deadline this many days out scores 0.5
+FRESHNESS_DAYS = 14  # An ad this old scores 0.5
+UNKNOWN_URGENCY = 0.3  # "Se annonse" and other unparseable deadlines
+ROLLING_URGENCY = 0.9
+PRESCORE_SATURATION = 8  # Keyword points for a full pre-score (title hits count double)
+
+
+def _parse_deadline(deadline):
+    match = re.match(r"\s*(\d{1,2})\.(\d{1,2})\.(\d{4})", deadline or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def days_left(deadline, today=None):
+    """Days until a 'dd.mm.yyyy' deadline (negative once passed); None if it isn't a date."""
+    parsed = _parse_deadline(deadline)
+    if parsed is None:
+        return None
+    return (parsed - (today or date.today())).days
+
+
+def urgency(deadline, today=None):
+    text = (deadline or "").strip().lower()
+    if any(word in text for word in ROLLING_DEADLINES):
+        return ROLLING_URGENCY
+    days = days_left(deadline, today)
+    if days is None:
+        return UNKNOWN_URGENCY
+    if days < 0:
+        return 0.0  # Expired: nothing left to win
+    return 1 / (1 + days / URGENCY_DAYS)
+
+
+def freshness(date_added, today=None):
+    try:
+        added = datetime.strptime(str(date_added)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return 0.5
+    age = max(0, ((today or date.today()) - added).days)
+    return 1 / (1 + age / FRESHNESS_DAYS)
+
+
+def prescore(title, description):
+    """Keyword overlap with config.PRIORITY_KEYWORDS, in [0, 1]. No LLM involved."""
+    title_lower = (title or "").lower()
+    desc_lower = (description or "").lower()
+    points = 0
+    for keyword in config.PRIORITY_KEYWORDS:
+        if keyword in title_lower:
+            points += 2
+        elif keyword in desc_lower:
+            points += 1
+    return min(1.0, points / PRESCORE_SATURATION)
+
+
+def priority(deadline, date_added, prescore_value, today=None):
+    weights = config.PRIORITY_WEIGHTS
+    return round(
+        weights["urgency"] * urgency(deadline, today)
+        + weights["freshness"] * freshness(date_added, today)
+        + weights["prescore"] * (prescore_value or 0.0),
+        6,
+    )
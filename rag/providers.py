@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+
+import config
+import metrics
+from rag.evaluator import QuotaExceeded
+
+# --- CONFIGURATION ---
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL_NAME = "gemini-3-flash-preview"
+# e.g. http://127.0.0.1:8766 for benchmarks/fake_llm.py (Gemini REST API on another host)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+LOCAL_MODEL_NAME = "qwen/qwen3.5-9b"
+# Set to talk to an OpenAI-compatible server (LM Studio's HTTP server, llama.cpp,
+# benchmarks/fake_llm.py) over plain HTTP instead of the LM Studio SDK
+LOCAL_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL")
+
+
+def _record_tokens(provider, prompt_tokens, output_tokens, usage=None):
+    """Counts the provider's real token numbers and copies them into `usage` if given."""
+    metrics.inc("llm_requests_total", provider=provider)
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens or 0, provider=provider)
+    metrics.inc("llm_output_tokens_total", output_tokens or 0, provider=provider)
+    if usage is not None:
+        usage["prompt_tokens"] = prompt_tokens
+        usage["output_tokens"] = output_tokens
+
+
+class GeminiProvider:
+    """
+    Google Gemini. The SDK is imported and the model configured on first use,
+    then the same GenerativeModel is reused for the rest of the run.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key=GEMINI_API_KEY, model_name=GEMINI_MODEL_NAME, base_url=GEMINI_BASE_URL):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(self.api_key)
+
+    def warm(self):
+        """Loads the SDK and model now instead of on the first request (used by --watch)."""
+        if self.available:
+            self._get_model()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                started = time.monotonic()
+                import google.generativeai as genai
+
+                if self.base_url:
+                    genai.configure(
+                        api_key=self.api_key, transport="rest", client_options={"api_endpoint": self.base_url}
+                    )
+                else:
+                    genai.configure(api_key=self.api_key)
+                # JSON mode: the model is constrained to emit syntactically valid JSON
+                self._model = genai.GenerativeModel(
+                    self.model_name,
+                    generation_config={
+                        "max_output_tokens": config.AI_MAX_OUTPUT_TOKENS,
+                        "response_mime_type": "application/json",
+                    },
+                )
+                print(
+                    f"   🔥 Gemini model ready in {(time.monotonic() - started) * 1000:.0f} ms"
+                )
+            return self._model
+
+    def generate(self, prompt, usage=None, schema=None):
+        """
+        Returns the raw response text. Raises QuotaExceeded on 429.
+        `schema` is accepted for symmetry; Gemini runs in JSON mode and the shape is in the prompt.
+        """
+        model = self._get_model()
+        try:
+            with metrics.timer("llm_request_ms", provider=self.name):
+                response = model.generate_content(prompt)
+        except Exception as e:
+            if "429" in str(e):
+                metrics.inc("llm_errors_total", provider=self.name, kind="quota")
+                raise QuotaExceeded(str(e)) from e
+            metrics.inc("llm_errors_total", provider=self.name, kind="error")
+            raise
+
+        meta = getattr(response, "usage_metadata", None)
+        if meta is not None:
+            _record_tokens(self.name, meta.prompt_token_count, meta.candidates_token_count, usage)
+        return response.text
+
+
+class LMStudioProvider:
+    """
+    Local model through the LM Studio SDK. The model handle is looked up once
+    and kept warm, instead of calling lms.llm() for every job.
+
+    With a `base_url`, requests go to its OpenAI-compatible /v1/chat/completions
+    endpoint instead, over one pooled HTTP session.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=LOCAL_MODEL_NAME, base_url=LOCAL_BASE_URL):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self._llm = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return True
+
+    def warm(self):
+        """Looks up the model handle now instead of on the first request (used by --watch)."""
+        if self.base_url:
+            self._get_session()
+        else:
+            self._get_llm()
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+
+                self._session = requests.Session()
+            return self._session
+
+    def _get_llm(self):
+        with self._lock:
+            if self._llm is None:
+                started = time.monotonic()
+                import lmstudio as lms
+
+                self._llm = lms.llm(self.model_name)
+                print(
+                    f"   🔥 Local model handle ready in {(time.monotonic() - started) * 1000:.0f} ms"
+                )
+            return self._llm
+
+    def generate(self, prompt, think=False, usage=None, schema=None):
+        """
+        Returns the raw response text.
+        With a JSON `schema`, LM Studio's structured output constrains decoding to it.
+        """
+        # You can safely leave this config here, but the prompt directive does the heavy lifting now
+        config = {"temperature": 0.0, "chat_template_kwargs": {"enable_thinking": think}}
+        if self.base_url:
+            return self._generate_http(prompt, config, usage, schema)
+
+        llm = self._get_llm()
+        # A plain string is sent as a one-message chat, so no Chat object per job
+        try:
+            with metrics.timer("llm_request_ms", provider=self.name):
+                if schema:
+                    result = llm.respond(prompt, config=config, response_format=schema)
+                else:
+                    result = llm.respond(prompt, config=config)
+        except Exception:
+            metrics.inc("llm_errors_total", provider=self.name, kind="error")
+            raise
+
+        stats = getattr(result, "stats", None)
+        if stats is not None:
+            _record_tokens(
+                self.name,
+                getattr(stats, "prompt_tokens_count", None),
+                getattr(stats, "predicted_tokens_count", None),
+                usage,
+            )
+        return str(result)
+
+    def _generate_http(self, prompt, options, usage=None, schema=None):
+        body = dict(options, model=self.model_name, messages=[{"role": "user", "content": prompt}])
+        if schema:
+            body["response_format"] = {"type": "json_schema", "json_schema": {"name": "verdict", "schema": schema}}
+
+        try:
+            with metrics.timer("llm_request_ms", provider=self.name):
+                response = self._get_session().post(
+                    f"{self.base_url}/v1/chat/completions", json=body, timeout=config.AI_HTTP_TIMEOUT_S
+                )
+            if response.status_code == 429:
+                metrics.inc("llm_errors_total", provider=self.name, kind="quota")
+                raise QuotaExceeded(f"429 from {self.base_url}")
+            response.raise_for_status()
+            data = response.json()
+        except QuotaExceeded:
+            raise
+        except Exception:
+            metrics.inc("llm_errors_total", provider=self.name, kind="error")
+            raise
+
+        stats = data.get("usage") or {}
+        _record_tokens(self.name, stats.get("prompt_tokens"), stats.get("completion_tokens"), usage)
+        return data["choices"][0]["message"]["content"]
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(local=False):
+    """Returns the shared (warm) provider instance for this process."""
+    key = "local" if local else "gemini"
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = LMStudioProvider() if local else GeminiProvider()
+        return _providers[key]
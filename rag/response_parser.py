@@ -0,0 +1,222 @@
+import ast
+import json
+import re
+
+# JSON Schema for one verdict. Used for provider structured-output modes and for validation.
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "string"},
+        "match": {"type": "boolean"},
+        "reason": {"type": "string"},
+        "score": {"type": "integer", "minimum": 1, "maximum": 10},
+    },
+    "required": ["id", "match", "reason", "score"],
+}
+
+VERDICT_LIST_SCHEMA = {"type": "array", "items": VERDICT_SCHEMA}
+
+_PROFILE_VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {key: VERDICT_SCHEMA["properties"][key] for key in ("match", "reason", "score")},
+    "required": ["match", "reason", "score"],
+}
+
+
+def multi_verdict_schema(profile_ids):
+    """Schema for one job scored against several profiles: {"id", "profiles": {profile_id: verdict}}."""
+    return {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "profiles": {
+                "type": "object",
+                "properties": {pid: _PROFILE_VERDICT_SCHEMA for pid in profile_ids},
+                "required": list(profile_ids),
+            },
+        },
+        "required": ["id", "profiles"],
+    }
+
+_TRUE = {"true", "yes", "ja", "1"}
+_FALSE = {"false", "no", "nei", "0"}
+
+# '"12345": {'  or  "'12345': {"  (an object keyed by job id)
+_KEYED_OBJECT = re.compile(r"""["']?(\w+)["']?\s*:\s*\{""")
+# Start of an object that carries its own "id" field
+_ID_FIELD = re.compile(r"""["']id["']\s*:\s*["']?(\w+)""")
+
+
+def _strip_wrappers(text):
+    """Removes <think> blocks, Markdown fences and chatter around the JSON."""
+    text = re.sub(r"<think>.*?</think>", "", text or "", flags=re.DOTALL)
+    text = re.sub(r"```(?:json)?", "", text)
+    return text.strip()
+
+
+def _load(fragment):
+    """json.loads, falling back to Python literal syntax (True/False/None, single quotes)."""
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(
+            re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False", re.sub(r"\bnull\b", "None", fragment)))
+        )
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _object_at(text, start):
+    """Returns the balanced {...} starting at `start` (string-aware), or None if it never closes."""
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch == '"':
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+    return None
+
+
+def validate_verdict(raw):
+    """
+    Normalizes one verdict to {"match": bool, "reason": str, "score": int}.
+    Returns None if it has no usable match flag.
+    """
+    if not isinstance(raw, dict):
+        return None
+
+    match = raw.get("match")
+    if isinstance(match, str):
+        lowered = match.strip().lower()
+        match = True if lowered in _TRUE else False if lowered in _FALSE else None
+    if not isinstance(match, bool):
+        return None
+
+    try:
+        score = int(round(float(raw.get("score", 0))))
+    except (TypeError, ValueError):
+        score = 0
+    score = max(0, min(10, score))
+
+    reason = raw.get("reason", "")
+    return {"match": match, "reason": str(reason) if reason is not None else "", "score": score}
+
+
+def validate_multi_verdict(raw, profile_ids=None):
+    """
+    Normalizes one multi-profile verdict ({"profiles": {profile_id: verdict}}) to
+    {"match", "reason", "score", "profiles"}: the job matches if any profile does,
+    and its score is the best profile score. Profiles missing from the response are
+    simply absent. Returns None if no profile has a usable verdict.
+    """
+    if not isinstance(raw, dict) or not isinstance(raw.get("profiles"), dict):
+        return None
+
+    profiles = {}
+    for profile_id, item in raw["profiles"].items():
+        if profile_ids is not None and profile_id not in profile_ids:
+            continue
+        verdict = validate_verdict(item)
+        if verdict is not None:
+            profiles[profile_id] = verdict
+    if not profiles:
+        return None
+
+    matched = [pid for pid, verdict in profiles.items() if verdict["match"]]
+    return {
+        "match": bool(matched),
+        "reason": ", ".join(matched) if matched else "; ".join(v["reason"] for v in profiles.values()),
+        "score": max(verdict["score"] for verdict in profiles.values()),
+        "profiles": profiles,
+    }
+
+
+def _collect(data, expected_ids, verdicts, validate):
+    """Pulls verdicts out of an already-decoded response (object keyed by id, or list with ids)."""
+    if isinstance(data, dict) and isinstance(data.get("results", data.get("jobs")), list):
+        data = data.get("results", data.get("jobs"))
+
+    if isinstance(data, list):
+        items = [(str(item.get("id")), item) for item in data if isinstance(item, dict)]
+    elif isinstance(data, dict):
+        if "id" in data and ("match" in data or "profiles" in data):
+            items = [(str(data["id"]), data)]
+        else:
+            items = [(str(key), value) for key, value in data.items()]
+    else:
+        return
+
+    for job_id, item in items:
+        if expected_ids is not None and job_id not in expected_ids:
+            continue
+        verdict = validate(item)
+        if verdict is not None:
+            verdicts.setdefault(job_id, verdict)
+
+
+def parse_verdicts(text, expected_ids=None, validate=validate_verdict):
+    """
+    Parses a model response into {job_id: verdict}.
+    `validate` normalizes one per-job object (validate_verdict or validate_multi_verdict).
+
+    Accepts an object keyed by job id, or a list of objects with an "id" field.
+    If the response as a whole isn't valid JSON (truncated output, a stray quote,
+    chatter between items), every well-formed per-job object is still salvaged,
+    so only the jobs that really failed stay 'Pending AI'.
+    """
+    expected = {str(i) for i in expected_ids} if expected_ids is not None else None
+    verdicts = {}
+    text = _strip_wrappers(text)
+    if not text:
+        return verdicts
+
+    # 1. Happy path: the whole thing parses
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts:
+        start = min(starts)
+        end = text.rfind("]" if text[start] == "[" else "}")
+        whole = _load(text[start : end + 1]) if end > start else None
+        if whole is not None:
+            _collect(whole, expected, verdicts, validate)
+            if expected is None or len(verdicts) == len(expected):
+                return verdicts
+
+    # 2. Salvage: decode each per-job object on its own
+    for found in _KEYED_OBJECT.finditer(text):
+        job_id = found.group(1)
+        if job_id in verdicts or (expected is not None and job_id not in expected):
+            continue
+        fragment = _object_at(text, found.end() - 1)
+        if fragment:
+            verdict = validate(_load(fragment))
+            if verdict is not None:
+                verdicts[job_id] = verdict
+
+    for found in _ID_FIELD.finditer(text):
+        job_id = found.group(1)
+        if job_id in verdicts or (expected is not None and job_id not in expected):
+            continue
+        start = text.rfind("{", 0, found.start())
+        fragment = _object_at(text, start) if start != -1 else None
+        if fragment:
+            verdict = validate(_load(fragment))
+            if verdict is not None:
+                verdicts[job_id] = verdict
+
+    return verdicts
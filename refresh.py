@@ -0,0 +1,229 @@
+"""
+Refresh of known ads (python main.py --refresh).
+
+An ad is fetched once, when it is found. After that its deadline can be
+extended, its text edited or the posting taken down. This pass re-checks the
+ads that are still in play (config.REFRESH_STATUSES) on a schedule scaled to
+the deadline: ads about to close every few hours, undated or distant ones
+every few days, and ads long past their deadline (or older than
+REFRESH_MAX_AGE_DAYS) not at all.
+
+Every check is a conditional GET with the ETag / Last-Modified the board sent
+last time, so an unchanged ad usually costs a 304. A fetched page is compared
+field by field and by a hash of its description. Only rows that differ are
+written, a 404/410 marks the ad removed, and only a changed description sends
+an AI verdict back to 'Pending AI'.
+
+The schedule lives in the ad_refresh side table, so checks that find nothing
+new never write to scraped_jobs. Ads that aren't due are skipped, so the pass
+can run from cron as often as you like.
+"""
+import hashlib
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import config
+import database
+import metrics
+import profiling
+import sources
+from rag import priority
+
+# scraped_jobs column -> scraped detail it is compared with
+FIELDS = {
+    "title": "Stillingstittel",
+    "employer": "Arbeidsgiver",
+    "deadline": "Søknadsfrist",
+    "location": "Arbeidssted",
+    "contact": "Kontaktperson",
+    "phone": "Mobil",
+}
+
+
+def content_hash(description):
+    """Hash of the description text; whitespace-only edits don't count as a change."""
+    normalized = re.sub(r"\s+", " ", description or "").strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def next_check(deadline, date_added, checked_at):
+    """When to check an ad next (Unix time), or None once it isn't worth checking anymore."""
+    today = date.fromtimestamp(checked_at)
+    try:
+        age = (today - datetime.strptime(str(date_added)[:10], "%Y-%m-%d").date()).days
+    except ValueError:
+        age = 0
+    if age > config.REFRESH_MAX_AGE_DAYS:
+        return None
+
+    days = priority.days_left(deadline, today)
+    if days is not None and days < -config.REFRESH_GRACE_DAYS:
+        return None
+    if days is None or days < 0:
+        hours = config.REFRESH_UNDATED_INTERVAL_H
+    else:
+        hours = days * 24 * config.REFRESH_SHARE_OF_TIME_LEFT
+    hours = min(max(hours, config.REFRESH_MIN_INTERVAL_H), config.REFRESH_MAX_INTERVAL_H)
+    return checked_at + hours * 3600
+
+
+def _status_filter():
+    return f"status IN ({', '.join('?' * len(config.REFRESH_STATUSES))})"
+
+
+def schedule_new_ads(conn):
+    """
+    Puts ads that have no refresh schedule yet (new since the last pass, or from before
+    refreshing existed) on it, counting the day they were scraped as their last check.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT ID, deadline, date_added, full_description FROM scraped_jobs j
+        WHERE {_status_filter()} AND removed_at IS NULL
+          AND NOT EXISTS (SELECT 1 FROM ad_refresh r WHERE r.job_id = j.ID)
+        """,
+        config.REFRESH_STATUSES,
+    ).fetchall()
+    if not rows:
+        return 0
+
+    entries = []
+    for job_id, deadline, date_added, description in rows:
+        try:
+            scraped_at = datetime.strptime(str(date_added)[:10], "%Y-%m-%d").timestamp()
+        except ValueError:
+            scraped_at = time.time()
+        entries.append((job_id, content_hash(description), scraped_at, next_check(deadline, date_added, scraped_at)))
+    conn.executemany(
+        "INSERT INTO ad_refresh (job_id, content_hash, last_checked, next_check) VALUES (?, ?, ?, ?)", entries
+    )
+    conn.commit()
+    return len(entries)
+
+
+def due_ads(conn, now, limit):
+    """The ads whose next check has come, most overdue first."""
+    return conn.execute(
+        f"""
+        SELECT j.ID, j.link, j.date_added, {', '.join('j.' + column for column in FIELDS)},
+               r.content_hash, r.etag, r.last_modified
+        FROM ad_refresh r JOIN scraped_jobs j ON j.ID = r.job_id
+        WHERE r.next_check <= ? AND j.{_status_filter()} AND j.removed_at IS NULL
+        ORDER BY r.next_check
+        LIMIT ?
+        """,
+        (now, *config.REFRESH_STATUSES, limit),
+    ).fetchall()
+
+
+def check(row):
+    """Fetches one due ad (runs on the pool). Returns (row, state, details, validators, error)."""
+    link = row[1]
+    etag, last_modified = row[-2], row[-1]
+    try:
+        state, details, validators = sources.for_link(link).check_ad(link, etag, last_modified)
+    except Exception as e:
+        return row, "failed", None, (etag, last_modified), e
+    if state == "fetched" and not details["Full beskrivelse"]:
+        # A layout change the parser doesn't know yet; don't overwrite good data with defaults
+        return row, "failed", None, validators, "no description on the page"
+    return row, state, details, validators, None
+
+
+def apply(conn, result, now):
+    """Writes one check's outcome. Returns 'not_modified', 'unchanged', 'updated', 'requeued', 'removed' or 'failed'."""
+    row, state, details, validators, error = result
+    job_id, link, date_added = row[0], row[1], row[2]
+    stored = dict(zip(FIELDS, row[3:3 + len(FIELDS)]))
+    old_hash = row[-3]
+    cursor = conn.cursor()
+    new_hash = old_hash
+    outcome = state
+
+    if state == "failed":
+        print(f"   ⚠️ Could not check {link}: {error}")
+        cursor.execute(
+            "UPDATE ad_refresh SET failures = failures + 1, next_check = ? WHERE job_id = ?",
+            (now + config.REFRESH_MIN_INTERVAL_H * 3600, job_id),
+        )
+    elif state == "removed":
+        print(f"   🗑️ Removed from the board: {stored['title']}")
+        database.mark_job_removed(cursor, job_id)
+        cursor.execute("UPDATE ad_refresh SET last_checked = ?, next_check = NULL WHERE job_id = ?", (now, job_id))
+    else:
+        if state == "fetched":
+            new_hash = content_hash(details["Full beskrivelse"])
+            changed = [column for column, key in FIELDS.items() if (details[key] or "") != (stored[column] or "")]
+            if new_hash != old_hash:
+                changed.append("description")
+            if changed:
+                for column in changed:
+                    if column != "description":
+                        print(f"   🔄 {stored['title']}: {column} '{stored[column]}' -> '{details[FIELDS[column]]}'")
+                requeued = database.update_refreshed_job(cursor, job_id, details, new_hash != old_hash)
+                if new_hash != old_hash:
+                    print(f"   📝 Description changed: {details['Stillingstittel']}" + (" (back to AI)" if requeued else ""))
+                outcome = "requeued" if requeued else "updated"
+            else:
+                outcome = "unchanged"
+        deadline = details["Søknadsfrist"] if details else stored["deadline"]
+        cursor.execute(
+            """
+            UPDATE ad_refresh SET content_hash = ?, etag = ?, last_modified = ?, last_checked = ?,
+                                  next_check = ?, failures = 0
+            WHERE job_id = ?
+            """,
+            (new_hash, *validators, now, next_check(deadline, date_added, now), job_id),
+        )
+
+    with metrics.timer("db_commit_ms", op="refresh"):
+        conn.commit()
+    metrics.inc("refresh_checks_total", result=outcome)
+    return outcome
+
+
+def refresh_due(limit=None):
+    """Checks every due ad (up to `limit`) and returns the outcome counts."""
+    conn = sqlite3.connect(config.DB_FILENAME)
+    counts = dict.fromkeys(["not_modified", "unchanged", "updated", "requeued", "removed", "failed"], 0)
+    try:
+        scheduled = schedule_new_ads(conn)
+        if scheduled:
+            print(f"🗓️ {scheduled} ads added to the refresh schedule.")
+
+        now = time.time()
+        due = due_ads(conn, now, limit or config.REFRESH_MAX_PER_RUN)
+        if not due:
+            print("✅ No known ads are due for a refresh.")
+            return counts
+
+        print(f"🔁 Re-checking {len(due)} known ads...")
+        # Every source still throttles itself (rpm bucket, slots); this only keeps them all busy
+        workers = max(1, sum(source.max_workers for source in sources.enabled()))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh") as pool:
+            for result in pool.map(check, due):
+                counts[apply(conn, result, now)] += 1
+    finally:
+        conn.close()
+
+    print(
+        f"🔁 Refresh done: {counts['updated'] + counts['requeued']} updated ({counts['requeued']} back to AI), "
+        f"{counts['removed']} removed, {counts['not_modified'] + counts['unchanged']} unchanged "
+        f"({counts['not_modified']} not modified), {counts['failed']} failed."
+    )
+    return counts
+
+
+def run(args, evaluate_pending, generate_reports, load_ai_filter):
+    """One refresh pass; changed descriptions are evaluated again and the reports regenerated."""
+    with metrics.timer("phase_ms", phase="refresh"), profiling.stage("refresh"):
+        counts = refresh_due()
+
+    if counts["requeued"]:
+        evaluate_pending(args, None if args.no_ai else load_ai_filter())
+    if counts["updated"] or counts["requeued"] or counts["removed"]:
+        with metrics.timer("phase_ms", phase="report"), profiling.stage("report"):
+            generate_reports(report_dumb=args.report_dumb, report_profile=args.report_profile)
@@ -0,0 +1,80 @@
+"""
+Job-board adapters. Each board is a sources.base.Source subclass registered in
+ADAPTERS; config.SOURCES picks the ones that are crawled.
+
+To add a board: subclass Source (search_url, parse_search, parse_ad,
+native_id), register it below, and drop a saved search page + ad page into
+sources/fixtures/<name>/ for `python -m sources.harness`.
+"""
+import queue
+import threading
+from urllib.parse import urlparse
+
+import config
+from sources.finn import FinnSource
+
+ADAPTERS = {
+    FinnSource.name: FinnSource,
+}
+
+_instances = {}
+_lock = threading.Lock()
+_DONE = object()
+
+
+def get(name):
+    """The shared adapter instance (one session, pool and rate budget per source)."""
+    with _lock:
+        if name not in _instances:
+            if name not in ADAPTERS:
+                raise ValueError(f"Unknown source '{name}' (known: {', '.join(ADAPTERS)})")
+            _instances[name] = ADAPTERS[name]()
+        return _instances[name]
+
+
+def reset():
+    """Drops the adapter instances, so the next get() applies changed SOURCE_LIMITS."""
+    with _lock:
+        _instances.clear()
+
+
+def enabled():
+    return [get(name) for name in config.SOURCES]
+
+
+def for_link(url):
+    """The adapter that handles `url`, by host."""
+    host = urlparse(url).netloc.lower()
+    for name, adapter in ADAPTERS.items():
+        if host in adapter.hosts:
+            return get(name)
+    raise ValueError(f"No source handles {url}")
+
+
+def crawl(queries, known_ids, stop=None):
+    """
+    Crawls all enabled sources in parallel (one thread per source, each with its
+    own fetch pool) and yields the scraped ad details as they come in. The caller
+    stays the only one writing to the database.
+    """
+    results = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    active = enabled()
+
+    def run(source):
+        try:
+            source.crawl(queries, known_ids, results.put, stop=stop)
+        except Exception as e:
+            print(f"❌ Crawl of {source.name} failed: {e}")
+        finally:
+            results.put(_DONE)
+
+    for source in active:
+        threading.Thread(target=run, args=(source,), name=f"crawl-{source.name}", daemon=True).start()
+
+    remaining = len(active)
+    while remaining:
+        item = results.get()
+        if item is _DONE:
+            remaining -= 1
+        else:
+            yield item
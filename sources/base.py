@@ -0,0 +1,212 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+
+import config
+import metrics
+from rag.evaluator import TokenBucket
+
+# IDs of non-primary sources are hashed into [10^14, 10^15): they can never collide
+# with finn.no's 9-digit IDs and stay within the 15 digits Excel keeps exactly.
+NAMESPACED_ID_BASE = 10**14
+NAMESPACED_ID_SPAN = 9 * 10**14
+
+
+class Source:
+    """
+    One job board. A subclass only describes its site: the search URL, how to
+    parse a result page and an ad page, and the board's own ad ID. Paging,
+    rate limiting, the connection pool and the ID namespace are handled here.
+
+    Every source has its own requests.Session, its own requests-per-minute
+    bucket and a cap on concurrent fetches, so a slow or strict board never
+    holds back the others.
+    """
+
+    name = None
+    hosts = ()  # URL hosts this adapter handles
+    max_workers = 2
+    rpm = 120
+    # The primary source keeps its numeric IDs as-is (existing databases and Excel files use them)
+    primary = False
+
+    def __init__(self):
+        limits = config.SOURCE_LIMITS.get(self.name, {})
+        self.max_workers = limits.get("workers", self.max_workers)
+        self.rpm = limits.get("rpm", self.rpm)
+
+        self.session = requests.Session()
+        self.session.headers.update(config.HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Burst of at most one request per worker, then `rpm` per minute
+        self.bucket = TokenBucket(self.rpm, capacity=self.max_workers)
+        self.slots = threading.BoundedSemaphore(self.max_workers)
+
+    # --- Site-specific: implement in the adapter ---
+
+    def search_url(self, query, page, newest_first=False):
+        raise NotImplementedError
+
+    def parse_search(self, soup):
+        """Absolute ad URLs on one result page (empty when past the last page)."""
+        raise NotImplementedError
+
+    def parse_ad(self, soup):
+        """
+        The ad's fields: 'Stillingstittel', 'Arbeidsgiver', 'Søknadsfrist',
+        'Arbeidssted', 'Kontaktperson', 'Mobil' and 'Full beskrivelse'.
+        """
+        raise NotImplementedError
+
+    def native_id(self, url):
+        """The board's own ID for the ad at `url`."""
+        raise NotImplementedError
+
+    # --- Shared ---
+
+    def job_id(self, url):
+        """The scraped_jobs ID (as a string) for an ad URL of this source."""
+        native = self.native_id(url)
+        if self.primary:
+            return native
+        digest = hashlib.blake2b(f"{self.name}:{native}".encode(), digest_size=8).digest()
+        return str(NAMESPACED_ID_BASE + int.from_bytes(digest, "big") % NAMESPACED_ID_SPAN)
+
+    def fetch(self, url, kind):
+        with self.slots:
+            self.bucket.acquire()
+            with metrics.timer("scrape_fetch_ms", kind=kind, source=self.name):
+                response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        metrics.inc("scrape_bytes_total", len(response.content), kind=kind, source=self.name)
+        return response
+
+    def get_job_links(self, query, known_ids=None):
+        """
+        Returns the unique ad links for `query`, following every result page.
+        With `known_ids`, results are sorted newest first and paging stops at the first
+        page with no unknown ad (incremental crawl for --watch).
+        """
+        all_links = []
+        page = 1
+
+        print(f"🔎 Searching {self.name} for: {query}...")
+        while True:
+            url = self.search_url(query, page, newest_first=known_ids is not None)
+            try:
+                response = self.fetch(url, "search")
+                metrics.inc("scrape_pages_total", source=self.name)
+
+                with metrics.timer("scrape_parse_ms", kind="search", source=self.name):
+                    links = self.parse_search(BeautifulSoup(response.content, "html.parser"))
+
+                if not links:
+                    break  # No more results, stop paginating
+
+                all_links.extend(links)
+                print(f"   📄 Page {page}: {len(links)} jobs found")
+                if known_ids is not None and all(self.job_id(l) in known_ids for l in links):
+                    break  # Everything older than this page has been seen already
+                page += 1
+
+            except Exception as e:
+                print(f"❌ Error searching {self.name} for {query} (page {page}): {e}")
+                metrics.inc("scrape_errors_total", kind="search", source=self.name)
+                break
+
+        unique_links = list(dict.fromkeys(all_links))
+        print(f"   🔗 Total unique links for '{query}' on {self.name}: {len(unique_links)}")
+        return unique_links
+
+    def scrape_ad_details(self, url):
+        print(f"   🕷️ Crawling: {url}")
+        try:
+            response = self.fetch(url, "ad")
+            with metrics.timer("scrape_parse_ms", kind="ad", source=self.name):
+                details = self.parse_ad(BeautifulSoup(response.content, "html.parser"))
+            metrics.inc("scrape_ads_total", source=self.name)
+        except Exception as e:
+            print(f"❌ Error scraping ad {url}: {e}")
+            metrics.inc("scrape_errors_total", kind="ad", source=self.name)
+            return None
+
+        description = details["Full beskrivelse"]
+        details.update(
+            {
+                "Fra dato": datetime.now().strftime("%d.%m.%Y"),
+                "Kort beskrivelse": description[:300].replace("\n", " ") + "..." if description else "",
+                "Lenke": url,
+                "Status": "Not searched",
+                "ID": self.job_id(url),
+                "Kilde": self.name,
+            }
+        )
+        return details
+
+    def is_removed(self, soup):
+        """
+        True if a fetched ad page says the ad is gone. 404/410 always count as removed;
+        override this for boards that keep serving expired ads as a normal page.
+        """
+        return False
+
+    def check_ad(self, url, etag=None, last_modified=None):
+        """
+        Conditional re-fetch of a known ad (see refresh.py). Returns (state, details, validators):
+        state is 'not_modified' (304), 'removed' (404/410 or is_removed) or 'fetched' with the
+        re-parsed fields; validators are the (ETag, Last-Modified) to send on the next check.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        with self.slots:
+            self.bucket.acquire()
+            with metrics.timer("scrape_fetch_ms", kind="refresh", source=self.name):
+                response = self.session.get(url, headers=headers, timeout=30)
+
+        validators = (response.headers.get("ETag") or etag, response.headers.get("Last-Modified") or last_modified)
+        if response.status_code == 304:
+            return "not_modified", None, validators
+        if response.status_code in (404, 410):
+            return "removed", None, validators
+        response.raise_for_status()
+        metrics.inc("scrape_bytes_total", len(response.content), kind="refresh", source=self.name)
+
+        with metrics.timer("scrape_parse_ms", kind="ad", source=self.name):
+            soup = BeautifulSoup(response.content, "html.parser")
+            if self.is_removed(soup):
+                return "removed", None, validators
+            details = self.parse_ad(soup)
+        return "fetched", details, validators
+
+    def crawl(self, queries, known_ids, emit, stop=None):
+        """
+        Searches every query, then fetches the unseen ads on this source's own pool,
+        calling `emit(details)` for each one. Used by sources.crawl().
+        """
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+            for query in queries:
+                if stop is not None and stop.is_set():
+                    return
+                new_links = []
+                for link in self.get_job_links(query):
+                    job_id = self.job_id(link)
+                    if job_id not in known_ids and job_id not in seen:
+                        seen.add(job_id)
+                        new_links.append(link)
+                if not new_links:
+                    continue
+
+                print(f"   - Found {len(new_links)} new jobs for '{query}' on {self.name}.")
+                for details in pool.map(self.scrape_ad_details, new_links):
+                    if details:
+                        emit(details)
@@ -0,0 +1,105 @@
+import re
+
+from sources.base import Source
+
+
+class FinnSource(Source):
+    """finn.no/job: the original (and primary) source."""
+
+    name = "finn"
+    hosts = ("www.finn.no", "finn.no")
+    max_workers = 2
+    rpm = 120
+    primary = True
+
+    EXTRA_QUERY = "work_experience=455&work_experience=456&extent=3947"
+
+    def search_url(self, query, page, newest_first=False):
+        url = f"https://www.finn.no/job/search?page={page}&q={query.replace(' ', '+')}&{self.EXTRA_QUERY}"
+        if newest_first:
+            url += "&sort=PUBLISHED_DESC"
+        return url
+
+    def parse_search(self, soup):
+        links = []
+        for article in soup.find_all("article"):
+            link_tag = article.find("a", class_="job-card-link")
+            if link_tag and link_tag.has_attr("href"):
+                href = link_tag["href"]
+                if href.startswith("/"):
+                    href = f"https://www.finn.no{href}"
+                links.append(href)
+        return links
+
+    def native_id(self, url):
+        return url.rstrip("/").split("/")[-1]
+
+    def parse_ad(self, soup):
+        # --- Defaults ---
+        title = "Unknown Title"
+        employer = "Unknown"
+        deadline = "Se annonse"
+        location = "Unknown"
+        contact = ""
+        phone = ""
+        full_description = ""
+
+        # 1. Company Name
+        top_section = soup.find("section", class_="mt-16")
+        if top_section:
+            p_tag = top_section.find("p", class_="mb-24")
+            if p_tag:
+                employer = p_tag.get_text(strip=True)
+
+        # 2. Key Info Extraction
+        for li in soup.find_all("li"):
+            text = li.get_text(" ", strip=True)
+
+            # Deadline
+            if "Frist" in text:
+                clean_deadline = text.replace("Frist", "").replace(":", "").strip()
+                if clean_deadline:
+                    deadline = clean_deadline
+
+            # Location
+            if "Sted" in text:
+                clean_loc = text.replace("Sted", "").replace(":", "").strip()
+                if clean_loc:
+                    location = clean_loc
+
+            # Contact Person
+            if "Kontaktperson" in text:
+                clean_contact = text.replace("Kontaktperson", "").replace(":", "").strip()
+                if clean_contact:
+                    contact = clean_contact
+
+            # Phone
+            if "Mobil" in text or "Telefon" in text:
+                clean_phone = text.replace("Mobil", "").replace("Telefon", "").replace(":", "").strip()
+                if clean_phone:
+                    phone = clean_phone
+
+        # 3. Job Title: data-testid is the most reliable, then the standard class, then any h1
+        h1_tag = (
+            soup.find("h1", attrs={"data-testid": "object-title"})
+            or soup.find("h1", class_="u-t2")
+            or soup.find("h1")
+        )
+        if h1_tag:
+            title = h1_tag.get_text(strip=True)
+
+        # 4. Description
+        desc_div = soup.find("div", class_="import-decoration")
+        if desc_div:
+            full_description = desc_div.get_text(separator="\n", strip=True)
+            full_description = re.sub(r"\n{3,}", "\n\n", full_description)
+
+        return {
+            "Stillingstittel": title,
+            "Søknadsfrist": deadline,
+            "Arbeidsgiver": employer,
+            "Kontaktperson": contact,
+            "Mobil": phone,
+            "Arbeidssted": location,
+            "Full beskrivelse": full_description,
+        }
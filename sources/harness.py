@@ -0,0 +1,158 @@
+"""
+Offline fixture checks for the source adapters.
+
+Each adapter has a saved result page and ad page in sources/fixtures/<name>/
+plus expected.json with what the parser should make of them. The check runs
+the adapter's real get_job_links / scrape_ad_details against a session that
+serves those files, so parsing, pagination and ID mapping are covered without
+network access.
+
+This is a manual check, not a test suite: the repo has no pytest or CI, so run
+it after touching an adapter or its fixtures. It exits 1 if any adapter's
+output differs from expected.json.
+
+    python -m sources.harness                  # check every adapter with fixtures
+    python -m sources.harness finn             # check one adapter
+    python -m sources.harness finn --record "python utvikler"
+        # save a live result page + its first ad as the new fixtures and
+        # rewrite expected.json from the current parser (review the diff!)
+"""
+import argparse
+import json
+import os
+import sys
+
+from bs4 import BeautifulSoup
+
+import sources
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EMPTY_PAGE = b"<html><body><main></main></body></html>"
+
+# Fields that depend on the day the check runs
+VOLATILE = {"Fra dato"}
+
+
+class FixtureResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FixtureSession:
+    """
+    Stands in for the adapter's requests.Session: the first result page is
+    search.html, every ad linked from it is ad.html, and anything else is an
+    empty page (which ends the paging).
+    """
+
+    def __init__(self, source, directory, query):
+        self.directory = directory
+        self.first_pages = {source.search_url(query, 1), source.search_url(query, 1, newest_first=True)}
+        self.ad_links = set(source.parse_search(BeautifulSoup(self._read("search.html"), "html.parser")))
+
+    def _read(self, filename):
+        with open(os.path.join(self.directory, filename), "rb") as f:
+            return f.read()
+
+    def get(self, url, timeout=None):
+        if url in self.first_pages:
+            return FixtureResponse(self._read("search.html"))
+        if url in self.ad_links:
+            return FixtureResponse(self._read("ad.html"))
+        return FixtureResponse(EMPTY_PAGE)
+
+
+def _details(source, url):
+    details = source.scrape_ad_details(url)
+    return {k: v for k, v in details.items() if k not in VOLATILE} if details else None
+
+
+def run_fixtures(name):
+    """Returns a list of mismatch messages (empty = pass)."""
+    directory = os.path.join(FIXTURE_DIR, name)
+    with open(os.path.join(directory, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    source = sources.ADAPTERS[name]()
+    source.session = FixtureSession(source, directory, expected["query"])
+
+    problems = []
+    links = source.get_job_links(expected["query"])
+    if links != expected["links"]:
+        problems.append(f"links: expected {expected['links']}, got {links}")
+
+    ids = {link: source.job_id(link) for link in links}
+    if ids != expected["ids"]:
+        problems.append(f"ids: expected {expected['ids']}, got {ids}")
+
+    details = _details(source, expected["ad_url"])
+    for field, value in expected["ad"].items():
+        got = (details or {}).get(field)
+        if got != value:
+            problems.append(f"ad[{field!r}]: expected {value!r}, got {got!r}")
+    return problems
+
+
+def record(name, query):
+    """Saves a live result page and its first ad as fixtures, then writes expected.json from them."""
+    directory = os.path.join(FIXTURE_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    source = sources.ADAPTERS[name]()
+
+    search = source.fetch(source.search_url(query, 1), "search")
+    with open(os.path.join(directory, "search.html"), "wb") as f:
+        f.write(search.content)
+
+    links = source.parse_search(BeautifulSoup(search.content, "html.parser"))
+    if not links:
+        sys.exit(f"❌ No ads found for '{query}' on {name}; nothing recorded.")
+    ad = source.fetch(links[0], "ad")
+    with open(os.path.join(directory, "ad.html"), "wb") as f:
+        f.write(ad.content)
+
+    # Expected values come from the offline run, so they match exactly what the check sees
+    source.session = FixtureSession(source, directory, query)
+    links = source.get_job_links(query)
+    expected = {
+        "query": query,
+        "links": links,
+        "ids": {link: source.job_id(link) for link in links},
+        "ad_url": links[0],
+        "ad": _details(source, links[0]),
+    }
+    with open(os.path.join(directory, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=2, ensure_ascii=False)
+    print(f"📼 Recorded fixtures for {name} in {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fixture checks for the source adapters.")
+    parser.add_argument("sources", nargs="*", help="Adapters to check (default: all with fixtures).")
+    parser.add_argument("--record", metavar="QUERY", help="Record new fixtures for one adapter from a live search.")
+    args = parser.parse_args()
+
+    if args.record:
+        if len(args.sources) != 1:
+            sys.exit("--record needs exactly one adapter name.")
+        record(args.sources[0], args.record)
+        return
+
+    names = args.sources or [n for n in sources.ADAPTERS if os.path.isdir(os.path.join(FIXTURE_DIR, n))]
+    missing = [n for n in sources.ADAPTERS if not os.path.isdir(os.path.join(FIXTURE_DIR, n))]
+    failed = False
+    for name in names:
+        problems = run_fixtures(name)
+        failed |= bool(problems)
+        print(f"{'✅' if not problems else '❌'} {name}")
+        for problem in problems:
+            print(f"   - {problem}")
+    for name in missing:
+        print(f"⚠️ {name} has no fixtures (python -m sources.harness {name} --record \"<query>\")")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Long-running watch mode (python main.py --watch).
+
+Instead of a cold cron run every few hours, one process stays up and keeps the
+expensive things resident: the HTTP connection pool, a DB connection, the set
+of known ad IDs and the warm model handle. Each search query is polled on its
+own jittered schedule with an incremental crawl (newest first, stop at the
+first page with nothing new), and new ads go through the basic filter, the AI
+and the reports right away.
+
+Edits to config.py, profile.py or rag/dumb_filter.py are picked up without a
+restart (also on SIGHUP). Ctrl-C / SIGTERM stop after the current ad; a
+second Ctrl-C quits immediately.
+"""
+import importlib
+import os
+import random
+import signal
+import sqlite3
+import sys
+import threading
+import time
+
+import config
+import database
+import metrics
+import scraper
+import sources
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WATCHED_FILES = ["config.py", "profile.py", os.path.join("rag", "dumb_filter.py")]
+
+# How often the idle loop wakes up to look for edited rule files
+RELOAD_CHECK_S = 5
+
+
+class Watcher:
+    def __init__(self, args, process_ad, evaluate_pending, generate_reports, load_ai_filter):
+        self.args = args
+        self.process_ad = process_ad
+        self.evaluate_pending = evaluate_pending
+        self.generate_reports = generate_reports
+
+        self.stop = threading.Event()
+        self.reload_requested = threading.Event()
+        self.mtimes = self._mtimes()
+
+        # Resident state that a cron run would rebuild every time
+        self.conn = sqlite3.connect(config.DB_FILENAME)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.known_ids = database.get_existing_ids()
+        self.ai_filter = None if args.no_ai else load_ai_filter()
+        if self.ai_filter:
+            self._warm_model()
+
+        self.schedule = {}
+        self._update_schedule()
+
+    def _search_list(self):
+        return [self.args.query] if self.args.query else list(config.SEARCH_QUERIES)
+
+    def _next_poll(self):
+        jitter = random.uniform(-config.WATCH_JITTER, config.WATCH_JITTER)
+        return time.time() + config.WATCH_INTERVAL_S * (1 + jitter)
+
+    def _update_schedule(self):
+        """New queries are polled right away (spread over a few seconds); removed ones are dropped."""
+        queries = self._search_list()
+        for query in list(self.schedule):
+            if query not in queries:
+                del self.schedule[query]
+        for query in queries:
+            self.schedule.setdefault(query, time.time() + random.uniform(0, RELOAD_CHECK_S))
+
+    def _warm_model(self):
+        from rag.providers import get_provider
+
+        try:
+            get_provider(local=self.args.local).warm()
+        except Exception as e:
+            print(f"⚠️ Could not warm up the model, it will load on first use: {e}")
+
+    # --- Reload ---
+
+    def _mtimes(self):
+        mtimes = {}
+        for name in WATCHED_FILES:
+            path = os.path.join(ROOT, name)
+            if os.path.exists(path):
+                mtimes[name] = os.path.getmtime(path)
+        return mtimes
+
+    def reload(self):
+        """Re-imports the config, profile and filter rules in place; on error the old rules stay."""
+        self.reload_requested.clear()
+        self.mtimes = self._mtimes()
+        print("🔄 Reloading config and filter rules...")
+        try:
+            importlib.reload(config)
+            sources.reset()
+            if "rag.dumb_filter" in sys.modules:
+                importlib.reload(sys.modules["rag.dumb_filter"])
+            if self.ai_filter:
+                # ai_filter copies the profile text at import, so it is reloaded after profile.py
+                importlib.reload(sys.modules["profile"])
+                importlib.reload(self.ai_filter)
+        except Exception as e:
+            print(f"⚠️ Reload failed, keeping the previous rules: {e}")
+            metrics.inc("watch_errors_total", kind="reload")
+            return
+
+        self._update_schedule()
+        metrics.inc("watch_reloads_total")
+        print(f"✅ Reloaded. Watching {len(self.schedule)} queries.")
+
+    # --- Polling ---
+
+    def poll(self, query):
+        """One incremental crawl of `query`; new ads are stored, evaluated and reported immediately."""
+        metrics.inc("watch_polls_total")
+        links = scraper.get_job_links(query, known_ids=self.known_ids)
+        new_links = [l for l in links if scraper.job_id(l) not in self.known_ids]
+        if not new_links:
+            return
+
+        print(f"   - Found {len(new_links)} new jobs for '{query}'.")
+        discovered = time.perf_counter()
+        pending = 0
+        for link in new_links:
+            if self.stop.is_set():
+                break
+            details = self.process_ad(link, self.known_ids, conn=self.conn)
+            if details:
+                metrics.inc("watch_new_ads_total")
+                pending += details["Status"] == "Pending AI"
+
+        if pending:
+            self.evaluate_pending(self.args, self.ai_filter)
+            metrics.observe("watch_discovery_to_verdict_ms", (time.perf_counter() - discovered) * 1000)
+
+        self.generate_reports(report_dumb=self.args.report_dumb, report_profile=self.args.report_profile)
+
+    def _write_metrics(self):
+        """Refreshes jobtracker.prom, so node_exporter sees the daemon's counters while it runs."""
+        try:
+            metrics.write_report(run_file=False)
+        except OSError as e:
+            print(f"⚠️ Could not write metrics: {e}")
+
+    def run(self):
+        def request_stop(signum, frame):
+            if self.stop.is_set():
+                raise KeyboardInterrupt
+            print("\n🛑 Stopping after the current ad (Ctrl-C again to quit now)...")
+            self.stop.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.reload_requested.set())
+
+        print(
+            f"👀 Watching {len(self.schedule)} queries every ~{config.WATCH_INTERVAL_S}s "
+            f"(±{config.WATCH_JITTER:.0%}). Ctrl-C to stop."
+        )
+        try:
+            while not self.stop.is_set():
+                if self.reload_requested.is_set() or self._mtimes() != self.mtimes:
+                    self.reload()
+
+                if not self.schedule:
+                    self.stop.wait(RELOAD_CHECK_S)
+                    continue
+
+                query, due = min(self.schedule.items(), key=lambda item: item[1])
+                wait = due - time.time()
+                if wait > 0:
+                    self.stop.wait(min(wait, RELOAD_CHECK_S))
+                    continue
+
+                try:
+                    self.poll(query)
+                except Exception as e:
+                    # One bad poll (network, parse) must not take the daemon down
+                    print(f"❌ Poll of '{query}' failed: {e}")
+                    metrics.inc("watch_errors_total", kind="poll")
+                self.schedule[query] = self._next_poll()
+                self._write_metrics()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.conn.close()
+        print("\n👋 Watch stopped.")
+
+
+def run(args, process_ad, evaluate_pending, generate_reports, load_ai_filter):
+    database.index_missing_clusters()
+    if args.sync:
+        database.sync_excel_to_db()
+    Watcher(args, process_ad, evaluate_pending, generate_reports, load_ai_filter).run()
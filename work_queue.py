@@ -0,0 +1,350 @@
+"""
+Lease-based AI work queue, so several processes or hosts can drain the
+'Pending AI' backlog in parallel without evaluating a job twice.
+
+    python main.py --worker [--local]                 # on any machine that sees the DB file
+    python main.py --serve-queue                      # coordinator next to the DB ...
+    python main.py --worker --coordinator http://db-host:8767   # ... for workers on other hosts
+
+A worker claims a small chunk of pending jobs (database.claim_ai_chunk: an
+atomic UPDATE that sets lease_owner / lease_expires), evaluates them with the
+usual concurrency, limiter and budget, and writes the verdicts back. A
+heartbeat thread keeps the leases of the jobs still in flight alive; if a
+worker dies, its leases run out after config.WORKER_LEASE_S and the next claim
+takes the jobs over. Jobs that were claimed but never sent are handed back when
+the worker stops; jobs whose evaluation failed are no longer renewed, so their
+lease runs out as a back-off.
+
+The shared-file mode needs SQLite locking that works, i.e. a local disk; for
+workers on other hosts run the coordinator, which is the only process that
+touches the file and serves claims, heartbeats and verdicts over HTTP.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+import database
+import metrics
+from rag import evaluator
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def save_results(conn, provider, batch, results, meta, worker_id):
+    """
+    Writes one evaluated batch (the same rows run_ai_phase writes) and commits.
+    Verdicts for jobs `worker_id` no longer holds are dropped; returns their count.
+    """
+    cursor = conn.cursor()
+    database.record_ai_batch(cursor, provider, len(batch), len(results), meta)
+    stale = database.save_ai_verdicts(cursor, batch, results, worker_id)
+    with metrics.timer("db_commit_ms", op="verdicts"):
+        conn.commit()
+    return stale
+
+
+def _connect(**kwargs):
+    conn = sqlite3.connect(config.DB_FILENAME, timeout=config.DB_BUSY_TIMEOUT_S, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the claiming writer
+    return conn
+
+
+class LocalQueue:
+    """Claims straight from the shared database file."""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.where = config.DB_FILENAME
+        self.conn = _connect()
+        self.heartbeat_conn = None  # Used by the heartbeat thread, closed by this one
+        database.refresh_ai_priorities(self.conn)
+
+    def claim(self, limit):
+        return database.claim_ai_chunk(self.conn, self.worker_id, limit)
+
+    def renew(self, job_ids):
+        if self.heartbeat_conn is None:
+            self.heartbeat_conn = _connect(check_same_thread=False)
+        return database.renew_ai_leases(self.heartbeat_conn, self.worker_id, job_ids)
+
+    def release(self, job_ids):
+        return database.release_ai_leases(self.conn, self.worker_id, job_ids)
+
+    def save(self, provider, batch, results, meta):
+        return save_results(self.conn, provider, batch, results, meta, self.worker_id)
+
+    def close(self):
+        self.conn.close()
+        if self.heartbeat_conn is not None:
+            self.heartbeat_conn.close()
+
+
+class RemoteQueue:
+    """Claims through a coordinator (python main.py --serve-queue) over HTTP."""
+
+    def __init__(self, url, worker_id):
+        import requests
+
+        self.worker_id = worker_id
+        self.where = url.rstrip("/")
+        self.session = requests.Session()
+        if config.QUEUE_TOKEN:
+            self.session.headers["X-Queue-Token"] = config.QUEUE_TOKEN
+
+    def _post(self, path, **payload):
+        response = self.session.post(f"{self.where}{path}", json=dict(payload, worker=self.worker_id), timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, limit):
+        return self._post("/claim", limit=limit)["rows"]
+
+    def renew(self, job_ids):
+        return self._post("/renew", ids=list(job_ids))["renewed"]
+
+    def release(self, job_ids):
+        return self._post("/release", ids=list(job_ids))["released"]
+
+    def save(self, provider, batch, results, meta):
+        return self._post("/results", provider=provider, batch=batch, results=results, meta=meta)["stale"]
+
+    def close(self):
+        self.session.close()
+
+
+class Heartbeat(threading.Thread):
+    """Renews the leases of `in_flight()` every config.WORKER_HEARTBEAT_S until stopped."""
+
+    def __init__(self, queue, in_flight):
+        super().__init__(name="lease-heartbeat", daemon=True)
+        self.queue = queue
+        self.in_flight = in_flight
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(config.WORKER_HEARTBEAT_S):
+            try:
+                job_ids = self.in_flight()
+                if job_ids:
+                    self.queue.renew(job_ids)
+                metrics.inc("ai_lease_heartbeats_total", result="ok")
+            except Exception as e:
+                # A missed beat is fine as long as the next one lands before the lease runs out
+                print(f"⚠️ Lease heartbeat failed: {e}")
+                metrics.inc("ai_lease_heartbeats_total", result="failed")
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run(args, ai_filter, ai_concurrency, ai_batches, ai_budget):
+    """Drains the queue as one worker until nothing is left to claim (or the budget is spent)."""
+    worker_id = args.worker_id or default_worker_id()
+    queue = RemoteQueue(args.coordinator, worker_id) if args.coordinator else LocalQueue(worker_id)
+    provider = "local" if args.local else "gemini"
+    claimed, sent = set(), set()
+    held_lock = threading.Lock()  # The heartbeat thread reads claimed/sent
+    counts = {"duplicates": 0, "evaluated": 0}
+
+    def jobs_to_check():
+        # Claims lazily, so a worker only holds what its requests in flight are about to use
+        seen_clusters = set()
+        while True:
+            rows = queue.claim(config.WORKER_CLAIM_SIZE)
+            if not rows:
+                return
+            with held_lock:
+                claimed.update(str(row[0]) for row in rows)
+            for row in rows:
+                cluster_id = row[4] or row[0]
+                if cluster_id in seen_clusters:
+                    # Gets the verdict of its cluster; otherwise released at the end
+                    counts["duplicates"] += 1
+                    continue
+                seen_clusters.add(cluster_id)
+                yield database.pending_ai_job(row)
+
+    def write_results(batch, ai_results, meta):
+        with held_lock:
+            sent.update(job["id"] for job in batch)
+        counts["evaluated"] += len(batch)
+        print(f"   📦 Batch of {len(batch)}: {len(ai_results)} verdicts, {meta.get('latency_ms')} ms")
+        stale = queue.save(provider, batch, ai_results, meta)
+        if stale:
+            print(f"   ⌛ {stale} verdicts dropped: their lease ran out and another worker claimed them.")
+
+    workers, limiter = ai_concurrency(args)
+    evaluate, batches = ai_batches(args, ai_filter, jobs_to_check())
+    print(f"👷 Worker {worker_id}: claiming from {queue.where} ({workers} requests in flight)...")
+
+    def in_flight():
+        # Near-duplicates held back for their cluster's verdict count too
+        with held_lock:
+            return list(claimed - sent)
+
+    heartbeat = Heartbeat(queue, in_flight)
+    heartbeat.start()
+    started = time.time()
+    try:
+        stats = evaluator.evaluate_concurrently(
+            batches,
+            lambda batch, meta: evaluate(batch, force_local=args.local, think=args.think, usage=meta),
+            write_results,
+            max_workers=workers,
+            limiter=limiter,
+            quota_pause=config.AI_QUOTA_PAUSE_S,
+            budget=ai_budget(args),
+        )
+    finally:
+        heartbeat.stop()
+        unsent = claimed - sent
+        if unsent:
+            released = queue.release(unsent)
+            print(f"↩️ Handed {released} claimed but unsent jobs back to the queue.")
+        queue.close()
+
+    elapsed = time.time() - started
+    print(
+        f"👷 Worker {worker_id} done: {counts['evaluated']} jobs in {stats['batches']} batches, "
+        f"{elapsed:.1f}s ({counts['duplicates']} near-duplicates, {stats['failed']} failed batches)."
+    )
+    return stats
+
+
+# --- Coordinator ---
+
+_conn = None
+_conn_lock = threading.Lock()
+
+
+@contextmanager
+def _connection():
+    """
+    The coordinator's single connection, lent to one request thread at a time.
+    SQLite serializes the writes anyway, so a pool would only add lock waits.
+    """
+    global _conn
+    with _conn_lock:
+        if _conn is None:
+            _conn = _connect(check_same_thread=False)
+        try:
+            yield _conn
+        except Exception:
+            _conn.rollback()  # Don't leave the next request inside a half-done transaction
+            raise
+
+
+def _valid_results(batch, results, meta):
+    """A /results body in the shape save_results expects, so a bad one is a 400 rather than a 500."""
+    return (
+        isinstance(batch, list)
+        and all(isinstance(job, dict) and "id" in job and "title" in job for job in batch)
+        and isinstance(results, dict)
+        and all(isinstance(result, dict) for result in results.values())
+        and isinstance(meta, dict)
+    )
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    server_version = "JobTrackerQueue/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if config.QUEUE_TOKEN and self.headers.get("X-Queue-Token") != config.QUEUE_TOKEN:
+            self._send_json(403, {"error": "bad or missing X-Queue-Token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/status":
+            with _connection() as conn:
+                status = database.ai_lease_status(conn)
+            self._send_json(200, status)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            worker_id = data["worker"]
+        except (ValueError, KeyError):
+            self._send_json(400, {"error": "expected a JSON body with 'worker'"})
+            return
+
+        if self.path == "/claim":
+            with _connection() as conn:
+                rows = database.claim_ai_chunk(conn, worker_id, int(data.get("limit") or config.WORKER_CLAIM_SIZE))
+            if rows:
+                print(f"📤 {len(rows)} jobs leased to {worker_id}")
+            self._send_json(200, {"rows": rows})
+        elif self.path == "/renew":
+            with _connection() as conn:
+                renewed = database.renew_ai_leases(conn, worker_id, data.get("ids", []))
+            self._send_json(200, {"renewed": renewed})
+        elif self.path == "/release":
+            with _connection() as conn:
+                released = database.release_ai_leases(conn, worker_id, data.get("ids", []))
+            self._send_json(200, {"released": released})
+        elif self.path == "/results":
+            batch, results, meta = data.get("batch"), data.get("results"), data.get("meta", {})
+            if not _valid_results(batch, results, meta):
+                self._send_json(
+                    400, {"error": "expected 'batch' (jobs with 'id' and 'title') and 'results' (verdicts by id)"}
+                )
+                return
+            with _connection() as conn:
+                stale = save_results(conn, data.get("provider", "remote"), batch, results, meta, worker_id)
+            self._send_json(200, {"saved": len(results) - stale, "stale": stale})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+def serve(host=None, port=None):
+    """Runs the coordinator until Ctrl-C."""
+    global _conn
+    host = host or config.QUEUE_HOST
+    port = port or config.QUEUE_PORT
+    conn = _connect()
+    database.compact_missing_descriptions()
+    database.refresh_ai_priorities(conn)
+    status = database.ai_lease_status(conn)
+    conn.close()
+
+    server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+    print(f"🗂️ AI queue coordinator on http://{host}:{port}/ ({status['pending']} jobs pending, Ctrl-C to stop)")
+    if host not in ("127.0.0.1", "localhost") and not config.QUEUE_TOKEN:
+        print("⚠️ Listening beyond localhost without JOBTRACKER_QUEUE_TOKEN: anyone on the network can write verdicts.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Coordinator stopped.")
+    finally:
+        server.server_close()
+        with _conn_lock:
+            if _conn is not None:
+                _conn.close()
+                _conn = None